@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+일괄 프롬프트 생성기 (GUI 없이 실행)
+
+폴더 안의 모든 .docx 문서를 청크로 나누고, 각 청크의 1단계(초벌 번역) 프롬프트를 JSONL 파일로 저장합니다.
+문서는 프로세스 풀에 나누어 병렬로 처리하며, 문서별 오류는 결과 레코드로 기록되어 전체 작업을 멈추지 않습니다.
+
+사용 예:
+    python batch_generate.py 원문폴더 -g "Translation glossary.txt" -c CustomPrompt.json -o prompts.jsonl
+"""
+
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import prompt_core
+from glossary_index import GlossaryIndex, open_glossary, matcher_for
+from prompt_template import TemplateError, compile_template, render_prompt
+from project_store import ProjectStore, default_project_path
+
+# 워커 프로세스마다 한 번만 준비하는 상태 (initializer 에서 설정)
+_worker_state = {}
+
+
+def _init_worker(settings, glossary_path, skip_completed=False):
+    # initializer 에서 예외가 나면 프로세스 풀 전체가 멈추므로(BrokenProcessPool), 오류는 기록해 두고 문서별 오류로 돌려줍니다.
+    _worker_state["settings"] = settings
+    _worker_state["skip_completed"] = skip_completed
+    try:
+        _worker_state["glossary"] = open_glossary(glossary_path)
+        _worker_state["matcher"] = matcher_for(_worker_state["glossary"])
+        _worker_state["prompt1"] = compile_template(settings["prompt1"], "prompt1")
+        _worker_state["init_error"] = None
+    except Exception as e:
+        _worker_state["init_error"] = e
+
+
+def process_document(doc_path):
+    """
+    문서 하나의 모든 청크에 대해 1단계 프롬프트를 만듭니다.
+    예외를 밖으로 던지지 않고, 성공/실패를 담은 결과 dict 를 반환합니다. (워커 준비 오류도 문서별 오류로 반환)
+    """
+    if (e := _worker_state["init_error"]) is not None:
+        return {"document": doc_path, "ok": False, "error_type": type(e).__name__, "error": f"워커 준비 실패: {e}"}
+    settings, glossary, matcher = _worker_state["settings"], _worker_state["glossary"], _worker_state["matcher"]
+    try:
+        if _worker_state["skip_completed"]:
+            chunks, completed = _chunks_with_progress(doc_path, settings)
+        else:
+            chunks, completed = prompt_core.chunk_document(doc_path, settings), set()
+        records = []
+        for index, chunk in enumerate(chunks):
+            if index in completed:
+                continue
+            terms = matcher.find_terms(chunk)
+            records.append({
+                "document": doc_path,
+                "chunk_index": index,
+                "chunk_count": len(chunks),
+                "glossary_terms": sorted(terms),
+                "prompt": render_prompt(_worker_state["prompt1"], english_chunk=chunk, glossary=prompt_core.format_chunk_glossary(glossary, terms)),
+            })
+        return {"document": doc_path, "ok": True, "records": records, "skipped": len(completed)}
+    except Exception as e:
+        return {"document": doc_path, "ok": False, "error_type": type(e).__name__, "error": str(e)}
+
+
+def _chunks_with_progress(doc_path, settings):
+    """
+    프로젝트 기록이 있으면 그 기록과 맞춰 (청크 목록, 이미 완료된 청크 번호) 를 반환합니다.
+    기록은 읽기 전용으로 열어 조회만 합니다. (GUI 가 쓰는 프로젝트 DB 를 만들거나 고치지 않음)
+    문서가 개정되었으면 바뀐 부분만 다시 나누므로, 나머지 완료된 청크는 그대로 건너뜁니다.
+    """
+    db_path = default_project_path(doc_path)
+    if not os.path.exists(db_path):
+        return prompt_core.chunk_document(doc_path, settings), set()
+    project = ProjectStore(db_path, read_only=True)
+    try:
+        return project.match_completed(doc_path, settings)
+    finally:
+        project.close()
+
+
+def find_documents(input_dir, recursive=False):
+    """입력 폴더에서 .docx 파일 목록을 정렬해 반환합니다. (Word 임시 파일 '~$' 제외)"""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(input_dir):
+        paths.extend(os.path.join(dirpath, name) for name in filenames
+                     if name.lower().endswith(".docx") and not name.startswith("~$"))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def prepare_glossary(glossary_path):
+    """
+    워커에 넘길 용어집 경로를 준비합니다. 읽을 수 없는 용어집은 예외로 알립니다.
+    큰 텍스트 용어집은 워커들이 동시에 색인을 만들지 않도록 여기서 한 번 만들어 두고 색인 경로를 반환합니다.
+    (run_batch 에 넘기기 전에 한 번 호출합니다)
+    """
+    glossary = open_glossary(glossary_path)
+    if isinstance(glossary, GlossaryIndex):
+        glossary_path = glossary.path; glossary.close()
+    return glossary_path
+
+
+def run_batch(doc_paths, settings, glossary_path, output_path, workers=None, skip_completed=False):
+    """
+    문서들을 병렬로 처리하고 결과를 JSONL 로 기록합니다.
+    glossary_path 는 prepare_glossary 로 준비된 경로여야 합니다.
+    청크 레코드와 오류 레코드({"document", "error_type", "error"})가 같은 파일에 기록됩니다.
+    skip_completed 이면 프로젝트 기록에서 이미 완료된 청크는 건너뜁니다.
+    반환값: (성공 문서 수, 실패 문서 수, 청크 수, 건너뛴 청크 수)
+    """
+    ok_docs = failed_docs = chunk_total = skipped_total = 0
+    with open(output_path, "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(settings, glossary_path, skip_completed)) as executor:
+        for result in executor.map(process_document, doc_paths, chunksize=4):
+            if result["ok"]:
+                ok_docs += 1
+                chunk_total += len(result["records"])
+                skipped_total += result["skipped"]
+                for record in result["records"]:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            else:
+                failed_docs += 1
+                out.write(json.dumps({k: result[k] for k in ("document", "error_type", "error")}, ensure_ascii=False) + "\n")
+                print(f"[오류] {result['document']}: {result['error']}", file=sys.stderr)
+    return ok_docs, failed_docs, chunk_total, skipped_total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="폴더 안의 .docx 문서에 대한 1단계 번역 프롬프트를 JSONL 로 일괄 생성합니다.")
+    parser.add_argument("input_dir", help=".docx 문서가 있는 폴더")
+    parser.add_argument("-g", "--glossary", help="번역 용어집 (.txt 또는 .kgi 색인)")
+    parser.add_argument("-c", "--config", help=f"설정 파일 (기본값: 프로그램 폴더의 {prompt_core.CONFIG_FILE_NAME})")
+    parser.add_argument("-o", "--output", default="prompts.jsonl", help="출력 JSONL 파일 (기본값: prompts.jsonl)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="병렬 프로세스 수 (기본값: CPU 수)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="하위 폴더까지 검색")
+    parser.add_argument("--chunk-size", type=int, default=None, help="청크 크기 (설정 파일 값을 덮어씀)")
+    parser.add_argument("--skip-completed", action="store_true", help="GUI/자동 번역에서 이미 완료한 청크는 건너뜀")
+    parser.add_argument("--token-budget", type=int, default=None, help="토큰 예산 기준으로 분할 (설정 파일 값을 덮어씀)")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = prompt_core.load_settings_from_json(args.config)
+    except Exception as e:
+        parser.error(f"설정 파일을 읽을 수 없습니다: {e}")
+    if args.chunk_size is not None:
+        settings["chunk_size"] = args.chunk_size
+    if args.token_budget is not None:
+        settings["chunk_mode"], settings["token_budget"] = prompt_core.CHUNK_MODE_TOKENS, args.token_budget
+    if settings["chunk_size"] <= 0 or settings["token_budget"] <= 0:
+        parser.error("청크 크기와 토큰 예산은 0보다 커야 합니다.")
+    try:
+        compile_template(settings["prompt1"], "prompt1")
+    except TemplateError as e:
+        parser.error(str(e))
+    if args.glossary and not os.path.exists(args.glossary):
+        parser.error(f"용어집 파일이 없습니다: {args.glossary}")
+    try:
+        glossary_path = prepare_glossary(args.glossary)
+    except Exception as e:
+        parser.error(f"용어집을 읽을 수 없습니다: {e}")
+
+    doc_paths = find_documents(args.input_dir, args.recursive)
+    if not doc_paths:
+        parser.error(f"'{args.input_dir}' 에서 .docx 파일을 찾지 못했습니다.")
+
+    ok_docs, failed_docs, chunk_total, skipped_total = run_batch(doc_paths, settings, glossary_path, args.output, args.workers, args.skip_completed)
+    skipped = f" (완료된 청크 {skipped_total}개 건너뜀)" if skipped_total else ""
+    print(f"완료: 문서 {ok_docs}개 성공, {failed_docs}개 실패, 청크 {chunk_total}개{skipped} → {args.output}", file=sys.stderr)
+    return 1 if failed_docs else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+성능 측정 도구 (GUI 없이 실행)
+
+합성 문서/용어집(synthetic_data)으로 주요 처리 경로의 시간과 메모리를 잽니다.
+- 문서: iter_all_text_blocks(python-docx), iter_docx_text_blocks(스트리밍), chunk_document_by_word_count, 토큰 예산 분할
+- 용어집: load_glossary, save_glossary, GlossaryMatcher 생성, 컴파일된 색인(.kgi) 만들기/열기/용어 찾기,
+  check_discrepancies 의 용어 검사(청크별 용어 찾기 + 불일치 확인), 문서 전체 용어 일관성 보고서(프로세스 병렬),
+  apply_suggestions 의 제안 줄 해석과 일괄 분류, 문서 전체 1단계 프롬프트 내보내기(write_prompts)
+각 항목은 반복 실행 중 가장 빠른 시간과 평균, 처리량(개/초, MB/초), tracemalloc 최대 메모리를 기록합니다.
+결과는 JSON 으로 저장되며, --compare 로 이전 결과와 비교할 수 있습니다.
+
+사용 예:
+    python benchmark.py                              # 기본 크기 (10·200쪽, 용어 1천·5만 개)
+    python benchmark.py --full -o base.json          # 2000쪽, 용어 50만 개까지
+    python benchmark.py --compare base.json          # 이전 결과 대비 시간 비율 출력
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import subprocess
+
+import prompt_core
+import synthetic_data
+from consistency_report import build_report
+from docx_stream import iter_docx_text_blocks
+from glossary_index import GlossaryIndex, compile_glossary
+from glossary_matcher import GlossaryMatcher
+from glossary_merge import merge_suggestion_text
+from prompt_template import write_prompts
+
+RESULT_FORMAT_VERSION = 1
+DEFAULT_PAGES = (10, 200)
+DEFAULT_TERMS = (1000, 50000)
+FULL_PAGES = (10, 200, 2000)
+FULL_TERMS = (1000, 50000, 500000)
+DEFAULT_WORK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_data")
+
+
+def measure(fn, repeat):
+    """
+    fn 을 repeat 번 실행해 (가장 빠른 시간, 평균 시간, 최대 메모리 바이트)를 반환합니다.
+    시간은 tracemalloc 없이 재고, 메모리는 별도로 한 번 더 실행해 잽니다.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), sum(times) / len(times), peak
+
+
+class Benchmark:
+    """측정 결과를 모으고 출력합니다."""
+
+    def __init__(self, repeat, only=None):
+        self.repeat, self.only, self.results = repeat, only, []
+
+    def run(self, name, params, fn, count_items, nbytes=None, unit="items"):
+        """
+        fn 을 측정해 결과 레코드를 추가합니다.
+        count_items: fn 의 반환값으로 처리 항목 수를 세는 함수, nbytes: 처리한 입력 크기(바이트)
+        """
+        if self.only and name not in self.only:
+            return
+        value = fn()  # 첫 실행 (준비 + 항목 수 계산)
+        items = count_items(value)
+        del value
+        best, mean, peak = measure(fn, self.repeat)
+        record = {
+            "benchmark": name, "params": params, "repeat": self.repeat,
+            "best_s": round(best, 6), "mean_s": round(mean, 6),
+            "items": items, "item_unit": unit, "items_per_s": round(items / best, 1) if best else None,
+            "bytes": nbytes, "mb_per_s": round(nbytes / best / 1e6, 2) if nbytes and best else None,
+            "peak_mem_bytes": peak,
+        }
+        self.results.append(record)
+        label = ", ".join(f"{k}={v}" for k, v in params.items())
+        mbps = f" {record['mb_per_s']:>8} MB/s" if record["mb_per_s"] is not None else " " * 14
+        print(f"{name:<28} {label:<24} {best * 1000:>10.1f} ms {record['items_per_s']:>12} {unit}/s{mbps} "
+              f"peak {peak / 2**20:>7.1f} MiB", file=sys.stderr)
+
+
+def prepare_document(work_dir, pages, seed):
+    """합성 문서를 만들거나, 이미 있으면 다시 사용합니다."""
+    path = os.path.join(work_dir, f"synthetic-{pages}p-s{seed}.docx")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        synthetic_data.make_docx(tmp, pages, seed)
+        os.replace(tmp, path)
+    return path
+
+
+def prepare_glossary(work_dir, terms):
+    path = os.path.join(work_dir, f"glossary-{terms}.txt")
+    glossary = synthetic_data.make_glossary(terms)
+    if not os.path.exists(path):
+        prompt_core.save_glossary(path, glossary)
+    return path, glossary
+
+
+def run_document_benchmarks(bench, doc_path, pages, chunk_size, token_budget):
+    import docx  # python-docx 경로 측정에만 필요
+    params, size = {"pages": pages}, os.path.getsize(doc_path)
+    bench.run("iter_all_text_blocks", params, lambda: list(prompt_core.iter_all_text_blocks(docx.Document(doc_path))),
+              len, size, "blocks")
+    bench.run("iter_docx_text_blocks", params, lambda: list(iter_docx_text_blocks(doc_path)), len, size, "blocks")
+    bench.run("chunk_document_by_word_count", {**params, "chunk_size": chunk_size},
+              lambda: prompt_core.chunk_document_by_word_count(doc_path, chunk_size), len, size, "chunks")
+    settings = {**prompt_core.default_settings(), "chunk_mode": prompt_core.CHUNK_MODE_TOKENS, "token_budget": token_budget, "tokenizer": "chars"}
+    bench.run("chunk_document_tokens", {**params, "token_budget": token_budget},
+              lambda: prompt_core.chunk_document(doc_path, settings), len, size, "chunks")
+
+
+def run_glossary_benchmarks(bench, work_dir, terms, chunks, scan_pages):
+    path, glossary = prepare_glossary(work_dir, terms)
+    params, size = {"terms": terms}, os.path.getsize(path)
+    bench.run("load_glossary", params, lambda: prompt_core.load_glossary(path), len, size, "terms")
+    out_path = os.path.join(work_dir, f"glossary-{terms}-save.txt")
+    bench.run("save_glossary", params, lambda: prompt_core.save_glossary(out_path, glossary) or glossary, len, size, "terms")
+    bench.run("glossary_matcher_build", params, lambda: GlossaryMatcher(glossary), lambda m: terms, None, "terms")
+
+    # check_discrepancies 와 같은 검사를 문서의 모든 청크에 대해 실행합니다.
+    matcher = GlossaryMatcher(glossary)
+    translations = [synthetic_data.make_translation_text(c, {t: glossary[t] for t in matcher.find_terms(c)}, seed=i)
+                    for i, c in enumerate(chunks)]
+    chunk_bytes = sum(len(c.encode("utf-8")) for c in chunks)
+
+    def scan():
+        return [prompt_core.find_glossary_mismatches(glossary, matcher.find_terms(c), t) for c, t in zip(chunks, translations)]
+    bench.run("check_discrepancies", {**params, "pages": scan_pages}, scan, len, chunk_bytes, "chunks")
+
+    index_path = os.path.join(work_dir, f"glossary-{terms}.kgi")
+    bench.run("glossary_index_build", params, lambda: compile_glossary(glossary, index_path), lambda n: n, size, "terms")
+    bench.run("glossary_index_open", params, lambda: GlossaryIndex(index_path), len, None, "terms")
+    with GlossaryIndex(index_path) as index:
+        bench.run("glossary_index_find_terms", {**params, "pages": scan_pages}, lambda: [index.find_terms(c) for c in chunks],
+                  len, chunk_bytes, "chunks")
+    glossary_texts = [prompt_core.format_chunk_glossary(glossary, matcher.find_terms(c)) for c in chunks]
+    template = prompt_core.default_settings()["prompt1"]
+    rows = lambda: ({"english_chunk": c, "glossary": g} for c, g in zip(chunks, glossary_texts))
+    bench.run("write_prompts", {**params, "pages": scan_pages}, lambda: write_prompts(io.StringIO(), template, rows(), len(chunks)),
+              lambda n: n, chunk_bytes, "prompts")
+    items = [(i, c, t, []) for i, (c, t) in enumerate(zip(chunks, translations))]
+    bench.run("consistency_report", {**params, "pages": scan_pages, "workers": os.cpu_count()},
+              lambda: build_report(items, glossary), lambda report: len(items), chunk_bytes, "chunks")
+
+    text = synthetic_data.make_suggestion_text(terms)
+    bench.run("parse_suggestion_lines", {"lines": terms}, lambda: prompt_core.parse_suggestion_lines(text),
+              len, len(text.encode("utf-8")), "lines")
+    bench.run("merge_suggestions", {"lines": terms}, lambda: merge_suggestion_text(text, glossary, matcher)[1],
+              len, len(text.encode("utf-8")), "lines")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    """이전 결과 파일과 같은 항목(이름 + 인자)의 가장 빠른 시간 비율을 출력합니다. (1 보다 크면 느려짐)"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["benchmark"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]}
+    print(f"\n이전 결과 대비 ({baseline_path}):", file=sys.stderr)
+    for r in results:
+        old = baseline.get((r["benchmark"], json.dumps(r["params"], sort_keys=True)))
+        if old and old["best_s"]:
+            ratio = r["best_s"] / old["best_s"]
+            mark = "  느려짐" if ratio > 1.1 else ("  빨라짐" if ratio < 0.9 else "")
+            print(f"  {r['benchmark']:<28} {json.dumps(r['params'], ensure_ascii=False):<40} ×{ratio:.2f}{mark}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="합성 문서/용어집으로 주요 처리 경로의 성능을 측정합니다.")
+    parser.add_argument("--pages", type=int, nargs="+", help=f"문서 쪽 수 목록 (기본값: {' '.join(map(str, DEFAULT_PAGES))})")
+    parser.add_argument("--terms", type=int, nargs="+", help=f"용어집 용어 수 목록 (기본값: {' '.join(map(str, DEFAULT_TERMS))})")
+    parser.add_argument("--full", action="store_true", help=f"큰 크기까지 측정 (쪽 {FULL_PAGES[-1]}, 용어 {FULL_TERMS[-1]})")
+    parser.add_argument("--repeat", type=int, default=3, help="항목별 반복 횟수 (기본값: 3)")
+    parser.add_argument("--only", nargs="+", help="측정할 항목 이름")
+    parser.add_argument("--chunk-size", type=int, default=400, help="단어 수 분할 크기 (기본값: 400)")
+    parser.add_argument("--token-budget", type=int, default=1500, help="토큰 예산 분할 크기 (기본값: 1500)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="합성 파일을 만들어 두는 폴더")
+    parser.add_argument("-o", "--output", help="결과 JSON 파일 (기본값: 작업 폴더의 results-<시각>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    args = parser.parse_args(argv)
+    if args.repeat <= 0:
+        parser.error("반복 횟수는 0보다 커야 합니다.")
+
+    pages = args.pages or (FULL_PAGES if args.full else DEFAULT_PAGES)
+    terms = args.terms or (FULL_TERMS if args.full else DEFAULT_TERMS)
+    os.makedirs(args.work_dir, exist_ok=True)
+    bench = Benchmark(args.repeat, set(args.only) if args.only else None)
+
+    docs = {}
+    for n in pages:
+        docs[n] = prepare_document(args.work_dir, n, args.seed)
+        run_document_benchmarks(bench, docs[n], n, args.chunk_size, args.token_budget)
+
+    # 용어 검사는 가장 작은 문서의 청크로 잽니다. (용어집 크기에 따른 변화를 보기 위함)
+    scan_pages = min(pages)
+    chunks = prompt_core.chunk_document_by_word_count(docs[scan_pages], args.chunk_size)
+    for n in terms:
+        run_glossary_benchmarks(bench, args.work_dir, n, chunks, scan_pages)
+
+    report = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {"pages": list(pages), "terms": list(terms), "repeat": args.repeat, "seed": args.seed,
+                     "chunk_size": args.chunk_size, "token_budget": args.token_budget},
+        "results": bench.results,
+    }
+    output = args.output or os.path.join(args.work_dir, f"results-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {output}", file=sys.stderr)
+    if args.compare:
+        compare(bench.results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
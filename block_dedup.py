@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+반복 블록 제거 (추출 → 분할 사이 단계)
+
+섹션마다 반복되는 머리글/바닥글, 텍스트 상자 문단의 재출력, 반복되는 안내문/표 머리글 등
+같은 블록이 여러 번 나오면 처음 한 번만 청크에 넣습니다.
+- 비교는 공백을 정리한 블록 텍스트의 해시(16바이트)로 하므로, 블록 텍스트 자체는 보관하지 않습니다.
+- 원래 블록 위치마다 어느 고유 블록인지 기록해 두었다가(block_map), 번역을 모든 위치로 다시 펼칠 수 있습니다.
+"""
+
+import hashlib
+from array import array
+
+
+def normalize_block(text):
+    return " ".join(text.split())
+
+
+def _block_key(text):
+    return hashlib.blake2b(normalize_block(text).encode("utf-8"), digest_size=16).digest()
+
+
+def _words(text):
+    return len(text.split())
+
+
+def count_packed_chunks(sizes, target):
+    """크기 목록을 iter_chunks_by_word_count 와 같은 방식으로 묶었을 때의 청크 수."""
+    chunks = current = 0
+    for size in sizes:
+        if current > 0 and current + size > target:
+            chunks += 1; current = 0
+        current += size
+    return chunks + (1 if current else 0)
+
+
+class BlockDeduper:
+    """
+    텍스트 블록 스트림에서 처음 나온 블록만 내보내고, 모든 블록 위치의 고유 블록 번호를 기록합니다.
+    한 문서에 하나씩 만들어 filter() 를 한 번만 소비하세요.
+    """
+
+    def __init__(self):
+        self._index = {}                # 블록 해시 -> 고유 블록 번호
+        self.positions = array("i")     # 원래 블록 위치별 고유 블록 번호 (빈 블록은 -1)
+        self.words = array("I")         # 비어 있지 않은 모든 블록의 단어 수 (순서대로)
+        self.unique_words = array("I")  # 고유 블록별 단어 수
+        self.unique_lines = array("I")  # 고유 블록별 줄 수 (청크 안에서 블록 경계를 찾을 때 사용)
+
+    def filter(self, blocks):
+        """처음 나온 (앞뒤 공백을 없앤) 블록만 내보냅니다. 빈 블록은 내보내지 않습니다."""
+        for text in blocks:
+            text = text.strip()
+            if not text:
+                self.positions.append(-1)
+                continue
+            words = _words(text)
+            self.words.append(words)
+            key = _block_key(text)
+            index = self._index.get(key)
+            if index is None:
+                index = self._index[key] = len(self.unique_words)
+                self.unique_words.append(words); self.unique_lines.append(text.count("\n") + 1)
+                self.positions.append(index)
+                yield text
+            else:
+                self.positions.append(index)
+
+    def stats(self, chunk_count, target_words=None):
+        """
+        줄어든 양. target_words(단어 수 분할 기준)가 있으면 반복 블록을 넣었을 때의 청크 수를 다시 계산하고,
+        없으면(토큰 예산 분할) 단어 비율로 어림합니다.
+        """
+        total, unique = sum(self.words), sum(self.unique_words)
+        if target_words:
+            saved_chunks = count_packed_chunks(self.words, target_words) - count_packed_chunks(self.unique_words, target_words)
+        else:
+            saved_chunks = round(chunk_count * (total - unique) / unique) if unique else 0
+        return {"blocks": len(self.words), "unique_blocks": len(self.unique_words), "words": total,
+                "saved_words": total - unique, "saved_chunks": max(0, saved_chunks), "estimated": not target_words}
+
+    def block_map(self):
+        """번역을 펼칠 때 쓰는 JSON 저장용 기록."""
+        return {"positions": self.positions.tolist(), "unique_lines": self.unique_lines.tolist()}
+
+
+def split_unique_blocks(block_map, chunks, finals):
+    """
+    단어 수 분할 청크(고유 블록을 '\n' 으로 이은 것)와 청크별 최종 번역을 고유 블록별 [(원문, 번역), ...] 으로 나눕니다.
+    번역의 (빈 줄을 뺀) 줄 수가 원문 줄 수와 같은 청크만 블록 단위로 나눌 수 있고, 나머지 블록의 번역은 None 입니다.
+    """
+    lines_per_block = block_map["unique_lines"]
+    result = []
+    for chunk, final in zip(chunks, finals):
+        src_lines = chunk.split("\n")
+        tgt_lines = [line for line in final.split("\n") if line.strip()] if final else None
+        aligned = tgt_lines is not None and len(tgt_lines) == len(src_lines)
+        line = 0
+        while line < len(src_lines) and len(result) < len(lines_per_block):
+            n = lines_per_block[len(result)]
+            result.append(("\n".join(src_lines[line:line + n]), "\n".join(tgt_lines[line:line + n]).strip() if aligned else None))
+            line += n
+    return result
+
+
+def expand_translations(block_map, unique_blocks):
+    """고유 블록별 (원문, 번역) 을 원래 블록 위치별 목록으로 펼칩니다. (빈 블록은 None)"""
+    return [unique_blocks[i] if 0 <= i < len(unique_blocks) else None for i in block_map["positions"]]
+
+
+def iter_expanded_records(block_map, chunks, finals):
+    """원래 블록 위치마다 {"position", "block", "source", "translation"} 을 내보냅니다. (빈 블록 제외, 결과 저장용)"""
+    unique = split_unique_blocks(block_map, chunks, finals)
+    for position, index in enumerate(block_map["positions"]):
+        if 0 <= index < len(unique):
+            source, translation = unique[index]
+            yield {"position": position, "block": index, "source": source, "translation": translation}
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+청크 캐시
+
+문서를 청크로 나눈 결과를 설정 파일(CustomPrompt.json) 옆의 캐시 폴더에 저장해 두고,
+같은 문서를 같은 청크 설정으로 다시 불러올 때 추출/분할 과정을 건너뜁니다.
+
+- 키: 문서 내용의 SHA-256 + 청크 설정(prompt_core.chunking_key) + 추출기 버전 (문서가 바뀌면 키가 바뀌어 자동으로 무효화)
+- 형식: 헤더 + 오프셋 배열 + UTF-8 본문을 이어 붙인 단일 파일. 청크 문자열은 접근할 때 디코딩합니다.
+- 용량: 전체 크기가 상한을 넘으면 가장 오래 사용하지 않은 항목부터 삭제(LRU)합니다.
+"""
+
+import os
+import json
+import time
+import struct
+import hashlib
+from array import array
+from collections.abc import Sequence
+
+from docx_stream import EXTRACTOR_VERSION
+from prompt_core import get_config_path
+
+CACHE_DIR_NAME = "chunk_cache"
+INDEX_FILE_NAME = "index.json"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+USED_RESOLUTION_S = 3600  # 캐시 적중 시 마지막 사용 시각은 이보다 오래됐을 때만 색인에 다시 기록
+
+_MAGIC = b"KCC1"
+_HEADER = struct.Struct("<4sI")  # 매직, 청크 수
+
+
+def default_cache_dir():
+    return os.path.join(os.path.dirname(get_config_path()), CACHE_DIR_NAME)
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            h.update(block)
+    return h.hexdigest()
+
+
+class CachedChunks(Sequence):
+    """캐시 파일 내용 위에서 동작하는 읽기 전용 청크 목록. 각 청크는 접근할 때 디코딩됩니다."""
+
+    def __init__(self, data):
+        magic, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("청크 캐시 형식이 올바르지 않습니다.")
+        self._view = memoryview(data)
+        self._offsets = array("Q")
+        table_end = _HEADER.size + (count + 1) * self._offsets.itemsize
+        if len(data) < table_end:
+            raise ValueError("청크 캐시 파일이 손상되었습니다.")
+        self._offsets.frombytes(self._view[_HEADER.size:table_end])
+        self._base = table_end
+        if self._base + self._offsets[-1] != len(data):
+            raise ValueError("청크 캐시 파일이 손상되었습니다.")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("청크 인덱스가 범위를 벗어났습니다.")
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return str(self._view[self._base + start:self._base + end], "utf-8")
+
+
+def encode_chunks(chunks):
+    """청크 목록을 캐시 파일 형식(bytes)으로 직렬화합니다."""
+    encoded = [c.encode("utf-8") for c in chunks]
+    offsets = array("Q", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return _HEADER.pack(_MAGIC, len(encoded)) + offsets.tobytes() + b"".join(encoded)
+
+
+class ChunkCache:
+    """
+    디스크 청크 캐시.
+    index.json 에 항목별 크기와 마지막 사용 시각, 문서 경로별 (크기, 수정 시각, 해시)를 기록합니다.
+    문서의 크기와 수정 시각이 그대로면 해시 계산도 건너뜁니다.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(self.cache_dir, INDEX_FILE_NAME)
+        self._index = None
+        self._hash_memo = {}
+
+    # --- 색인 ---
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+            self._index.setdefault("entries", {})
+            self._index.setdefault("sources", {})
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".chunks")
+
+    def _content_hash(self, doc_path):
+        """문서 내용 해시. (크기/수정 시각이 기록과 같으면 기록된 해시를 재사용)"""
+        st = os.stat(doc_path)
+        abs_path = os.path.abspath(doc_path)
+        source = self._load_index()["sources"].get(abs_path)
+        if source and source["size"] == st.st_size and source["mtime_ns"] == st.st_mtime_ns:
+            return source["sha256"]
+        memo_key = (abs_path, st.st_size, st.st_mtime_ns)
+        if memo_key not in self._hash_memo:
+            self._hash_memo = {memo_key: file_sha256(doc_path)}
+        return self._hash_memo[memo_key]
+
+    def make_key(self, doc_path, chunk_key):
+        return f"{self._content_hash(doc_path)}-{chunk_key}-v{EXTRACTOR_VERSION}"
+
+    def _remove_entry(self, key):
+        self._load_index()["entries"].pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    # --- 조회/저장 ---
+    def get(self, doc_path, chunk_key):
+        """캐시된 청크 목록(CachedChunks)을 반환합니다. 없거나 손상되었으면 None."""
+        index = self._load_index()
+        key = self.make_key(doc_path, chunk_key)
+        if key not in index["entries"]:
+            return None
+        try:
+            with open(self._entry_path(key), "rb") as f:
+                chunks = CachedChunks(f.read())
+        except (OSError, ValueError, struct.error):
+            self._remove_entry(key); self._save_index()
+            return None
+        st = os.stat(doc_path)
+        source = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": key.split("-", 1)[0]}
+        entry, now = index["entries"][key], time.time()
+        changed = index["sources"].get(os.path.abspath(doc_path)) != source or now - entry["used"] >= USED_RESOLUTION_S
+        index["sources"][os.path.abspath(doc_path)] = source
+        entry["used"] = now
+        if changed:
+            self._save_index()
+        return chunks
+
+    def put(self, doc_path, chunk_key, chunks):
+        """청크 목록을 저장하고, 같은 문서의 이전 버전 항목과 용량 초과 항목을 정리합니다."""
+        index = self._load_index()
+        st = os.stat(doc_path)
+        sha = self._content_hash(doc_path)
+        key = f"{sha}-{chunk_key}-v{EXTRACTOR_VERSION}"
+        data = encode_chunks(chunks)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._entry_path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._entry_path(key))
+
+        # 원본이 바뀌었다면 이전 내용의 항목은 더 이상 쓰이지 않으므로 바로 삭제
+        abs_path = os.path.abspath(doc_path)
+        old = index["sources"].get(abs_path)
+        if old and old["sha256"] != sha:
+            for old_key in [k for k in index["entries"] if k.startswith(old["sha256"] + "-")]:
+                self._remove_entry(old_key)
+        index["sources"][abs_path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        index["entries"][key] = {"bytes": len(data), "used": time.time()}
+        self._evict()
+        self._save_index()
+
+    def _evict(self):
+        entries = self._load_index()["entries"]
+        total = sum(e["bytes"] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]["bytes"]
+            self._remove_entry(key)
+        live = {k.split("-", 1)[0] for k in entries}
+        sources = self._index["sources"]
+        for path in [p for p, s in sources.items() if s["sha256"] not in live]:
+            del sources[path]
+
+    def load_or_chunk(self, doc_path, chunk_key, chunker):
+        """캐시에 있으면 캐시된 청크를, 없으면 chunker() 결과를 저장 후 반환합니다."""
+        try:
+            if (cached := self.get(doc_path, chunk_key)) is not None:
+                return cached
+        except OSError:
+            pass
+        chunks = chunker()
+        if chunks:
+            try:
+                self.put(doc_path, chunk_key, chunks)
+            except OSError:
+                pass  # 캐시 저장 실패는 불러오기 결과에 영향을 주지 않습니다.
+        return chunks
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+블록 지문 기반 청크 배치와 개정판 증분 분할
+
+문서의 새 판을 불러올 때 전체를 다시 나누면 청크 경계가 밀려, 수정된 곳 뒤의 완료된 청크까지 모두 어긋납니다.
+여기서는 청크를 분할 입력 블록의 지문(blake2b 8바이트)에 묶어 기록해 두고(ChunkLayout),
+새 판의 블록 지문 목록을 저장된 목록과 비교해 바뀌거나 새로 들어간 구간만 다시 나눕니다.
+- 블록이 모두 바뀌지 않은 구간에 있는 청크는 텍스트가 그대로이므로 번호만 옮기고 진행 상황을 유지합니다.
+- 비교는 공통 앞/뒤를 잘라낸 가운데 부분에만 difflib 을 쓰므로, 블록 추출을 빼면 비용이 수정 범위에 비례합니다.
+- 단어 수 분할만 지원합니다. 토큰 예산 분할은 큰 블록을 쪼개고 겹침 문맥을 넣어 청크가 블록 경계와 맞지 않으므로,
+  전처럼 전체를 다시 나누고 청크 텍스트 해시로 진행 상황을 맞춥니다.
+tkinter 를 사용하지 않습니다.
+"""
+
+import hashlib
+from array import array
+from difflib import SequenceMatcher
+
+from perf_trace import span
+from prompt_core import iter_block_groups_by_word_count
+
+FINGERPRINT_SIZE = 8
+
+
+def block_fingerprint(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=FINGERPRINT_SIZE).digest()
+
+
+class ChunkLayout:
+    """
+    청크별로 어느 분할 입력 블록을 담는지에 대한 기록. (단어 수 분할)
+    key: 분할 설정 식별값(prompt_core.chunking_key), fingerprints: 블록 지문을 순서대로 이은 bytes,
+    ends: 청크별 끝 블록 번호 (청크 i 는 블록 ends[i-1] ~ ends[i]-1)
+    """
+
+    def __init__(self, key, fingerprints=b"", ends=b""):
+        self.key = key
+        self.fingerprints = bytearray(fingerprints)
+        self.ends = array("I")
+        self.ends.frombytes(ends)
+
+    @property
+    def block_count(self):
+        return len(self.fingerprints) // FINGERPRINT_SIZE
+
+    @property
+    def chunk_count(self):
+        return len(self.ends)
+
+    def fingerprint_list(self):
+        data = bytes(self.fingerprints)
+        return [data[i:i + FINGERPRINT_SIZE] for i in range(0, len(data), FINGERPRINT_SIZE)]
+
+    def chunk_range(self, index):
+        return (self.ends[index - 1] if index else 0), self.ends[index]
+
+    def record(self, groups):
+        """블록 묶음(prompt_core.iter_block_groups_by_word_count)을 청크로 이어 내보내면서 배치를 기록합니다."""
+        for group in groups:
+            for block in group:
+                self.fingerprints += block_fingerprint(block)
+            self.ends.append(self.block_count)
+            yield "\n".join(group)
+
+
+def collect_blocks(text_blocks):
+    """분할기와 같은 규칙으로, 앞뒤 공백을 없앤 비어 있지 않은 블록 목록을 만듭니다."""
+    return [text for text in (block.strip() for block in text_blocks) if text]
+
+
+def diff_blocks(old, new):
+    """
+    블록 지문 목록 old 와 new 의 일치 구간 [(old 시작, new 시작, 길이), ...] 을 순서대로 반환합니다.
+    공통 앞/뒤는 바로 일치 구간으로 두고, 나머지 가운데 부분만 SequenceMatcher 로 비교합니다.
+    """
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    matches = [(0, 0, prefix)] if prefix else []
+    middle_old, middle_new = old[prefix:len(old) - suffix], new[prefix:len(new) - suffix]
+    if middle_old and middle_new:
+        for a, b, size in SequenceMatcher(None, middle_old, middle_new, autojunk=False).get_matching_blocks():
+            if size:
+                matches.append((prefix + a, prefix + b, size))
+    if suffix:
+        matches.append((len(old) - suffix, len(new) - suffix, suffix))
+    return matches
+
+
+def rechunk_revision(previous, blocks, target_words):
+    """
+    이전 배치(previous)와 새 판의 블록 목록(collect_blocks 결과)으로 청크를 다시 만듭니다.
+    블록이 모두 한 일치 구간 안에 있는 이전 청크는 그대로 두고, 그 사이에 남은 구간만 단어 수 기준으로 다시 나눕니다.
+    반환값: (chunks, layout, revision)
+        revision = {"origins": 새 청크별 이전 청크 번호(다시 나눈 청크는 None), "kept", "rechunked", "removed"}
+    """
+    with span("rechunk_revision", blocks=len(blocks)) as sp:
+        fingerprints = [block_fingerprint(block) for block in blocks]
+        matches = diff_blocks(previous.fingerprint_list(), fingerprints)
+
+        kept, m = [], 0  # (이전 청크 번호, 새 시작 블록, 새 끝 블록)
+        for index in range(previous.chunk_count):
+            start, end = previous.chunk_range(index)
+            while m < len(matches) and matches[m][0] + matches[m][2] <= start:
+                m += 1
+            if m < len(matches) and matches[m][0] <= start and end <= matches[m][0] + matches[m][2]:
+                shift = matches[m][1] - matches[m][0]
+                kept.append((index, start + shift, end + shift))
+
+        layout = ChunkLayout(previous.key, b"".join(fingerprints))
+        chunks, origins, position = [], [], 0
+        for index, start, end in kept + [(None, len(blocks), len(blocks))]:
+            for group in iter_block_groups_by_word_count(blocks[position:start], target_words):
+                position += len(group)
+                chunks.append("\n".join(group)); layout.ends.append(position); origins.append(None)
+            if index is not None:
+                chunks.append("\n".join(blocks[start:end])); layout.ends.append(end); origins.append(index)
+            position = end
+        revision = {"origins": origins, "kept": len(kept), "rechunked": len(origins) - len(kept),
+                    "removed": previous.chunk_count - len(kept)}
+        sp.set(**{k: v for k, v in revision.items() if k != "origins"})
+    return chunks, layout, revision
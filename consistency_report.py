@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+문서 전체 용어 일관성 보고서
+
+확정된 번역(final)이 있는 모든 청크를 한 번에 검사해, 정렬 가능한 CSV/JSON 보고서를 만듭니다.
+- missing: 원문에 용어집 용어가 있는데 번역에 용어집의 한국어 번역이 없는 경우
+- inconsistent: 같은 원문 용어가 청크마다 다른 한국어로 번역된 경우
+  (용어집 번역이 들어간 청크와, 3단계에서 추출한 청크별 용어 제안을 근거로 합니다)
+- untranslated: 번역에 영어 그대로 남은, 용어집에 없는 원문 용어 (여러 청크에 나오면 용어집 후보)
+청크 묶음을 프로세스 풀에 나누어 검사하며, 워커마다 용어 매처를 한 번만 만듭니다.
+tkinter 를 사용하지 않습니다.
+
+사용 예:
+    python consistency_report.py 원문.docx -g "Translation glossary.txt" -o report.csv
+    python consistency_report.py translations.jsonl -g "Translation glossary.txt" -o report.json
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import prompt_core
+from glossary_index import GlossaryIndex, open_glossary, matcher_for
+from glossary_merge import normalize_term
+from perf_trace import span
+
+KIND_MISSING, KIND_INCONSISTENT, KIND_UNTRANSLATED = "missing", "inconsistent", "untranslated"
+REPORT_COLUMNS = ("kind", "term", "glossary", "renderings", "chunk_count", "chunks")
+
+# 한 번에 워커로 보내는 청크 수, 이보다 적으면 프로세스 풀 없이 검사합니다.
+BATCH_SIZE = 256
+# 영어가 그대로 남은 구간 중 이 단어 수 이하만 용어로 봅니다. (긴 구간은 번역되지 않은 문장)
+MAX_TERM_WORDS = 5
+DEFAULT_MIN_CHUNKS = 2
+
+LATIN_RUN_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9&'./+-]*(?:[ \t]+[A-Za-z0-9][A-Za-z0-9&'./+-]*)*")
+
+# 워커 프로세스마다 한 번만 준비하는 상태 (initializer 에서 설정)
+_worker_state = {}
+
+
+def _init_worker(glossary):
+    _worker_state["glossary"] = glossary
+    _worker_state["matcher"] = matcher_for(glossary)
+
+
+def _term_key(term):
+    return normalize_term(term).lower()
+
+
+def _untranslated_runs(final, matcher):
+    """번역문에서 영어가 그대로 남은 구간. 용어집 용어 부분은 잘라냅니다. (누락 검사에서 따로 보고)"""
+    for match in LATIN_RUN_PATTERN.finditer(final):
+        run, position = match.group(), 0
+        for start, end, _ in sorted(matcher.iter_matches(run)):
+            yield run[position:start].strip(" \t.'-")
+            position = max(position, end)
+        yield run[position:].strip(" \t.'-")
+
+
+def check_chunks(items, glossary, matcher):
+    """
+    청크 묶음 [(번호, 원문, 최종 번역, 용어 제안 [(eng, kor), ...]), ...] 을 검사한 부분 결과.
+    반환값: {"missing": {용어: [번호]}, "renderings": {키: {kor: [번호]}}, "names": {키: 용어},
+             "untranslated": {키: [번호]}, "checked": 청크 수}
+    """
+    missing, renderings, names, untranslated = {}, {}, {}, {}
+    for index, source, final, suggestions in items:
+        terms = matcher.find_terms(source)
+        for eng in terms:
+            kor = glossary[eng]
+            if kor in final:
+                key = _term_key(eng)
+                names.setdefault(key, eng)
+                renderings.setdefault(key, {}).setdefault(kor, []).append(index)
+            else:
+                missing.setdefault(eng, []).append(index)
+        for eng, kor in suggestions:
+            key = _term_key(eng)
+            names.setdefault(key, eng)
+            chunks = renderings.setdefault(key, {}).setdefault(kor, [])
+            if not chunks or chunks[-1] != index:
+                chunks.append(index)
+        seen = set()
+        for term in _untranslated_runs(final, matcher):
+            key = _term_key(term)
+            if not term or key in seen or len(term.split()) > MAX_TERM_WORDS or term not in source:
+                continue
+            seen.add(key)
+            names.setdefault(key, term)
+            untranslated.setdefault(key, []).append(index)
+    return {"missing": missing, "renderings": renderings, "names": names, "untranslated": untranslated, "checked": len(items)}
+
+
+def _check_batch(items):
+    return check_chunks(items, _worker_state["glossary"], _worker_state["matcher"])
+
+
+def _merge(total, part):
+    for eng, chunks in part["missing"].items():
+        total["missing"].setdefault(eng, []).extend(chunks)
+    for key, by_kor in part["renderings"].items():
+        target = total["renderings"].setdefault(key, {})
+        for kor, chunks in by_kor.items():
+            target.setdefault(kor, []).extend(chunks)
+    for key, name in part["names"].items():
+        total["names"].setdefault(key, name)
+    for key, chunks in part["untranslated"].items():
+        total["untranslated"].setdefault(key, []).extend(chunks)
+    total["checked"] += part["checked"]
+
+
+def build_report(items, glossary, workers=None, min_chunks=DEFAULT_MIN_CHUNKS, matcher=None):
+    """
+    확정된 번역이 있는 청크 목록(items, check_chunks 형식)을 검사해 보고서를 만듭니다.
+    workers: 프로세스 수 (기본값: CPU 수, 1 이면 현재 프로세스에서 검사). matcher 는 현재 프로세스에서 검사할 때만 사용합니다.
+    min_chunks: untranslated 항목으로 보고할 최소 청크 수
+    반환값: {"summary": {...}, "rows": [{kind, term, glossary, renderings, chunk_count, chunks}, ...]}
+    """
+    items = list(items)
+    total = {"missing": {}, "renderings": {}, "names": {}, "untranslated": {}, "checked": 0}
+    batches = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+    with span("consistency_report", chunks=len(items), terms=len(glossary)) as sp:
+        if workers == 1 or len(batches) <= 1:
+            matcher = matcher or matcher_for(glossary)
+            for batch in batches:
+                _merge(total, check_chunks(batch, glossary, matcher))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(glossary,)) as executor:
+                for part in executor.map(_check_batch, batches):
+                    _merge(total, part)
+        rows = _report_rows(total, glossary, min_chunks)
+        summary = {"chunks": total["checked"], KIND_MISSING: 0, KIND_INCONSISTENT: 0, KIND_UNTRANSLATED: 0}
+        for row in rows:
+            summary[row["kind"]] += 1
+        sp.set(**summary)
+    return {"summary": summary, "rows": rows}
+
+
+def _folded_lookup(glossary):
+    """대소문자/공백을 무시하고 용어의 용어집 번역을 찾는 함수. 색인은 전체를 순회하지 않고 조회합니다."""
+    if isinstance(glossary, GlossaryIndex):
+        return lambda name: next((glossary[t] for t in sorted(glossary.lookup(normalize_term(name)))), "")
+    folded_glossary = {}
+    for eng, kor in glossary.items():
+        folded_glossary.setdefault(_term_key(eng), kor)
+    return lambda name: folded_glossary.get(_term_key(name), "")
+
+
+def _report_rows(total, glossary, min_chunks):
+    folded_lookup = _folded_lookup(glossary)
+    rows = []
+    for eng, chunks in total["missing"].items():
+        rows.append({"kind": KIND_MISSING, "term": eng, "glossary": glossary[eng], "renderings": {},
+                     "chunk_count": len(chunks), "chunks": sorted(chunks)})
+    for key, by_kor in total["renderings"].items():
+        if len(by_kor) < 2:
+            continue
+        chunks = sorted({i for found in by_kor.values() for i in found})
+        renderings = {kor: len(found) for kor, found in sorted(by_kor.items(), key=lambda kv: -len(kv[1]))}
+        rows.append({"kind": KIND_INCONSISTENT, "term": total["names"][key], "glossary": folded_lookup(total["names"][key]),
+                     "renderings": renderings, "chunk_count": len(chunks), "chunks": chunks})
+    for key, chunks in total["untranslated"].items():
+        if len(chunks) >= min_chunks:
+            rows.append({"kind": KIND_UNTRANSLATED, "term": total["names"][key], "glossary": "", "renderings": {},
+                         "chunk_count": len(chunks), "chunks": sorted(chunks)})
+    order = {KIND_MISSING: 0, KIND_INCONSISTENT: 1, KIND_UNTRANSLATED: 2}
+    rows.sort(key=lambda row: (order[row["kind"]], -row["chunk_count"], row["term"].lower()))
+    return rows
+
+
+# ==============================================================================
+# 입력과 출력
+# ==============================================================================
+
+def items_from_states(chunks, states):
+    """청크 목록과 프로젝트 상태(ProjectStore.iter_states, 파이프라인 결과)에서 확정된 번역이 있는 청크만 고릅니다."""
+    items = []
+    for state in states:
+        index = state["index"]
+        if state.get("final") and index < len(chunks):
+            items.append((index, chunks[index], state["final"], [tuple(pair) for pair in state.get("suggestions") or []]))
+    return items
+
+
+def items_from_results(path):
+    """자동 번역 결과 JSONL(translation_pipeline -o)에서 검사할 청크를 읽습니다."""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("final"):
+                items.append((record["index"], record["english_chunk"], record["final"],
+                              [tuple(pair) for pair in record.get("suggestions") or []]))
+    return items
+
+
+def write_report(report, path):
+    """확장자가 .json 이면 JSON, 그 밖에는 CSV(엑셀에서 바로 열리도록 UTF-8 BOM)로 저장합니다."""
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        return
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        for row in report["rows"]:
+            writer.writerow((row["kind"], row["term"], row["glossary"],
+                             "; ".join(f"{kor} ({count})" for kor, count in row["renderings"].items()),
+                             row["chunk_count"], " ".join(map(str, row["chunks"]))))
+
+
+def format_summary(summary):
+    return (f"청크 {summary['chunks']:,}개 검사: 용어집 번역 누락 {summary[KIND_MISSING]:,}개, "
+            f"번역 불일치 {summary[KIND_INCONSISTENT]:,}개, 영어로 남은 용어 후보 {summary[KIND_UNTRANSLATED]:,}개")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="확정된 번역 전체에 대한 용어 일관성 보고서(CSV/JSON)를 만듭니다.")
+    parser.add_argument("source", help="영어 원문(.docx, 프로젝트 기록을 사용) 또는 자동 번역 결과(.jsonl)")
+    parser.add_argument("-g", "--glossary", required=True, help="번역 용어집 (.txt 또는 .kgi 색인)")
+    parser.add_argument("-c", "--config", help=f"설정 파일 (기본값: 프로그램 폴더의 {prompt_core.CONFIG_FILE_NAME})")
+    parser.add_argument("-o", "--output", default="consistency_report.csv", help="보고서 파일 (.csv 또는 .json, 기본값: consistency_report.csv)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="병렬 프로세스 수 (기본값: CPU 수)")
+    parser.add_argument("--min-chunks", type=int, default=DEFAULT_MIN_CHUNKS, help=f"영어로 남은 용어 후보의 최소 청크 수 (기본값: {DEFAULT_MIN_CHUNKS})")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.glossary):
+        parser.error(f"용어집 파일이 없습니다: {args.glossary}")
+    glossary = open_glossary(args.glossary)
+    if args.source.lower().endswith(".jsonl"):
+        items = items_from_results(args.source)
+    else:
+        from project_store import ProjectStore, default_project_path
+        if not os.path.exists(default_project_path(args.source)):
+            parser.error(f"작업 기록이 없습니다. 먼저 GUI 나 자동 번역으로 번역하세요: {args.source}")
+        settings = prompt_core.load_settings_from_json(args.config)
+        project = ProjectStore.for_document(args.source)
+        try:
+            chunks, _ = project.chunk_and_sync(args.source, settings)
+            items = items_from_states(chunks, project.iter_states())
+        finally:
+            project.close()
+    if not items:
+        parser.error("확정된 번역이 있는 청크가 없습니다.")
+
+    report = build_report(items, glossary, args.workers, args.min_chunks)
+    write_report(report, args.output)
+    print(f"{format_summary(report['summary'])} → {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+문서/용어집 백그라운드 불러오기
+
+GUI 의 '불러오기' 작업(용어집 읽기, 용어 매처 생성, 문서 분할, 청크별 등장 용어 계산)을 작업 스레드에서 실행합니다.
+tkinter 와 messagebox 를 사용하지 않으며, 진행 상황과 결과는 모두 events 큐에 (종류, 값) 으로 넣습니다.
+GUI 는 root.after 로 큐를 읽어 반영하므로, 첫 청크가 준비되는 즉시 작업을 시작할 수 있습니다.
+
+이벤트:
+    ("glossary", (store, glossary, matcher, error))  용어집 읽기 완료. error 는 오류 메시지 또는 None
+    ("revision", (layout, revision))                 개정판 증분 분할 결과 (청크보다 먼저, chunk_layout.rechunk_revision 참고)
+                                                     받는 쪽은 청크를 맞추기 전에 ProjectStore.apply_revision 으로 반영해야 합니다.
+    ("chunks", [(chunk, terms), ...])                새로 준비된 청크 묶음 (문서 순서대로)
+    ("done", {"cancelled", "error", "cached", "dedup", "layout", "revision"})  작업 종료. error 는 문서 읽기 오류 메시지 또는 None
+        dedup 은 반복 블록을 거르며 새로 분할했을 때만 {"key", "stats", "block_map"} (BlockDeduper 참고)
+        layout 은 단어 수 분할로 처음부터 끝까지 새로 나눴을 때의 청크 배치 (ChunkLayout, 저장용)
+        revision 은 증분 분할했을 때의 {"kept", "rechunked", "removed"}
+
+용어집은 청크보다 먼저 읽으므로, 청크가 도착할 때는 {glossary} 에 넣을 용어가 이미 계산되어 있습니다.
+"""
+
+import time
+import threading
+
+import prompt_core
+from block_dedup import BlockDeduper
+from chunk_layout import ChunkLayout, collect_blocks, rechunk_revision
+from glossary_matcher import GlossaryMatcher
+from glossary_store import GlossaryStore
+from perf_trace import span
+
+# 청크 묶음을 보내는 간격. 첫 청크는 바로 보내고, 이후에는 이 시간 또는 개수마다 모아서 보냅니다.
+BATCH_INTERVAL = 0.05
+BATCH_MAX_CHUNKS = 256
+
+
+class DocumentLoader:
+    """
+    문서 하나와 용어집 하나를 작업 스레드에서 불러옵니다.
+    chunk_cache 는 불러오는 동안 이 작업만 사용해야 합니다.
+    layout 은 프로젝트에 저장된 이전 판의 청크 배치입니다. 분할 설정이 같으면 바뀐 부분만 다시 나눕니다.
+    """
+
+    def __init__(self, doc_path, glossary_path, settings, chunk_cache, events, layout=None):
+        self.doc_path, self.glossary_path = doc_path, glossary_path
+        self.settings, self.chunk_cache, self.events, self.layout = dict(settings), chunk_cache, events, layout
+        self._cancel = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="document-loader", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        """다음 청크부터 처리를 멈춥니다. 이미 보낸 청크는 그대로 사용할 수 있습니다."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def _run(self):
+        result = {"cancelled": False, "error": None, "cached": False, "dedup": None, "layout": None, "revision": None}
+        try:
+            with span("load_files", document=self.doc_path) as sp:
+                matcher = self._load_glossary()
+                count = self._load_chunks(matcher, result)
+                sp.set(chunks=count, terms=len(matcher), cached=result["cached"])
+        except Exception as e:
+            result["error"] = str(e)
+        result["cancelled"] = self.cancelled
+        self.events.put(("done", result))
+
+    def _load_glossary(self):
+        store, error = GlossaryStore(self.glossary_path), None
+        try:
+            glossary = store.load()
+        except Exception as e:
+            glossary, error = {}, str(e)
+        with span("glossary_matcher_build", terms=len(glossary)):
+            matcher = GlossaryMatcher(glossary)
+        self.events.put(("glossary", (store, glossary, matcher, error)))
+        return matcher
+
+    def _load_chunks(self, matcher, result):
+        """청크를 만들거나 캐시에서 읽어 묶음으로 보냅니다. 반환값: 보낸 청크 수"""
+        key = prompt_core.chunking_key(self.settings)
+        try:
+            cached = self.chunk_cache.get(self.doc_path, key)
+        except OSError:
+            cached = None
+        result["cached"] = cached is not None
+        chunks = []
+        batch, last_sent = [], 0.0
+        by_words = self.settings.get("chunk_mode") != prompt_core.CHUNK_MODE_TOKENS
+        deduper = BlockDeduper() if cached is None and self.settings.get("dedup_blocks") else None
+        layout = ChunkLayout(key) if cached is None and by_words else None
+        with span("chunk_document", cached=result["cached"]):
+            if cached is not None:
+                source = cached
+            elif layout is not None and self.layout is not None and self.layout.key == key:
+                # 개정판: 블록을 모두 모은 뒤 이전 배치와 비교해, 바뀐 부분만 다시 나눕니다.
+                blocks = collect_blocks(prompt_core.iter_chunk_blocks(self.doc_path, self.settings, deduper))
+                source, layout, revision = rechunk_revision(self.layout, blocks, self.settings["chunk_size"])
+                self.events.put(("revision", (layout, revision)))
+                result["revision"] = {k: v for k, v in revision.items() if k != "origins"}
+                layout = None  # 받는 쪽이 apply_revision 으로 이미 저장
+            else:
+                source = prompt_core.iter_chunks(self.doc_path, self.settings, deduper, layout)
+            for chunk in source:
+                if self.cancelled:
+                    break
+                chunks.append(chunk)
+                batch.append((chunk, matcher.find_terms(chunk)))
+                now = time.monotonic()
+                if len(chunks) == 1 or len(batch) >= BATCH_MAX_CHUNKS or now - last_sent >= BATCH_INTERVAL:
+                    self.events.put(("chunks", batch)); batch, last_sent = [], now
+        if batch:
+            self.events.put(("chunks", batch))
+        if deduper is not None and not self.cancelled:
+            target = self.settings["chunk_size"] if self.settings.get("chunk_mode") != prompt_core.CHUNK_MODE_TOKENS else None
+            result["dedup"] = {"key": key, "stats": deduper.stats(len(chunks), target), "block_map": deduper.block_map()}
+        if layout is not None and not self.cancelled:
+            result["layout"] = layout
+        if cached is None and chunks and not self.cancelled:
+            try:
+                self.chunk_cache.put(self.doc_path, key, chunks)
+            except OSError:
+                pass  # 캐시 저장 실패는 불러오기 결과에 영향을 주지 않습니다.
+        return len(chunks)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+스트리밍 .docx 텍스트 추출기
+
+python-docx 의 Document 객체 모델을 만들지 않고, zip 안의 XML 파트를
+점진적으로(iterparse) 읽어 `iter_all_text_blocks` 와 같은 순서의 텍스트 블록을 내보냅니다.
+본문은 한 번만 훑으며, 처리가 끝난 요소는 바로 버려 메모리 사용량이 문서 크기와 무관하게 유지됩니다.
+"""
+
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from perf_trace import span
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+RT_FOOTNOTES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/footnotes"
+RT_ENDNOTES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/endnotes"
+
+
+def _w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+
+W_BODY, W_P, W_TBL, W_TR, W_TC = _w("body"), _w("p"), _w("tbl"), _w("tr"), _w("tc")
+W_R, W_HYPERLINK, W_PPR, W_SECTPR = _w("r"), _w("hyperlink"), _w("pPr"), _w("sectPr")
+W_TXBX = _w("txbxContent")
+W_VAL, R_ID = _w("val"), f"{{{R_NS}}}id"
+
+DOCUMENT_PART = "word/document.xml"
+
+# 추출/분할 결과(블록 순서/텍스트 규칙)가 바뀌면 올려서 저장된 청크 캐시를 무효화합니다.
+EXTRACTOR_VERSION = 3
+
+
+# ==============================================================================
+# 요소 → 텍스트 변환 (python-docx 의 .text 규칙과 동일)
+# ==============================================================================
+
+def run_text(r):
+    """w:r 의 텍스트. (w:t, 탭, 줄바꿈 등 직계 자식만 사용)"""
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == _w("t"):
+            parts.append(child.text or "")
+        elif tag in (_w("tab"), _w("ptab")):
+            parts.append("\t")
+        elif tag == _w("br"):
+            if child.get(_w("type"), "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == _w("cr"):
+            parts.append("\n")
+        elif tag == _w("noBreakHyphen"):
+            parts.append("-")
+    return "".join(parts)
+
+
+def paragraph_text(p):
+    """w:p 의 텍스트. (직계 w:r 과 w:hyperlink 안의 w:r 만 사용)"""
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(run_text(r) for r in child if r.tag == W_R)
+    return "".join(parts)
+
+
+def cell_text(tc):
+    return "\n".join(paragraph_text(p) for p in tc if p.tag == W_P)
+
+
+def iter_row_cell_texts(tr, above):
+    """
+    표 행의 셀 텍스트를 python-docx 의 `row.cells` 와 같은 순서로 반환합니다.
+    가로 병합(gridSpan)은 반복하고, 세로 병합(vMerge)은 위쪽 셀의 텍스트를 사용합니다.
+    `above` 는 이전 행까지의 {격자 열: 텍스트} 이며, 이 함수가 갱신합니다.
+    """
+    col = 0
+    tr_pr = tr.find(_w("trPr"))
+    if tr_pr is not None and (grid_before := tr_pr.find(_w("gridBefore"))) is not None:
+        col = int(grid_before.get(W_VAL, "0"))
+    for tc in tr:
+        if tc.tag != W_TC:
+            continue
+        tc_pr = tc.find(_w("tcPr"))
+        span, merged = 1, False
+        if tc_pr is not None:
+            grid_span = tc_pr.find(_w("gridSpan"))
+            if grid_span is not None:
+                span = int(grid_span.get(W_VAL, "1"))
+            v_merge = tc_pr.find(_w("vMerge"))
+            merged = v_merge is not None and v_merge.get(W_VAL, "continue") == "continue"
+        text = above.get(col, "") if merged else cell_text(tc)
+        for _ in range(span):
+            above[col] = text
+            col += 1
+            yield text
+
+
+# ==============================================================================
+# 패키지(zip) 파트 탐색
+# ==============================================================================
+
+def _read_rels(zf, part_name):
+    """파트의 관계(.rels)를 {rId: (관계 유형, 대상 파트 경로)} 로 읽습니다."""
+    base, name = posixpath.split(part_name)
+    rels_name = posixpath.join(base, "_rels", name + ".rels")
+    rels = {}
+    if rels_name not in zf.namelist():
+        return rels
+    with zf.open(rels_name) as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == f"{{{PKG_REL_NS}}}Relationship" and el.get("TargetMode") != "External":
+                target = posixpath.normpath(posixpath.join(base, el.get("Target", "")))
+                rels[el.get("Id")] = (el.get("Type"), target.lstrip("/"))
+    return rels
+
+
+def _iter_part_paragraphs(zf, part_name, container_tag=None):
+    """
+    머리글/바닥글 파트의 최상위 문단 텍스트를 반환합니다.
+    container_tag 를 주면 (각주/미주) 각 컨테이너의 문단 텍스트를 결합해 하나씩 반환합니다.
+    """
+    if part_name not in zf.namelist():
+        return
+    with zf.open(part_name) as f:
+        depth = 0
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if container_tag is None and depth == 1 and el.tag == W_P:
+                yield paragraph_text(el)
+                el.clear()
+            elif container_tag is not None and depth == 1 and el.tag == container_tag:
+                yield "".join(paragraph_text(p) for p in el if p.tag == W_P)
+                el.clear()
+
+
+# ==============================================================================
+# 본문 스트리밍
+# ==============================================================================
+
+def iter_docx_text_blocks(doc_path, include_notes=False):
+    """
+    [스트리밍 추출기]
+    `iter_all_text_blocks(Document(doc_path))` 와 같은 순서로 텍스트 블록을 내보냅니다.
+    (본문 문단/표 행 → 머리글 → 바닥글 → 텍스트 상자가 있는 문단 → 각주 → 미주)
+    각주/미주는 include_notes 일 때만 내보냅니다. python-docx 1.2 에는 footnotes_part 가 없어
+    iter_all_text_blocks 도 각주/미주를 읽지 않으므로, 기본값은 그와 같은 블록 목록입니다.
+    본문 블록은 XML 을 읽는 즉시 내보내므로, 파일을 끝까지 읽기 전에 소비를 시작할 수 있습니다.
+    (성능 기록의 단계별 구간 시간에는 블록을 받아 처리하는 쪽의 시간도 포함됩니다.)
+    """
+    with zipfile.ZipFile(doc_path) as zf:
+        with span("docx.open"):
+            rels = _read_rels(zf, DOCUMENT_PART)
+        sections = []          # 섹션별 (머리글 rId, 바닥글 rId)
+        textbox_texts = []     # 텍스트 상자를 포함한 본문 문단 (본문 이후에 다시 내보냄)
+        blocks = 0
+
+        with span("docx.body") as body_span, zf.open(DOCUMENT_PART) as f:
+            stack = []
+            above = {}
+            for event, el in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    stack.append(el)
+                    if el.tag == W_TBL and len(stack) == 3:
+                        above = {}
+                    continue
+                stack.pop()
+                parent = stack[-1] if stack else None
+                depth = len(stack)
+
+                if el.tag == W_SECTPR and parent is not None and (
+                        parent.tag == W_BODY or (parent.tag == W_PPR and depth == 4)):
+                    refs = {}
+                    for ref in el:
+                        if ref.tag in (_w("headerReference"), _w("footerReference")) and ref.get(_w("type"), "default") == "default":
+                            refs[ref.tag] = ref.get(R_ID)
+                    sections.append((refs.get(_w("headerReference")), refs.get(_w("footerReference"))))
+                elif depth == 2 and parent.tag == W_BODY:
+                    if el.tag == W_P:
+                        text = paragraph_text(el)
+                        blocks += 1
+                        yield text
+                        if el.find(f".//{W_TXBX}") is not None:
+                            textbox_texts.append(text)
+                    parent.remove(el)
+                elif el.tag == W_TR and depth == 3 and parent.tag == W_TBL:
+                    blocks += 1
+                    yield "\t".join(iter_row_cell_texts(el, above))
+                    parent.remove(el)
+            body_span.set(blocks=blocks, sections=len(sections), textboxes=len(textbox_texts))
+
+        # 머리글/바닥글: 정의가 없는 섹션은 이전 섹션의 것을 이어받습니다.
+        with span("docx.headers_footers"):
+            for index in (0, 1):
+                current = None
+                for refs in sections:
+                    current = refs[index] or current
+                    if current and current in rels:
+                        yield from _iter_part_paragraphs(zf, rels[current][1])
+
+        yield from textbox_texts
+        if not include_notes:
+            return
+
+        with span("docx.notes"):
+            for rel_type, container in ((RT_FOOTNOTES, _w("footnote")), (RT_ENDNOTES, _w("endnote"))):
+                for r_type, target in rels.values():
+                    if r_type == rel_type:
+                        yield from _iter_part_paragraphs(zf, target, container)
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+컴파일된 용어집 색인 (.kgi, mmap)
+
+수십만~수백만 항목의 용어집을 dict 로 읽으면 메모리와 읽기/저장 시간이 크게 듭니다.
+색인 파일은 정렬된 문자열 표(UTF-8 본문 + 오프셋 배열)로 이루어져 mmap 으로 열며, 필요한 항목만 그때그때 디코딩합니다.
+- 정확한 조회: 영어 용어 순으로 정렬된 표에서 이진 탐색 (O(log n))
+- 대소문자 무시 조회/접두어 조회: 대소문자를 접은 키 순서의 순열 표에서 이진 탐색
+- 순회: 영어 용어 순서대로 (dict 를 만들지 않음)
+- GlossaryMatcher 와 같은 규칙(대소문자 무시, 단어 경계)의 lookup/find_terms 를 제공하므로 매처로도 쓸 수 있습니다.
+'[eng] - [kor]' 텍스트 용어집과의 변환은 자동입니다. open_glossary 는 큰 텍스트 용어집 옆에 색인을 만들어 두고,
+원본의 크기나 수정 시각이 바뀌면 다시 만듭니다.
+읽기 전용이므로 명령줄 도구와 프롬프트 생성 서비스에서 쓰며, 용어를 편집하는 GUI 는 텍스트 용어집을 dict 로 읽습니다.
+
+파일 형식: 헤더 + 오프셋 배열(영어, 한국어, 접은 키) + 접은 키 순서 → 항목 번호 배열 + UTF-8 본문 3개.
+정수 배열은 청크 캐시(chunk_cache)와 같이 실행 환경의 바이트 순서로 저장합니다.
+
+사용 예:
+    python glossary_index.py build "Translation glossary.txt"        # Translation glossary.kgi 생성
+    python glossary_index.py export glossary.kgi glossary.txt        # 텍스트 용어집으로 되돌리기
+    python glossary_index.py prefix glossary.kgi "data ba"           # 접두어 조회
+"""
+
+import os
+import re
+import sys
+import mmap
+import struct
+import argparse
+from array import array
+from collections.abc import ItemsView, Mapping
+
+from glossary_matcher import GlossaryMatcher, _fold
+from perf_trace import span
+
+INDEX_SUFFIX = ".kgi"
+FORMAT_VERSION = 1
+# open_glossary 가 텍스트 용어집을 색인으로 바꿔 여는 최소 파일 크기
+AUTO_INDEX_BYTES = 16 * 1024 * 1024
+
+_MAGIC = b"KGI1"
+_HEADER = struct.Struct("<4sII4xQq")  # 매직, 형식 버전, 항목 수, (정렬), 원본 크기, 원본 수정 시각(ns)
+_BOUNDARY = re.compile(r"\b")  # glossary_matcher._is_boundary 와 같은 기준
+# iter_matches 가 기억해 두는 첫 구간(대개 한 단어)별 범위 수. 넘으면 비웁니다.
+SEGMENT_CACHE_SIZE = 65536
+
+
+def fold_term(term):
+    """GlossaryMatcher 와 같은 기준으로 대소문자를 접은 비교용 키. (길이가 바뀌지 않음)"""
+    if term.isascii():
+        return term.lower()
+    return "".join(_fold(ch) for ch in term)
+
+
+def default_index_path(text_path):
+    return os.path.splitext(text_path)[0] + INDEX_SUFFIX
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class _IndexItems(ItemsView):
+    def __iter__(self):
+        return self._mapping.iter_items()
+
+
+class GlossaryIndex(Mapping):
+    """
+    mmap 으로 연 읽기 전용 용어집 {eng: kor}. dict 처럼 조회/순회할 수 있습니다.
+    프로세스 풀로 넘기면 같은 파일을 다시 엽니다. (본문은 운영체제 페이지 캐시를 공유)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = [memoryview(self._mmap)]  # 닫을 때 모두 해제해야 mmap 을 닫을 수 있음
+        self._segment_ranges = {}
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        view = self._views[0]
+        if len(view) < _HEADER.size:
+            raise ValueError("용어집 색인 형식이 올바르지 않습니다.")
+        magic, version, count, size, mtime = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC or version != FORMAT_VERSION:
+            raise ValueError("용어집 색인 형식이 올바르지 않습니다.")
+        self._count, self.source_stat = count, (size, mtime)
+        pos = _HEADER.size
+        tables = []
+        for code, length in (("Q", count + 1), ("Q", count + 1), ("Q", count + 1), ("I", count)):
+            itemsize = array(code).itemsize
+            tables.append(self._view(pos, pos + length * itemsize, code))
+            pos += length * itemsize
+        self._eng_offsets, self._kor_offsets, self._fold_offsets, self._fold_order = tables
+        blobs = []
+        for offsets in (self._eng_offsets, self._kor_offsets, self._fold_offsets):
+            blobs.append(self._view(pos, pos + offsets[-1]))
+            pos += offsets[-1]
+        if pos != len(view):
+            raise ValueError("용어집 색인 파일이 손상되었습니다.")
+        self._eng, self._kor, self._folded = blobs
+
+    def _view(self, start, end, code=None):
+        view = self._views[0][start:end]
+        self._views.append(view)
+        if code:
+            view = view.cast(code)
+            self._views.append(view)
+        return view
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if not self._mmap.closed:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __reduce__(self):
+        return (GlossaryIndex, (self.path,))
+
+    # --- 항목 접근 ---
+    def _eng_bytes(self, i):
+        return bytes(self._eng[self._eng_offsets[i]:self._eng_offsets[i + 1]])
+
+    def _eng_at(self, i):
+        return str(self._eng[self._eng_offsets[i]:self._eng_offsets[i + 1]], "utf-8")
+
+    def _kor_at(self, i):
+        return str(self._kor[self._kor_offsets[i]:self._kor_offsets[i + 1]], "utf-8")
+
+    def _folded_bytes(self, p, length=None):
+        start, end = self._fold_offsets[p], self._fold_offsets[p + 1]
+        return bytes(self._folded[start:end if length is None else min(end, start + length)])
+
+    def _find(self, eng):
+        """정확히 같은 영어 용어의 항목 번호. 없으면 -1"""
+        key, lo, hi = eng.encode("utf-8"), 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._eng_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self._count and self._eng_bytes(lo) == key else -1
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, eng):
+        i = self._find(eng) if isinstance(eng, str) else -1
+        if i < 0:
+            raise KeyError(eng)
+        return self._kor_at(i)
+
+    def __contains__(self, eng):
+        return isinstance(eng, str) and self._find(eng) >= 0
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._eng_at(i)
+
+    def items(self):
+        return _IndexItems(self)
+
+    def iter_items(self):
+        """(eng, kor) 를 영어 용어 순서대로 내보냅니다."""
+        for i in range(self._count):
+            yield self._eng_at(i), self._kor_at(i)
+
+    # --- 대소문자 무시 조회 ---
+    def _fold_range(self, key, lo=0, hi=None):
+        """접은 키가 key(bytes)로 시작하는 항목의 접은 키 순서 범위 [lo, hi). (lo~hi 안에서만 찾음)"""
+        hi = self._count if hi is None else hi
+        end, length = hi, len(key)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._folded_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        hi = end
+        start = lo
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._folded_bytes(mid, length) <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def _equal_terms(self, key, lo, hi):
+        """접은 키 범위 [lo, hi) 의 앞쪽에서 접은 키가 key 와 같은 용어들. (같은 키는 범위 맨 앞에 모여 있음)"""
+        terms = []
+        while lo < hi and self._folded_bytes(lo) == key:
+            terms.append(self._eng_at(self._fold_order[lo]))
+            lo += 1
+        return terms
+
+    def lookup(self, term):
+        """대소문자만 다른 용어까지 포함해, term 과 같은 것으로 취급되는 용어집 용어들. (GlossaryMatcher.lookup 과 같음)"""
+        key = fold_term(term).encode("utf-8")
+        lo, hi = self._fold_range(key)
+        return set(self._equal_terms(key, lo, hi))
+
+    def prefix(self, prefix, limit=None):
+        """영어 용어가 prefix 로 시작하는(대소문자 무시) (eng, kor) 를 접은 키 순서로 내보냅니다."""
+        lo, hi = self._fold_range(fold_term(prefix).encode("utf-8"))
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        for p in range(lo, hi):
+            i = self._fold_order[p]
+            yield self._eng_at(i), self._kor_at(i)
+
+    def iter_matches(self, text):
+        """
+        텍스트에서 용어가 등장하는 (시작, 끝, 용어) 를 찾습니다. (GlossaryMatcher.iter_matches 와 같은 규칙)
+        용어는 단어 경계에서 시작하고 끝나므로, 경계마다 다음 경계까지 구간을 늘리며 접두어 범위를 좁힙니다.
+        트라이를 만들지 않고, 구간마다 용어집 크기의 로그에 비례하는 비교만 합니다.
+        """
+        if not self._count:
+            return
+        folded = fold_term(text)
+        bounds = [m.start() for m in _BOUNDARY.finditer(text)]
+        cache = self._segment_ranges
+        if len(cache) > SEGMENT_CACHE_SIZE:
+            cache.clear()
+        for i, start in enumerate(bounds[:-1]):
+            segment = folded[start:bounds[i + 1]]
+            if (first := cache.get(segment)) is None:
+                first = cache[segment] = self._fold_range(segment.encode("utf-8"))
+            lo, hi = first
+            for end in bounds[i + 1:]:
+                if lo == hi:
+                    break
+                key = folded[start:end].encode("utf-8")
+                if end != bounds[i + 1]:
+                    lo, hi = self._fold_range(key, lo, hi)
+                for term in self._equal_terms(key, lo, hi):
+                    yield start, end, term
+
+    def find_terms(self, text):
+        """텍스트에 한 번이라도 등장하는 용어집 용어의 집합."""
+        return {term for _, _, term in self.iter_matches(text)}
+
+
+# ==============================================================================
+# 변환 (텍스트 용어집 ↔ 색인)
+# ==============================================================================
+
+def compile_glossary(glossary, index_path, source_stat=(0, 0)):
+    """
+    용어집(dict 또는 (eng, kor) 목록, 같은 용어는 마지막 값)을 색인 파일로 씁니다.
+    임시 파일에 쓴 뒤 교체하므로, 중간에 실패해도 기존 색인은 그대로입니다. 반환값: 항목 수
+    """
+    glossary = glossary if isinstance(glossary, dict) else dict(glossary)
+    with span("glossary_index_build", terms=len(glossary)):
+        terms = sorted(glossary)  # str 순서 = UTF-8 바이트 순서
+        eng = [t.encode("utf-8") for t in terms]
+        kor = [glossary[t].encode("utf-8") for t in terms]
+        folded = [fold_term(t).encode("utf-8") for t in terms]
+        order = array("I", sorted(range(len(terms)), key=folded.__getitem__))
+        folded = [folded[i] for i in order]
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, len(terms), *source_stat))
+            for blob in (eng, kor, folded):
+                offsets = array("Q", [0])
+                for data in blob:
+                    offsets.append(offsets[-1] + len(data))
+                f.write(offsets.tobytes())
+            f.write(order.tobytes())
+            for blob in (eng, kor, folded):
+                f.write(b"".join(blob))
+        os.replace(tmp_path, index_path)
+    return len(terms)
+
+
+def build_index(text_path, index_path=None):
+    """'[eng] - [kor]' 텍스트 용어집을 색인으로 변환합니다. 반환값: 색인 파일 경로"""
+    from prompt_core import load_glossary
+    index_path = index_path or default_index_path(text_path)
+    stat = _source_stat(text_path)
+    compile_glossary(load_glossary(text_path), index_path, stat)
+    return index_path
+
+
+def export_text(glossary, text_path):
+    """색인(또는 Mapping)을 '[eng] - [kor]' 텍스트 용어집으로 씁니다. 색인은 이미 정렬되어 있어 다시 정렬하지 않습니다."""
+    from prompt_core import format_glossary_line
+    items = glossary.iter_items() if isinstance(glossary, GlossaryIndex) else sorted(glossary.items())
+    tmp_path = text_path + ".tmp"
+    with span("glossary_index_export", terms=len(glossary)):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for eng, kor in items:
+                f.write(format_glossary_line(eng, kor))
+        os.replace(tmp_path, text_path)
+
+
+def open_index_for(text_path, index_path=None):
+    """텍스트 용어집 옆의 색인을 엽니다. 없거나, 원본이 바뀌었거나, 손상되었으면 다시 만듭니다."""
+    index_path = index_path or default_index_path(text_path)
+    if os.path.exists(index_path):
+        try:
+            index = GlossaryIndex(index_path)
+        except (OSError, ValueError, struct.error):
+            index = None
+        if index is not None:
+            if index.source_stat == _source_stat(text_path):
+                return index
+            index.close()
+    return GlossaryIndex(build_index(text_path, index_path))
+
+
+def open_glossary(path, min_index_bytes=AUTO_INDEX_BYTES):
+    """
+    읽기 전용 용어집을 엽니다. (명령줄 도구용)
+    .kgi 파일이면 색인을, min_index_bytes 이상인 텍스트 용어집이면 옆의 색인(없으면 만듦)을, 그 밖에는 dict 를 반환합니다.
+    """
+    from prompt_core import load_glossary
+    if not path or not os.path.exists(path):
+        return {}
+    if path.lower().endswith(INDEX_SUFFIX):
+        return GlossaryIndex(path)
+    if os.path.getsize(path) >= min_index_bytes:
+        with span("open_glossary_index") as sp:
+            index = open_index_for(path)
+            sp.set(terms=len(index))
+        return index
+    return load_glossary(path)
+
+
+def matcher_for(glossary):
+    """용어집에 맞는 용어 매처. 색인은 그 자체로 매처이고, dict 는 GlossaryMatcher 를 만듭니다."""
+    return glossary if isinstance(glossary, GlossaryIndex) else GlossaryMatcher(glossary)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="용어집 색인(.kgi)을 만들거나 조회합니다.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="텍스트 용어집을 색인으로 변환")
+    p.add_argument("glossary", help="'[eng] - [kor]' 텍스트 용어집")
+    p.add_argument("-o", "--output", help=f"색인 파일 (기본값: 같은 이름의 {INDEX_SUFFIX})")
+    p = sub.add_parser("export", help="색인을 텍스트 용어집으로 변환")
+    p.add_argument("index"); p.add_argument("output")
+    p = sub.add_parser("lookup", help="용어 조회 (대소문자 무시)")
+    p.add_argument("index"); p.add_argument("term")
+    p = sub.add_parser("prefix", help="접두어 조회 (대소문자 무시)")
+    p.add_argument("index"); p.add_argument("prefix")
+    p.add_argument("-n", "--limit", type=int, default=50, help="최대 출력 수 (기본값: 50)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        path = build_index(args.glossary, args.output)
+        with GlossaryIndex(path) as index:
+            print(f"용어 {len(index):,}개 → {path}", file=sys.stderr)
+        return 0
+    with GlossaryIndex(args.index) as index:
+        if args.command == "export":
+            export_text(index, args.output)
+            print(f"용어 {len(index):,}개 → {args.output}", file=sys.stderr)
+        elif args.command == "lookup":
+            for term in sorted(index.lookup(args.term)):
+                print(f"{term}\t{index[term]}")
+        else:
+            for eng, kor in index.prefix(args.prefix, args.limit):
+                print(f"{eng}\t{kor}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+용어집 매처 (Glossary Matcher)
+
+용어집을 한 번만 트라이(trie)로 컴파일해 두고, 텍스트를 한 번 훑어서
+용어집에 있는 모든 용어의 등장 위치를 찾습니다.
+기존 `re.search(r'\\b' + re.escape(e) + r'\\b', chunk, re.I)` 와 같은
+규칙(대소문자 무시, 단어 경계 일치)을 따릅니다.
+"""
+
+
+def _fold(ch):
+    """대소문자 무시 비교용 문자 정규화. 길이가 바뀌는 문자는 원본을 그대로 사용합니다."""
+    low = ch.lower()
+    return low if len(low) == 1 else ch
+
+
+def _is_word_char(ch):
+    """정규식 \\w 와 같은 기준으로 단어 문자인지 확인합니다."""
+    return ch.isalnum() or ch == '_'
+
+
+def _is_boundary(text, pos):
+    """정규식 \\b 와 같은 기준으로 pos 위치가 단어 경계인지 확인합니다."""
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < len(text) and _is_word_char(text[pos])
+    return before != after
+
+
+class GlossaryMatcher:
+    """
+    용어집의 영어 용어를 트라이로 컴파일한 다중 패턴 매처.
+    용어집이 바뀌면 sync()로 추가/삭제된 용어만 트라이에 반영합니다.
+    """
+
+    _TERMS = object()  # 트라이 노드에서 종단 용어 집합을 담는 키
+
+    def __init__(self, glossary=None):
+        self._root = {}
+        self._terms = set()
+        if glossary:
+            self.sync(glossary)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __contains__(self, term):
+        return term in self._terms
+
+    def sync(self, glossary):
+        """용어집(dict 또는 용어 목록)과 트라이를 맞춥니다. 변경된 용어만 다시 반영합니다."""
+        keys = set(glossary)
+        if keys == self._terms:
+            return False
+        for term in self._terms - keys:
+            self.remove(term)
+        for term in keys - self._terms:
+            self.add(term)
+        return True
+
+    def add_terms(self, terms):
+        """새로 더해진 용어만 트라이에 넣습니다. (용어집 전체와 비교하지 않음) 반환값: 새 용어가 있었는지"""
+        before = len(self._terms)
+        for term in terms:
+            self.add(term)
+        return len(self._terms) != before
+
+    def add(self, term):
+        if not term or term in self._terms:
+            return
+        node = self._root
+        for ch in term:
+            node = node.setdefault(_fold(ch), {})
+        node.setdefault(self._TERMS, set()).add(term)
+        self._terms.add(term)
+
+    def remove(self, term):
+        if term not in self._terms:
+            return
+        path, node = [], self._root
+        for ch in term:
+            key = _fold(ch)
+            path.append((node, key))
+            node = node[key]
+        node[self._TERMS].discard(term)
+        if not node[self._TERMS]:
+            del node[self._TERMS]
+        # 더 이상 쓰이지 않는 가지를 정리합니다.
+        for parent, key in reversed(path):
+            if parent[key]:
+                break
+            del parent[key]
+        self._terms.discard(term)
+
+    def lookup(self, term):
+        """대소문자만 다른 용어까지 포함해, term 과 같은 것으로 취급되는 용어집 용어들을 반환합니다."""
+        node = self._root
+        for ch in term:
+            node = node.get(_fold(ch))
+            if node is None:
+                return set()
+        return set(node.get(self._TERMS, ()))
+
+    def iter_matches(self, text):
+        """텍스트에서 용어가 등장하는 (시작, 끝, 용어) 를 한 번의 순회로 찾아 반환합니다."""
+        root, terms_key, n = self._root, self._TERMS, len(text)
+        if not root:
+            return
+        folded = [_fold(ch) for ch in text]
+        for start in range(n):
+            if folded[start] not in root or not _is_boundary(text, start):
+                continue
+            node, pos = root, start
+            while pos < n:
+                node = node.get(folded[pos])
+                if node is None:
+                    break
+                pos += 1
+                if terms_key in node and _is_boundary(text, pos):
+                    for term in node[terms_key]:
+                        yield start, pos, term
+
+    def find_terms(self, text):
+        """텍스트에 한 번이라도 등장하는 용어집 용어의 집합을 반환합니다."""
+        return {term for _, _, term in self.iter_matches(text)}
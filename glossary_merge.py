@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+용어 제안 일괄 병합
+
+AI 가 제안한 용어 목록(수천 줄 이상)을 한 번에 해석·분류하고, 규칙으로 일괄 결정한 뒤 용어집에 반영합니다.
+- 분류: 신규(new), 동일(identical), 충돌(conflict: 같은 용어, 다른 번역),
+        변형(variant: 대소문자/공백만 다른 기존 용어가 있음)
+- 기존 용어 찾기는 GlossaryMatcher.lookup 을 사용하므로 용어집 크기와 상관없이 항목당 용어 길이만큼만 듭니다.
+  공백이 정리되지 않은 용어집 용어('data  base')는 매처로 찾을 수 없어, 분류할 때 한 번만 따로 모아 둡니다.
+- 결정(action): keep(용어집 그대로), update(기존 용어의 번역을 새 번역으로), add(제안 용어를 새 항목으로 추가)
+tkinter 를 사용하지 않습니다. (충돌 검토 화면은 prompt_generator.GlossaryConflictWindow)
+"""
+
+from collections import Counter
+
+from prompt_core import parse_suggestion_lines
+
+KIND_NEW, KIND_IDENTICAL, KIND_CONFLICT, KIND_VARIANT = "new", "identical", "conflict", "variant"
+ACTION_KEEP, ACTION_UPDATE, ACTION_ADD = "keep", "update", "add"
+
+# 항목 종류별 기본 결정 (기존 화면의 기본값 '새로 업데이트' 를 따름)
+DEFAULT_ACTIONS = {KIND_NEW: ACTION_ADD, KIND_IDENTICAL: ACTION_KEEP, KIND_CONFLICT: ACTION_UPDATE, KIND_VARIANT: ACTION_KEEP}
+# 항목 종류별로 고를 수 있는 결정
+ALLOWED_ACTIONS = {
+    KIND_NEW: (ACTION_ADD, ACTION_KEEP),
+    KIND_IDENTICAL: (ACTION_KEEP,),
+    KIND_CONFLICT: (ACTION_UPDATE, ACTION_KEEP),
+    KIND_VARIANT: (ACTION_KEEP, ACTION_UPDATE, ACTION_ADD),
+}
+
+
+def normalize_term(term):
+    """공백 차이를 없앤 비교용 용어. (대소문자는 매처가 무시)"""
+    return " ".join(term.split())
+
+
+def _unnormalized_terms(glossary):
+    """공백이 정리되지 않은 용어집 용어의 {정리한 소문자 용어: {용어, ...}}. (정리된 용어는 매처로 찾음)"""
+    terms = {}
+    for term in glossary:
+        if (normalized := normalize_term(term)) != term:
+            terms.setdefault(normalized.lower(), set()).add(term)
+    return terms
+
+
+def classify_suggestions(pairs, glossary, matcher, chunk_counts=None):
+    """
+    제안 (eng, kor) 쌍들을 한 번에 분류합니다. matcher 는 glossary 와 동기화되어 있어야 합니다.
+    같은 용어가 여러 번 제안되면 처음 번역을 쓰고, 다른 번역들은 항목의 alternatives 에 남깁니다.
+    chunk_counts: {용어집 용어: 등장 청크 수} (규칙에 사용, 없으면 0)
+    반환값: 항목 dict 목록 (제안 순서)
+        eng, new_kor, kind, action, target(바뀔 용어집 용어), old_kor, alternatives, chunks
+    """
+    chunk_counts = chunk_counts or {}
+    entries, by_eng, unnormalized = [], {}, None
+    for eng, kor in pairs:
+        if (entry := by_eng.get(eng)) is not None:
+            if kor != entry["new_kor"] and kor not in entry["alternatives"]:
+                entry["alternatives"].append(kor)
+            continue
+        target, old = eng, glossary.get(eng)
+        if old is None:
+            if unnormalized is None:
+                unnormalized = _unnormalized_terms(glossary)
+            normalized = normalize_term(eng)
+            variants = matcher.lookup(eng) | matcher.lookup(normalized) | unnormalized.get(normalized.lower(), set())
+            variants.discard(eng)
+            if variants:
+                target = min(variants)
+                old = glossary[target]
+        if old is None:
+            kind = KIND_NEW
+        elif target != eng:
+            kind = KIND_VARIANT
+        else:
+            kind = KIND_IDENTICAL if old == kor else KIND_CONFLICT
+        entry = {"eng": eng, "new_kor": kor, "kind": kind, "action": DEFAULT_ACTIONS[kind], "target": target,
+                 "old_kor": old, "alternatives": [], "chunks": chunk_counts.get(target, 0)}
+        by_eng[eng] = entry
+        entries.append(entry)
+    return entries
+
+
+def merge_suggestion_text(text, glossary, matcher, chunk_counts=None):
+    """AI 답변 텍스트를 해석해 (제안 쌍 목록, 분류된 항목 목록) 을 반환합니다."""
+    pairs = parse_suggestion_lines(text)
+    return pairs, classify_suggestions(pairs, glossary, matcher, chunk_counts)
+
+
+def summarize(entries):
+    """종류별 항목 수. 예: {"new": 10, "conflict": 2, ...}"""
+    return Counter(entry["kind"] for entry in entries)
+
+
+def set_action(entry, action):
+    """항목 종류에서 고를 수 있는 결정이면 바꾸고 True, 아니면 그대로 두고 False."""
+    if action not in ALLOWED_ACTIONS[entry["kind"]]:
+        return False
+    entry["action"] = action
+    return True
+
+
+def apply_rule(entries, action, kinds=(KIND_CONFLICT, KIND_VARIANT), min_chunks=None, otherwise=None):
+    """
+    규칙으로 여러 항목의 결정을 한 번에 바꿉니다.
+    kinds 에 해당하는 항목 중 등장 청크 수가 min_chunks 보다 많은 항목(min_chunks 가 None 이면 모두)에는 action 을,
+    나머지 항목에는 otherwise 를 적용합니다. (otherwise 가 None 이면 그대로)
+    예: '등장 청크가 N개를 넘을 때만 새 번역' = apply_rule(entries, ACTION_UPDATE, min_chunks=N, otherwise=ACTION_KEEP)
+    반환값: 결정이 바뀐 항목 수
+    """
+    changed = 0
+    for entry in entries:
+        if entry["kind"] not in kinds:
+            continue
+        chosen = action if min_chunks is None or entry["chunks"] > min_chunks else otherwise
+        if chosen is not None and chosen != entry["action"] and set_action(entry, chosen):
+            changed += 1
+    return changed
+
+
+def apply_merge(glossary, entries):
+    """
+    결정대로 용어집(dict)을 바꿉니다.
+    반환값: (추가된 용어 수, 번역이 바뀐 용어 수)
+    """
+    added = updated = 0
+    for entry in entries:
+        action = entry["action"]
+        if action == ACTION_KEEP:
+            continue
+        key = entry["target"] if action == ACTION_UPDATE else entry["eng"]
+        if key not in glossary:
+            added += 1
+        elif glossary[key] != entry["new_kor"]:
+            updated += 1
+        else:
+            continue
+        glossary[key] = entry["new_kor"]
+    return added, updated
+
+
+def count_term_chunks(chunk_terms):
+    """청크별 등장 용어 집합 목록에서 {용어: 등장 청크 수} 를 셉니다."""
+    counts = Counter()
+    for terms in chunk_terms:
+        counts.update(terms)
+    return counts
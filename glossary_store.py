@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+용어집 저장소 (증분 읽기/추가 저장)
+
+용어집 파일을 매번 통째로 다시 읽고 다시 쓰는 대신,
+- 파일의 크기와 수정 시각이 그대로면 다시 읽지 않고,
+- 파일 뒤에 내용이 덧붙었으면 덧붙은 줄만 읽으며,
+- 저장할 때는 바뀐 항목만 '[eng] - [kor]' 줄로 파일 끝에 덧붙입니다(변경 저널).
+같은 용어가 여러 번 나오면 마지막 줄이 우선하므로 load_glossary 로 읽어도 결과가 같습니다.
+덧붙인 줄이 많이 쌓이면 정렬된 파일로 원자적으로 다시 씁니다(압축).
+"""
+
+import os
+
+from prompt_core import parse_glossary_line, format_glossary_line, save_glossary
+from perf_trace import span
+
+# 덮어쓰인 줄이 이 개수와 (항목 수 × 비율) 을 모두 넘으면 압축합니다.
+COMPACT_MIN_STALE_LINES = 1000
+COMPACT_STALE_RATIO = 0.25
+
+# 파일이 덧붙기만 했는지 확인하기 위해 기억해 두는 마지막 읽기 위치 앞쪽 바이트 수
+_TAIL_CHECK_BYTES = 64
+
+
+class GlossaryStore:
+    """
+    용어집 파일 하나의 내용을 기억하고, 파일과 메모리 사이의 변경분만 읽고 씁니다.
+    entries 는 현재 파일에 기록된 내용과 같습니다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._offset = 0          # 읽은 마지막 완전한 줄의 끝 위치
+        self._partial = False     # _offset 뒤의 끝나지 않은 마지막 줄을 (전체 읽기에서) 이미 반영했는지
+        self._tail = b""          # _offset 바로 앞의 바이트 (덧붙이기 여부 확인용)
+        self._stat = None         # (크기, 수정 시각) - 마지막으로 읽거나 쓴 시점
+        self._stale_lines = 0     # 뒤의 줄에 의해 덮어쓰인 줄 수
+
+    def _current_stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _read_from(self, offset, to_eof=False):
+        """
+        offset 부터 파일 끝까지의 완전한 줄을 읽어 {eng: kor} 변경분을 반환합니다.
+        to_eof 이면 줄바꿈 없이 끝나는 마지막 줄도 읽되, 읽기 위치는 그 줄 앞에 두어 줄이 완성된 뒤 다시 읽히게 합니다.
+        """
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        stop = len(data) if to_eof else end
+        changes = {}
+        for i, raw in enumerate(data[:stop].split(b'\n')):
+            if entry := parse_glossary_line(raw.decode('utf-8')):
+                # 첫 줄이 전체 읽기에서 이미 반영한 끝나지 않은 줄이면 덮어쓴 줄로 세지 않습니다.
+                if entry[0] in changes or (entry[0] in self.entries and not (i == 0 and self._partial)):
+                    self._stale_lines += 1
+                changes[entry[0]] = entry[1]
+        if to_eof or end:
+            self._partial = to_eof and end < len(data)
+        self._offset = offset + end
+        self._tail = (self._tail + data[max(0, end - _TAIL_CHECK_BYTES):end])[-_TAIL_CHECK_BYTES:]
+        self.entries.update(changes)
+        return changes
+
+    def _is_append_only(self, size):
+        """파일이 마지막으로 읽은 내용 뒤에 덧붙기만 했는지 확인합니다."""
+        if size < self._offset:
+            return False
+        start = self._offset - len(self._tail)
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            return f.read(len(self._tail)) == self._tail
+
+    def load(self):
+        """파일 전체를 읽어 용어집 사본(dict)을 반환합니다."""
+        self.entries, self._offset, self._tail, self._stale_lines, self._partial = {}, 0, b"", 0, False
+        self._stat = self._current_stat()
+        with span("load_glossary") as sp:
+            if self._stat is not None:
+                self._read_from(0, to_eof=True)
+            sp.set(terms=len(self.entries))
+        return dict(self.entries)
+
+    def refresh(self):
+        """
+        파일이 바뀌었으면 바뀐 항목만 {eng: kor} 로 반환합니다. 바뀌지 않았으면 빈 dict.
+        덧붙기만 했으면 덧붙은 줄만 읽고, 그 외의 변경(또는 끝나지 않은 마지막 줄이 있던 경우)은 전체를 다시 읽습니다.
+        """
+        stat = self._current_stat()
+        if stat == self._stat:
+            return {}
+        if stat is None:
+            self.entries, self._offset, self._tail, self._stat, self._partial = {}, 0, b"", None, False
+            return {}
+        # 끝나지 않은 줄을 읽어 둔 상태면 그 줄이 어떻게 완성됐는지 모르므로 전체를 다시 읽습니다.
+        if self._stat is not None and not self._partial and self._is_append_only(stat[0]):
+            self._stat = stat
+            return self._read_from(self._offset)
+        old = self.entries
+        new = self.load()
+        return {eng: kor for eng, kor in new.items() if old.get(eng) != kor}
+
+    def save(self, glossary_data):
+        """
+        glossary_data 중 파일과 다른 항목만 파일 끝에 덧붙여 저장합니다.
+        다른 곳에서 파일을 고쳤다면 먼저 그 변경분을 읽어 온 뒤 비교합니다.
+        반환값: 덧붙인 항목 수
+        """
+        with span("save_glossary", terms=len(glossary_data)) as sp:
+            self.refresh()
+            changed = {eng: kor for eng, kor in glossary_data.items() if self.entries.get(eng) != kor}
+            if changed:
+                self._append(changed)
+            if self._should_compact():
+                self.compact()
+            sp.set(appended=len(changed))
+        return len(changed)
+
+    def _append(self, changed):
+        data = "".join(format_glossary_line(eng, kor) for eng, kor in changed.items()).encode('utf-8')
+        with open(self.path, 'ab') as f:
+            # 이전 저장이 줄 중간에서 끊겼다면 새 줄에서 시작합니다.
+            if f.tell() > self._offset:
+                data = b'\n' + data
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # 방금 덧붙인 부분만 다시 읽어 entries 와 읽기 위치를 파일과 맞춥니다.
+        self._read_from(self._offset)
+        self._stat = self._current_stat()
+
+    def _should_compact(self):
+        return self._stale_lines > max(COMPACT_MIN_STALE_LINES, len(self.entries) * COMPACT_STALE_RATIO)
+
+    def compact(self):
+        """덮어쓰인 줄을 없애고 정렬된 '[eng] - [kor]' 파일로 원자적으로 다시 씁니다."""
+        save_glossary(self.path, self.entries)
+        self.load()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+로컬 테스트용 모의 LLM 서버 (OpenAI 호환 /v1/chat/completions)
+
+실제 API 없이 자동 번역 파이프라인(translation_pipeline.py)을 시험할 때 사용합니다.
+프롬프트 종류(1/2/3단계)를 구분해 형식에 맞는 가짜 답변을 돌려주며,
+지연 시간과 일시적 오류(429/503) 비율을 지정해 재시도 동작도 확인할 수 있습니다.
+
+    python mock_llm_server.py --port 8000 --latency 0.2 --fail-rate 0.1
+    python translation_pipeline.py 원문.docx --base-url http://localhost:8000/v1
+"""
+
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_answer(prompt):
+    if "[초벌 번역문]" in prompt:
+        return "---번역문 시작---\n(모의) 개선된 번역문\n---번역문 끝---\n\n---수정 이유 시작---\n(모의) 수정 이유\n---수정 이유 끝---"
+    if "[최종 한국어 번역문]" in prompt:
+        return "[Act] - [법]\n[Party] - [당사자]"
+    return "(모의) 초벌 번역문"
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive 연결 재사용 지원
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.fail_rate:
+            return self.send_json(random.choice((429, 503)), {"error": {"message": "mock transient error"}}, {"Retry-After": "0.1"})
+        if not self.path.endswith("/chat/completions"):
+            return self.send_json(404, {"error": {"message": "not found"}})
+        prompt = json.loads(body)["messages"][-1]["content"]
+        self.server.request_count += 1
+        self.send_json(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": fake_answer(prompt)}}]})
+
+    def send_json(self, status, payload, extra_headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8000, latency=0.0, fail_rate=0.0):
+    server = ThreadingHTTPServer((host, port), MockLLMHandler)
+    server.latency, server.fail_rate, server.request_count = latency, fail_rate, 0
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 테스트용 모의 LLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="응답 지연 (초)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="429/503 오류 비율 (0~1)")
+    args = parser.parse_args()
+    print(f"모의 LLM 서버: http://{args.host}:{args.port}/v1")
+    make_server(args.host, args.port, args.latency, args.fail_rate).serve_forever()
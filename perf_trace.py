@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+성능 기록 (구간 시간 측정)
+
+불러오기, 청크 분할, 용어집 읽기/저장, 검토 같은 작업을 구간(span)으로 나눠 시간과 처리 개수를 기록합니다.
+- 가장 바깥 구간이 끝나면 하위 구간을 포함한 기록 하나를 JSON 한 줄로 trace 파일에 남기고(크기 기준 순환),
+  등록된 리스너(GUI 상태 표시줄 등)에 전달합니다.
+- 모드: "off"(기록 안 함), "timing"(시간/개수), "memory"(+ tracemalloc 최대 메모리), "profile"(+ cProfile 파일)
+- 꺼져 있을 때 span() 은 아무 일도 하지 않는 공용 객체를 돌려주므로 비용이 거의 없습니다.
+  블록/줄 단위 반복 안에서는 span 을 만들지 말고, 개수를 세어 두었다가 set() 으로 기록하세요.
+
+설정 파일의 trace_mode 또는 환경 변수 KOR_PROMPT_TRACE 로 켭니다. (EXE 에서도 표준 라이브러리만 사용)
+"""
+
+import os
+import json
+import time
+import threading
+import tracemalloc
+
+TRACE_MODES = ("off", "timing", "memory", "profile")
+TRACE_ENV_VAR = "KOR_PROMPT_TRACE"
+TRACE_DIR_NAME = "traces"
+TRACE_FILE_NAME = "trace.jsonl"
+TRACE_MAX_BYTES = 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+
+_mode = "off"
+_trace_dir = None
+_logger = None
+_listeners = []
+_local = threading.local()
+
+
+class _NullSpan:
+    """기록이 꺼져 있을 때 쓰는 아무 일도 하지 않는 구간."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """측정 중인 구간 하나. with 문으로 사용하고, set() 으로 개수 등 속성을 붙입니다."""
+
+    def __init__(self, name, attrs):
+        self.name, self.attrs, self.children = name, attrs, []
+        self.parent = None
+        self._profiler = None
+        self._own_tracemalloc = False
+        self._peak_seen = 0
+        self._start_mem = 0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        if _mode == "memory":
+            if self.parent is None and not tracemalloc.is_tracing():
+                tracemalloc.start(); self._own_tracemalloc = True
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                if self.parent is not None:
+                    self.parent._peak_seen = max(self.parent._peak_seen, peak)
+                tracemalloc.reset_peak()
+                self._start_mem = current
+        elif _mode == "profile" and self.parent is None:
+            import cProfile  # 프로파일 모드에서만 필요
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        if _mode == "memory" and tracemalloc.is_tracing():
+            peak = max(self._peak_seen, tracemalloc.get_traced_memory()[1])
+            self.attrs["peak_mem_bytes"] = max(0, peak - self._start_mem)
+            if self.parent is not None:
+                self.parent._peak_seen = max(self.parent._peak_seen, peak)
+            tracemalloc.reset_peak()
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+        stack = _stack()
+        # 제너레이터 안의 구간은 순서가 엇갈려 끝날 수 있으므로 자신만 꺼냅니다.
+        if stack and stack[-1] is self:
+            stack.pop()
+        elif self in stack:
+            stack.remove(self)
+        if self.parent is not None:
+            self.parent.children.append(self)
+        else:
+            _finish(self)
+        return False
+
+    def to_dict(self):
+        record = {"name": self.name, "ms": round(self.duration * 1000, 3)}
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if self.children:
+            record["children"] = [child.to_dict() for child in self.children]
+        return record
+
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+def span(name, **attrs):
+    """구간을 측정하는 컨텍스트 관리자. 기록이 꺼져 있으면 비용 없는 빈 객체를 반환합니다."""
+    if _mode == "off":
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+
+def enabled():
+    return _mode != "off"
+
+
+def get_mode():
+    return _mode
+
+
+def mode_from_env(default="off"):
+    """환경 변수 KOR_PROMPT_TRACE 값(없거나 잘못되면 default). '1' 은 'timing' 으로 봅니다."""
+    value = os.environ.get(TRACE_ENV_VAR, "").strip().lower()
+    if value == "1":
+        return "timing"
+    return value if value in TRACE_MODES else default
+
+
+def default_trace_dir():
+    """설정 파일 옆 traces 폴더. (EXE 에서는 실행 파일 옆)"""
+    from prompt_core import get_config_path  # prompt_core 가 이 모듈을 import 하므로 여기서 불러옵니다.
+    return os.path.join(os.path.dirname(get_config_path()), TRACE_DIR_NAME)
+
+
+def configure(mode, trace_dir=None):
+    """
+    기록 모드를 바꿉니다. 잘못된 모드는 ValueError.
+    trace 파일은 처음 기록할 때 만들어집니다.
+    """
+    global _mode, _trace_dir, _logger
+    if mode not in TRACE_MODES:
+        raise ValueError(f"알 수 없는 성능 기록 모드: {mode}")
+    new_dir = trace_dir or default_trace_dir()
+    if _logger is not None and new_dir != _trace_dir:
+        for handler in _logger.handlers[:]:
+            handler.close(); _logger.removeHandler(handler)
+        _logger = None
+    _mode, _trace_dir = mode, new_dir
+
+
+def add_listener(callback):
+    """가장 바깥 구간이 끝날 때마다 callback(record) 를 호출합니다. (구간이 끝난 스레드에서 호출)"""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        # logging 은 처음 기록할 때 불러옵니다. (기록이 꺼져 있으면 프로그램 시작 시간에 영향 없음)
+        import logging
+        from logging.handlers import RotatingFileHandler
+        os.makedirs(_trace_dir, exist_ok=True)
+        _logger = logging.getLogger(f"{__name__}.trace")
+        _logger.propagate = False
+        _logger.setLevel(logging.INFO)
+        handler = RotatingFileHandler(os.path.join(_trace_dir, TRACE_FILE_NAME), maxBytes=TRACE_MAX_BYTES,
+                                      backupCount=TRACE_BACKUP_COUNT, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(handler)
+    return _logger
+
+
+def log_record(record):
+    """기록 하나를 trace 파일에 남깁니다. (모드와 상관없이 기록, 시작 시간 측정 등에서 사용)"""
+    global _trace_dir
+    if _trace_dir is None:
+        _trace_dir = default_trace_dir()
+    try:
+        _get_logger().info(json.dumps(record, ensure_ascii=False))
+    except OSError:
+        pass
+
+
+class StartupTimer:
+    """
+    프로그램 시작 단계별 시각을 기록합니다.
+    t0 는 측정 기준 시각(time.perf_counter 값)으로, 보통 주 스크립트의 첫 줄에서 잰 값입니다.
+    """
+
+    def __init__(self, t0):
+        self.t0, self.marks = t0, {}
+
+    def mark(self, name):
+        """처음 호출된 시각만 기록합니다."""
+        self.marks.setdefault(name, round((time.perf_counter() - self.t0) * 1000, 3))
+
+    def to_record(self, **extra):
+        return {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "name": "startup",
+                "ms": max(self.marks.values(), default=0.0), "marks": dict(self.marks), **extra}
+
+
+def _finish(root):
+    record = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(root.started_at)),
+              "mode": _mode, "thread": threading.current_thread().name, **root.to_dict()}
+    try:
+        if root._profiler is not None:
+            os.makedirs(_trace_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(root.started_at))
+            record["profile"] = os.path.join(_trace_dir, f"profile-{root.name}-{stamp}.prof")
+            root._profiler.dump_stats(record["profile"])
+        _get_logger().info(json.dumps(record, ensure_ascii=False))
+    except OSError:
+        pass  # 기록 실패가 작업을 방해하지 않게 합니다.
+    for callback in list(_listeners):
+        callback(record)
+
+
+def format_summary(record, max_children=3):
+    """상태 표시줄용 한 줄 요약. 예: 'load_files 1.23초 (chunk_document 0.80초, ...) · 최대 12.3 MiB'"""
+    text = f"{record['name']} {record['ms'] / 1000:.2f}초"
+    children = sorted(record.get("children", []), key=lambda c: c["ms"], reverse=True)[:max_children]
+    if children:
+        text += " (" + ", ".join(f"{c['name']} {c['ms'] / 1000:.2f}초" for c in children) + ")"
+    peak = record.get("attrs", {}).get("peak_mem_bytes")
+    if peak is not None:
+        text += f" · 최대 {peak / 2**20:.1f} MiB"
+    return text
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+프로젝트 상태 저장소 (SQLite)
+
+문서 하나의 작업 진행 상황을 청크별로 기록해, 창을 닫았다 다시 열어도 이어서 작업할 수 있게 합니다.
+- 청크 텍스트 해시, 진행 단계, 초벌 번역, 최종 번역(및 원본 답변), 추출된 용어 제안
+- WAL 모드로 열고, 변경은 모아 두었다가 한 트랜잭션으로 기록합니다(flush).
+- 문서가 다시 분할되어 청크 텍스트가 바뀌면 해당 청크의 진행 상황만 초기화합니다.
+- 단어 수 분할이면 청크별 블록 지문(chunk_layout.ChunkLayout)도 기록해, 개정판은 바뀐 부분만 다시 나눕니다.
+
+단계 번호는 GUI/파이프라인과 같습니다:
+1 = 초벌 번역 전, 2 = 초벌 번역 완료(개선 번역 전), 3 = 최종 번역 완료(검토 전), 4 = 완료
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from urllib.request import pathname2url
+
+import prompt_core
+from chunk_layout import ChunkLayout, collect_blocks, rechunk_revision
+from prompt_core import get_config_path
+
+PROJECTS_DIR_NAME = "projects"
+STAGE_NEW, STAGE_DONE = 1, 4
+CHUNK_FIELDS = ("stage", "draft", "final", "final_answer", "suggestions")
+
+# 이 개수만큼 변경이 쌓이면 자동으로 기록합니다.
+FLUSH_THRESHOLD = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS chunks (
+    idx INTEGER PRIMARY KEY,
+    text_hash TEXT NOT NULL,
+    stage INTEGER NOT NULL DEFAULT 1,
+    draft TEXT,
+    final TEXT,
+    final_answer TEXT,
+    suggestions TEXT,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS layout (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    chunking_key TEXT NOT NULL,
+    fingerprints BLOB NOT NULL,
+    chunk_ends BLOB NOT NULL
+);
+"""
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def default_project_path(doc_path):
+    """설정 파일 옆 projects 폴더 안의, 문서 경로별 프로젝트 DB 경로."""
+    abs_path = os.path.abspath(doc_path)
+    name = f"{os.path.splitext(os.path.basename(abs_path))[0]}-{hashlib.sha1(abs_path.encode('utf-8')).hexdigest()[:12]}.db"
+    return os.path.join(os.path.dirname(get_config_path()), PROJECTS_DIR_NAME, name)
+
+
+class ProjectStore:
+    """문서 하나의 청크별 진행 상황 저장소. (같은 스레드에서만 사용)"""
+
+    def __init__(self, db_path, read_only=False):
+        """read_only 이면 있는 DB 를 읽기 전용으로 엽니다. (다른 프로그램의 기록을 조회만 할 때, 파일/스키마를 고치지 않음)"""
+        self.db_path = db_path
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self.conn = sqlite3.connect(db_path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(_SCHEMA)
+        self.conn.row_factory = sqlite3.Row
+        self._pending = {}  # idx -> {필드: 값}
+
+    @classmethod
+    def for_document(cls, doc_path):
+        return cls(default_project_path(doc_path))
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # --- 청크 목록 동기화 ---
+    def sync_chunks(self, chunks, start=0, complete=True):
+        """
+        현재 청크 목록과 저장된 청크를 맞춥니다.
+        텍스트 해시가 같은 청크는 진행 상황을 유지하고, 바뀌거나 새로 생긴 청크는 처음 단계로 둡니다.
+        start: 이 번호부터의 청크만 비교합니다. (문서를 불러오는 중 새로 준비된 청크만 맞출 때)
+        complete: 청크 목록이 끝까지 준비되었으면 True. 이때 목록 뒤에 남은 저장 청크를 지웁니다.
+        반환값: 진행 상황이 초기화된 청크 수
+        """
+        self.flush()
+        stored = dict(self.conn.execute("SELECT idx, text_hash FROM chunks WHERE idx >= ?", (start,)))
+        reset, now = [], time.time()
+        for i in range(start, len(chunks)):
+            h = text_hash(chunks[i])
+            if stored.get(i) != h:
+                reset.append((i, h, now))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (idx, text_hash, stage, updated) VALUES (?, ?, 1, ?)", reset)
+            if complete:
+                self.conn.execute("DELETE FROM chunks WHERE idx >= ?", (len(chunks),))
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('chunk_count', ?)", (str(len(chunks)),))
+        return len(reset)
+
+    # --- 블록 지문 배치 (개정판 증분 분할) ---
+    def get_layout(self):
+        """저장된 청크 배치(ChunkLayout). 없으면 None"""
+        try:
+            row = self.conn.execute("SELECT chunking_key, fingerprints, chunk_ends FROM layout").fetchone()
+        except sqlite3.OperationalError:  # 읽기 전용으로 연 이전 버전 DB 에는 layout 표가 없습니다.
+            return None
+        return ChunkLayout(row[0], row[1], row[2]) if row else None
+
+    def set_layout(self, layout):
+        with self.conn:
+            self._write_layout(layout)
+
+    def _write_layout(self, layout):
+        self.conn.execute("INSERT OR REPLACE INTO layout VALUES (1, ?, ?, ?)",
+                          (layout.key, bytes(layout.fingerprints), layout.ends.tobytes()))
+
+    def apply_revision(self, origins, layout):
+        """
+        개정판 증분 분할 결과(chunk_layout.rechunk_revision)를 반영합니다.
+        origins[i] 는 새 청크 i 의 이전 청크 번호(다시 나눈 청크는 None) 입니다.
+        유지된 청크는 진행 상황과 함께 새 번호로 옮기고, 나머지 이전 청크는 지웁니다.
+        연속으로 유지된 청크는 한 번에 옮기므로 문장 수는 수정된 곳의 수에 비례합니다.
+        다시 나눈 청크는 이어지는 sync_chunks 가 처음 단계로 추가합니다.
+        """
+        self.flush()
+        runs = []  # [이전 첫 번호, 이전 끝 번호, 이동량]
+        for new, old in enumerate(origins):
+            if old is None:
+                continue
+            if runs and runs[-1][1] == old - 1 and runs[-1][2] == new - old:
+                runs[-1][1] = old
+            else:
+                runs.append([old, old, new - old])
+        with self.conn:
+            previous_end = 0
+            for first, last, _ in runs:
+                self.conn.execute("DELETE FROM chunks WHERE idx >= ? AND idx < ?", (previous_end, first))
+                previous_end = last + 1
+            self.conn.execute("DELETE FROM chunks WHERE idx >= ?", (previous_end,))
+            # 번호가 겹치지 않도록 옮길 청크는 음수 번호를 거쳐 옮깁니다.
+            for first, last, shift in runs:
+                if shift:
+                    self.conn.execute("UPDATE chunks SET idx = -1 - (idx + ?) WHERE idx BETWEEN ? AND ?", (shift, first, last))
+            self.conn.execute("UPDATE chunks SET idx = -1 - idx WHERE idx < 0")
+            self._write_layout(layout)
+
+    def chunk_and_sync(self, doc_path, settings, deduper=None):
+        """
+        문서를 나누고 청크 목록을 맞춥니다. (GUI 밖에서 사용)
+        같은 분할 설정으로 저장된 배치가 있으면 바뀐 부분만 다시 나눕니다.
+        반환값: (chunks, revision) - revision 은 증분 분할했을 때만 (chunk_layout.rechunk_revision 참고)
+        """
+        key = prompt_core.chunking_key(settings)
+        previous, revision = self.get_layout(), None
+        if settings.get("chunk_mode") == prompt_core.CHUNK_MODE_TOKENS:
+            chunks = prompt_core.chunk_document(doc_path, settings, deduper)
+        elif previous is not None and previous.key == key:
+            blocks = collect_blocks(prompt_core.iter_chunk_blocks(doc_path, settings, deduper))
+            chunks, layout, revision = rechunk_revision(previous, blocks, settings["chunk_size"])
+            self.apply_revision(revision["origins"], layout)
+        else:
+            layout = ChunkLayout(key)
+            chunks = prompt_core.chunk_document(doc_path, settings, deduper, layout)
+            self.set_layout(layout)
+        self.sync_chunks(chunks)
+        return chunks, revision
+
+    def match_completed(self, doc_path, settings, deduper=None):
+        """
+        문서를 chunk_and_sync 와 같게 나누되 저장소는 고치지 않고, 저장된 기록에서 이미 완료된 청크 번호를 찾습니다.
+        (읽기 전용으로 연 저장소에서도 사용 가능) 개정판이면 유지된 청크의 이전 번호로 기록을 찾습니다.
+        반환값: (chunks, 완료된 청크 번호 집합)
+        """
+        previous, origins = self.get_layout(), None
+        if settings.get("chunk_mode") != prompt_core.CHUNK_MODE_TOKENS and previous is not None and previous.key == prompt_core.chunking_key(settings):
+            blocks = collect_blocks(prompt_core.iter_chunk_blocks(doc_path, settings, deduper))
+            chunks, _, revision = rechunk_revision(previous, blocks, settings["chunk_size"])
+            origins = revision["origins"]
+        else:
+            chunks = prompt_core.chunk_document(doc_path, settings, deduper)
+        self.flush()
+        done = dict(self.conn.execute("SELECT idx, text_hash FROM chunks WHERE stage >= ?", (STAGE_DONE,)))
+        completed = {i for i, chunk in enumerate(chunks)
+                     if done.get(origins[i] if origins is not None else i) == text_hash(chunk)}
+        return chunks, completed
+
+    # --- 문서 정보 (meta 표, JSON) ---
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value, ensure_ascii=False)))
+
+    # --- 조회 ---
+    def get_chunk(self, idx):
+        """청크 하나의 상태 dict. (기록 대기 중인 변경 포함)"""
+        row = self.conn.execute("SELECT * FROM chunks WHERE idx = ?", (idx,)).fetchone()
+        state = {"index": idx, "stage": STAGE_NEW, "draft": None, "final": None, "final_answer": None, "suggestions": []}
+        if row:
+            state.update({k: row[k] for k in CHUNK_FIELDS})
+            state["suggestions"] = json.loads(row["suggestions"]) if row["suggestions"] else []
+        state.update(self._pending.get(idx, {}))
+        return state
+
+    def get_stage(self, idx):
+        if "stage" in self._pending.get(idx, {}):
+            return self._pending[idx]["stage"]
+        row = self.conn.execute("SELECT stage FROM chunks WHERE idx = ?", (idx,)).fetchone()
+        return row[0] if row else STAGE_NEW
+
+    def iter_states(self):
+        """모든 청크의 상태를 순서대로 반환합니다."""
+        self.flush()
+        for (idx,) in self.conn.execute("SELECT idx FROM chunks ORDER BY idx").fetchall():
+            yield self.get_chunk(idx)
+
+    def completed_indices(self):
+        self.flush()
+        return {idx for (idx,) in self.conn.execute("SELECT idx FROM chunks WHERE stage >= ?", (STAGE_DONE,))}
+
+    def progress(self):
+        """(완료 청크 수, 전체 청크 수)"""
+        self.flush()
+        done, total = self.conn.execute("SELECT SUM(stage >= ?), COUNT(*) FROM chunks", (STAGE_DONE,)).fetchone()
+        return done or 0, total
+
+    # --- 변경 (모아서 기록) ---
+    def update_chunk(self, idx, **fields):
+        """청크 상태를 바꿉니다. 실제 기록은 flush() 또는 변경이 충분히 쌓였을 때 한 번에 합니다."""
+        unknown = set(fields) - set(CHUNK_FIELDS)
+        if unknown:
+            raise ValueError(f"알 수 없는 항목: {', '.join(sorted(unknown))}")
+        self._pending.setdefault(idx, {}).update(fields)
+        if len(self._pending) >= FLUSH_THRESHOLD:
+            self.flush()
+
+    def update_from_result(self, result):
+        """파이프라인 결과(dict)를 저장합니다."""
+        self.update_chunk(result["index"], **{k: result[k] for k in CHUNK_FIELDS if k in result})
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending, now = self._pending, {}, time.time()
+        with self.conn:
+            for idx, fields in pending.items():
+                if "suggestions" in fields:
+                    fields = {**fields, "suggestions": json.dumps(fields["suggestions"], ensure_ascii=False)}
+                columns = ", ".join(f"{k} = ?" for k in fields)
+                self.conn.execute(f"UPDATE chunks SET {columns}, updated = ? WHERE idx = ?", (*fields.values(), now, idx))
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+프롬프트 생성기 핵심 로직 (GUI 비의존)
+
+설정, 문서 청크 분할, 용어집 입출력을 담당합니다.
+tkinter 를 import 하지 않으며, 오류는 messagebox 대신 예외로 호출자에게 전달합니다.
+(GUI 는 prompt_generator.py, 일괄 처리는 batch_generate.py 에서 사용)
+"""
+
+import os
+import re
+import sys
+import json
+from block_dedup import BlockDeduper
+from docx_stream import iter_docx_text_blocks
+from perf_trace import span
+from token_chunker import DEFAULT_TOKEN_BUDGET, DEFAULT_TOKENIZER, get_token_counter, resolve_tokenizer, iter_chunks_by_token_budget
+
+# ==============================================================================
+# 기본 프롬프트 템플릿 및 설정 (이 값들은 초기화 또는 설정 파일 없을 때 사용)
+# ==============================================================================
+
+CONFIG_FILE_NAME = "CustomPrompt.json"
+
+# 청크 분할 기준 (설정의 "chunk_mode")
+CHUNK_MODE_WORDS = "words"    # chunk_size 단어 수 기준 (기존 방식)
+CHUNK_MODE_TOKENS = "tokens"  # token_budget 토큰 수 기준, 큰 블록은 문장 단위로 분할
+
+ORIGINAL_DEFAULT_PROMPT_1 = """
+너는 전문 번역가야.
+직전의 문맥을 파악하여 아래 영문 원본을 한국어로 번역해 줘.
+용어 번역시 아래 [용어집]의 용어에 맞추어 번역해줘.
+법률/규정 문서에 사용될 수 있도록, 전문적이고 격식 있는 톤을 유지해야 해.
+
+[용어집]
+{glossary}
+[/용어집]
+
+[영어 원본]
+{english_chunk}
+[/영어 원본]
+"""
+
+ORIGINAL_DEFAULT_PROMPT_2 = """
+너는 최고의 한국어 법률 번역 전문가야.
+직전의 문맥을 파악하여 아래의 <영어 원문>과 AI가 번역한 <초벌 번역문>을 비교해서, 번역이 어색하거나 오역된 부분을 찾아 수정하고, 더 자연스럽고 전문적인 한국어 법률 문서로 개선해 줘.
+용어 번역시 아래 [용어집]의 번역용어에 맞추어 번역해줘.
+
+[용어집]
+{glossary}
+[/용어집]
+
+[영어 원문]
+{english_chunk}
+[/영어 원본]
+
+[초벌 번역문]
+{korean_draft}
+[/초벌 번역문]
+
+
+결과물은 아래 형식에 맞춰서, 개선된 번역문과 수정 이유를 명확히 구분해서 작성해줘.
+
+---번역문 시작---
+[여기에 개선된 번역문만 작성]
+---번역문 끝---
+
+---수정 이유 시작---
+[여기에 수정 이유만 작성]
+---수정 이유 끝---
+"""
+
+DEFAULT_PROMPT_3_SUGGESTION = """
+너는 용어 추출 전문가야.
+아래 <영어 원문>과 <최종 한국어 번역문>을 비교 분석해서, 'Translation glossary.txt' 파일에 추가할 만한 핵심 용어들을 추출해 줘.
+결과는 반드시 '[원문 용어] - [번역 용어]' 형식으로, 한 줄에 하나씩만 정리해서 보여줘. 다른 설명은 필요 없어.
+
+[영어 원본]
+{english_chunk}
+[/영어 원본]
+
+[최종 한국어 번역문]
+{final_korean_text}
+[/최종 한국어 번역문]
+"""
+
+
+# ==============================================================================
+# 핵심 로직
+# ==============================================================================
+
+def get_config_path():
+    """설정 파일의 경로를 반환합니다. (EXE 호환)"""
+    if getattr(sys, 'frozen', False):
+        application_path = os.path.dirname(sys.executable)
+    else:
+        application_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(application_path, CONFIG_FILE_NAME)
+
+def default_settings():
+    """설정 파일이 없거나 읽을 수 없을 때 사용하는 기본 설정을 반환합니다."""
+    return {
+        "prompt1": ORIGINAL_DEFAULT_PROMPT_1.strip(),
+        "prompt2": ORIGINAL_DEFAULT_PROMPT_2.strip(),
+        "chunk_size": 400,
+        "chunk_mode": CHUNK_MODE_WORDS,
+        "token_budget": DEFAULT_TOKEN_BUDGET,
+        "chunk_overlap_tokens": 0,
+        "tokenizer": DEFAULT_TOKENIZER,
+        "trace_mode": "off",
+        "tm_mode": "reference",
+        "tm_fuzzy_threshold": 0.6,
+        "dedup_blocks": False,
+        "include_notes": False
+    }
+
+def load_settings_from_json(config_path=None):
+    """
+    JSON 설정 파일에서 프롬프트와 설정을 불러옵니다.
+    파일이 없으면 기본 설정을 반환하고, 읽기 오류는 예외로 전달합니다.
+    """
+    config_path = config_path or get_config_path()
+    settings = default_settings()
+    if not os.path.exists(config_path):
+        return settings
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        settings.update(json.load(f))
+    return settings
+
+def save_settings_to_json(settings, config_path=None):
+    """설정을 JSON 파일에 저장합니다. 저장 오류는 예외로 전달합니다."""
+    config_path = config_path or get_config_path()
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=4)
+
+def iter_all_text_blocks(document):
+    """
+    [새로운 헬퍼 함수]
+    문서의 모든 텍스트 소스(본문, 표, 텍스트 상자, 머리글, 바닥글 등)를 순회하는 제너레이터.
+    """
+    # XML 내부 요소에 직접 접근하기 위한 import (python-docx 는 시작 시간이 길어 이 경로에서만 불러옵니다)
+    from docx.oxml import CT_P, CT_Tbl
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    # (성능 기록이 켜져 있으면 단계마다 구간 시간과 블록 수를 기록합니다.)
+    # 1. 본문(Body)의 문단과 표 순회 (기존 로직)
+    with span("text_blocks.body") as sp:
+        blocks = 0
+        for block in document.element.body:
+            if isinstance(block, CT_P):
+                blocks += 1
+                yield Paragraph(block, document).text
+            elif isinstance(block, CT_Tbl):
+                table = Table(block, document)
+                for row in table.rows:
+                    blocks += 1
+                    yield "\t".join(cell.text for cell in row.cells)
+        sp.set(blocks=blocks)
+
+    # 2. 모든 섹션의 머리글(Header) 순회
+    with span("text_blocks.headers"):
+        for section in document.sections:
+            for paragraph in section.header.paragraphs:
+                yield paragraph.text
+
+    # 3. 모든 섹션의 바닥글(Footer) 순회
+    with span("text_blocks.footers"):
+        for section in document.sections:
+            for paragraph in section.footer.paragraphs:
+                yield paragraph.text
+            
+    # 4. 텍스트 상자(Text Box) 및 도형(Shape) 안의 텍스트 순회
+    #    문서의 모든 문단을 순회하며 텍스트 상자 XML 태그 안에 있는지 확인
+    with span("text_blocks.textboxes") as sp:
+        paragraphs = 0
+        for p in document.paragraphs:
+            paragraphs += 1
+            if p._p.xpath('.//w:txbxContent'):
+                yield p.text
+        sp.set(paragraphs=paragraphs)
+            
+    # 5. 각주(Footnotes) 순회 (오류 방지 코드 추가)
+    #    문서에 각주 파트가 있는지 먼저 확인
+    with span("text_blocks.notes"):
+        if hasattr(document.part, 'footnotes_part') and document.part.footnotes_part:
+            footnotes = document.part.footnotes_part.footnotes
+            for footnote in footnotes:
+                # 각주 내의 모든 문단 텍스트를 결합
+                yield "".join(p.text for p in footnote.paragraphs)
+
+        # 6. 미주(Endnotes) 순회 (오류 방지 코드 추가)
+        #    문서에 미주 파트가 있는지 먼저 확인
+        if hasattr(document.part, 'endnotes_part') and document.part.endnotes_part:
+            endnotes = document.part.endnotes_part.endnotes
+            for endnote in endnotes:
+                yield "".join(p.text for p in endnote.paragraphs)
+
+
+def iter_block_groups_by_word_count(text_blocks, target_words=400):
+    """
+    텍스트 블록 스트림을 단어 수 기준으로 묶어, 청크 하나에 들어갈 (앞뒤 공백을 없앤) 블록 목록을 하나씩 내보냅니다.
+    블록을 받는 즉시 처리하므로, 문서를 끝까지 읽기 전에 첫 묶음을 사용할 수 있습니다.
+    """
+    current_chunk_texts = []
+    current_word_count = 0
+
+    for text_block in text_blocks:
+        text_block = text_block.strip()
+        if not text_block: # 내용이 없는 블록은 건너뜀
+            continue
+
+        word_count = len(text_block.split())
+
+        # 현재 청크에 새 블록을 추가하면 목표 단어 수를 초과하는 경우,
+        # 기존 청크를 내보내고 새 청크를 시작
+        if current_word_count > 0 and current_word_count + word_count > target_words:
+            yield current_chunk_texts
+            current_chunk_texts = []
+            current_word_count = 0
+
+        current_chunk_texts.append(text_block)
+        current_word_count += word_count
+
+    # 마지막으로 남은 텍스트가 있다면 최종 청크로 추가
+    if current_chunk_texts:
+        yield current_chunk_texts
+
+
+def iter_chunks_by_word_count(text_blocks, target_words=400):
+    """텍스트 블록 스트림을 단어 수 기준 청크(블록을 줄바꿈으로 이은 문자열)로 묶어 하나씩 내보냅니다."""
+    for group in iter_block_groups_by_word_count(text_blocks, target_words):
+        yield "\n".join(group)
+
+
+def iter_document_chunks(doc_path, target_words=400):
+    """스트리밍 추출기(docx_stream)로 문서를 읽으면서 청크를 하나씩 내보냅니다."""
+    return iter_chunks_by_word_count(iter_docx_text_blocks(doc_path), target_words)
+
+
+def chunk_document_by_word_count(doc_path, target_words=400):
+    """
+    [개선된 함수]
+    문서(.docx)를 단어 수 기준으로 청크로 나눕니다.
+    문서의 모든 텍스트(문단, 표, 텍스트 상자, 머리글/바닥글 등)를 읽어 누락을 방지합니다.
+    python-docx 객체 모델 대신 zip 안의 XML 을 스트리밍으로 읽어 메모리 사용량을 일정하게 유지합니다.
+    """
+    with span("chunk_document_by_word_count", target_words=target_words) as sp:
+        chunks = list(iter_document_chunks(doc_path, target_words))
+        sp.set(chunks=len(chunks))
+    return chunks
+
+
+def iter_chunk_blocks(doc_path, settings, deduper=None):
+    """
+    분할기에 들어갈 텍스트 블록 스트림. 각주/미주는 include_notes 가 켜져 있을 때만 넣습니다.
+    반복 블록 제거(dedup_blocks)가 켜져 있으면 deduper(없으면 새로 만듦)로 반복 블록을 거릅니다.
+    """
+    blocks = iter_docx_text_blocks(doc_path, settings.get("include_notes", False))
+    if settings.get("dedup_blocks"):
+        blocks = (deduper or BlockDeduper()).filter(blocks)
+    return blocks
+
+
+def iter_chunks(doc_path, settings, deduper=None, layout=None):
+    """
+    설정의 분할 기준(chunk_mode)에 따라 문서를 읽으면서 청크를 하나씩 내보냅니다.
+    layout(chunk_layout.ChunkLayout)을 주면 단어 수 분할일 때 청크별 블록 지문을 기록합니다. (개정판 증분 분할용)
+    """
+    blocks = iter_chunk_blocks(doc_path, settings, deduper)
+    if settings.get("chunk_mode") != CHUNK_MODE_TOKENS:
+        groups = iter_block_groups_by_word_count(blocks, settings["chunk_size"])
+        return layout.record(groups) if layout is not None else ("\n".join(group) for group in groups)
+    count_tokens = get_token_counter(settings.get("tokenizer", DEFAULT_TOKENIZER))
+    return iter_chunks_by_token_budget(blocks, settings["token_budget"], count_tokens, settings.get("chunk_overlap_tokens", 0))
+
+
+def chunk_document(doc_path, settings, deduper=None, layout=None):
+    """설정의 분할 기준(chunk_mode)과 반복 블록 제거(dedup_blocks)에 따라 문서를 청크로 나눕니다."""
+    if settings.get("chunk_mode") != CHUNK_MODE_TOKENS:
+        name, attrs = "chunk_document_by_word_count", {"target_words": settings["chunk_size"]}
+    else:
+        name, attrs = "chunk_document_by_token_budget", {"token_budget": settings["token_budget"]}
+    with span(name, dedup=bool(settings.get("dedup_blocks")), **attrs) as sp:
+        chunks = list(iter_chunks(doc_path, settings, deduper, layout))
+        sp.set(chunks=len(chunks))
+    return chunks
+
+
+def chunking_key(settings):
+    """청크 결과를 구분하는 설정 식별값. (청크 캐시 키에 사용)"""
+    suffix = ("d" if settings.get("dedup_blocks") else "") + ("n" if settings.get("include_notes") else "")
+    if settings.get("chunk_mode") != CHUNK_MODE_TOKENS:
+        return f"{settings['chunk_size']}{suffix}"
+    # "auto" 는 tiktoken 설치 여부에 따라 다른 계산기가 되므로, 실제로 고른 계산기 이름을 넣습니다.
+    tokenizer = resolve_tokenizer(settings.get("tokenizer", DEFAULT_TOKENIZER))
+    return f"t{settings['token_budget']}o{settings.get('chunk_overlap_tokens', 0)}{tokenizer}{suffix}"
+
+
+GLOSSARY_LINE_PATTERN = re.compile(r'\[(.*?)\]\s*-\s*\[(.*?)\]')
+
+def parse_glossary_line(line):
+    """용어집 한 줄('[eng] - [kor]' 또는 'eng - kor')을 (eng, kor) 로 해석합니다. 형식이 아니면 None."""
+    line = line.strip()
+    match = GLOSSARY_LINE_PATTERN.match(line)
+    if match:
+        eng, kor = match.groups()
+        return eng.strip(), kor.strip()
+    if ' - ' in line:
+        parts = [p.strip() for p in line.rsplit(' - ', 1)]
+        if len(parts) == 2 and parts[0] and parts[1]:
+            return parts[0], parts[1]
+    return None
+
+def format_glossary_line(eng, kor):
+    return f"[{eng}] - [{kor}]\n"
+
+def parse_suggestion_lines(text):
+    """AI 답변(용어 목록)에서 원문/번역 용어가 모두 있는 (eng, kor) 쌍을 순서대로 추출합니다."""
+    pairs = []
+    for line in text.split('\n'):
+        if (entry := parse_glossary_line(line)) and entry[0] and entry[1]:
+            pairs.append(entry)
+    return pairs
+
+TRANSLATION_PATTERN = re.compile(r"---번역문 시작---(.*?)---번역문 끝---", re.DOTALL)
+
+def extract_translation(text):
+    """2단계 답변에서 '---번역문 시작---' ~ '---번역문 끝---' 사이의 번역문만 꺼냅니다. 표시가 없으면 전체."""
+    match = TRANSLATION_PATTERN.search(text)
+    return match.group(1).strip() if match else text
+
+# ==============================================================================
+# 청크별 용어집 주입 ({glossary} 변수)
+# ==============================================================================
+
+NO_GLOSSARY_TERMS = "(해당 용어 없음)"
+
+def format_chunk_glossary(glossary, terms):
+    """청크에 등장하는 용어(terms)만 '[eng] - [kor]' 줄로 정리해 {glossary} 변수 값으로 만듭니다."""
+    lines = [format_glossary_line(t, glossary[t]) for t in sorted(terms, key=str.lower) if t in glossary]
+    return "".join(lines).rstrip("\n") or NO_GLOSSARY_TERMS
+
+def find_glossary_mismatches(glossary, terms, translation):
+    """
+    청크에 등장한 용어(terms) 중 번역문에 용어집의 한국어 번역이 없는 (eng, kor) 목록. ({glossary} 변수와 같은 순서)
+    용어집 전체가 아니라 terms 만 훑으므로, 비용은 용어집 크기와 무관합니다.
+    """
+    return [(eng, kor) for eng in sorted(terms, key=str.lower) if (kor := glossary.get(eng)) is not None and kor not in translation]
+
+def load_glossary(file_path):
+    """'[eng] - [kor]' 형식의 용어집 파일을 읽습니다. 읽기 오류는 예외로 전달합니다."""
+    if not file_path or not os.path.exists(file_path): return {}
+    glossary = {}
+    with span("load_glossary") as sp, open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if entry := parse_glossary_line(line):
+                glossary[entry[0]] = entry[1]
+        sp.set(terms=len(glossary))
+    return glossary
+
+def save_glossary(file_path, glossary_data):
+    """
+    용어집을 '[eng] - [kor]' 형식으로 저장합니다. 저장 오류는 예외로 전달합니다.
+    임시 파일에 모두 쓴 뒤 교체하므로, 저장 중 중단되어도 기존 파일이 손상되지 않습니다.
+    """
+    tmp_path = file_path + ".tmp"
+    with span("save_glossary", terms=len(glossary_data)):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for eng, kor in sorted(glossary_data.items()):
+                f.write(format_glossary_line(eng, kor))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
@@ -3,244 +3,67 @@
 # 터미널(CMD)에 다음 명령어를 입력하여 설치하세요:
 # pip install python-docx
 
+import time
+_STARTUP_T0 = time.perf_counter()  # 시작 시간 측정 기준 (다른 import 보다 먼저)
+
+import io
 import os
-import re
 import sys
 import json
-from docx import Document
-# 추가: XML 내부 요소에 직접 접근하기 위한 import
-from docx.oxml import CT_P, CT_Tbl
-from docx.table import Table
-from docx.text.paragraph import Paragraph
+import queue
+import argparse
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
+from tkinter import font as tkfont
+import prompt_core
+from prompt_core import CONFIG_FILE_NAME, ORIGINAL_DEFAULT_PROMPT_1, ORIGINAL_DEFAULT_PROMPT_2, DEFAULT_PROMPT_3_SUGGESTION
+from prompt_core import format_chunk_glossary, format_glossary_line, extract_translation, find_glossary_mismatches, CHUNK_MODE_WORDS, CHUNK_MODE_TOKENS
+from chunk_cache import ChunkCache
+from glossary_matcher import GlossaryMatcher
+from glossary_merge import merge_suggestion_text, summarize, set_action, apply_rule, apply_merge, count_term_chunks
+from glossary_merge import KIND_NEW, KIND_IDENTICAL, KIND_CONFLICT, KIND_VARIANT, ACTION_KEEP, ACTION_UPDATE, ACTION_ADD, ALLOWED_ACTIONS
+from glossary_store import GlossaryStore
+from token_chunker import estimate_tokens
+from project_store import ProjectStore, STAGE_DONE
+from document_loader import DocumentLoader
+from block_dedup import iter_expanded_records
+from translation_memory import TranslationMemory, format_tm_reference, DEFAULT_FUZZY_THRESHOLD
+from prompt_template import TemplateError, compile_template, render_prompt, write_prompts
+import perf_trace
+from perf_trace import span
+# translation_pipeline(asyncio/ssl)은 '자동 번역' 창을 열 때, python-docx 는 쓰일 때만 불러옵니다.
+_STARTUP_IMPORTED = time.perf_counter()
+
+STARTUP_TIMING_ENV_VAR = "KOR_PROMPT_STARTUP_TIMING"
 
 # ==============================================================================
-# 기본 프롬프트 템플릿 및 설정 (이 값들은 초기화 또는 설정 파일 없을 때 사용)
-# ==============================================================================
-
-CONFIG_FILE_NAME = "CustomPrompt.json"
-
-ORIGINAL_DEFAULT_PROMPT_1 = """
-너는 전문 번역가야.
-직전의 문맥을 파악하여 아래 영문 원본을 한국어로 번역해 줘.
-용어 번역시 'Translation glossary.txt' 파일의 용어에 맞추어 번역해줘.
-법률/규정 문서에 사용될 수 있도록, 전문적이고 격식 있는 톤을 유지해야 해.
-
-[영어 원본]
-{english_chunk}
-[/영어 원본]
-"""
-
-ORIGINAL_DEFAULT_PROMPT_2 = """
-너는 최고의 한국어 법률 번역 전문가야.
-직전의 문맥을 파악하여 아래의 <영어 원문>과 AI가 번역한 <초벌 번역문>을 비교해서, 번역이 어색하거나 오역된 부분을 찾아 수정하고, 더 자연스럽고 전문적인 한국어 법률 문서로 개선해 줘.
-용어 번역시 'Translation glossary.txt' 파일의 번역용어에 맞추어 번역해줘.
-
-[영어 원문]
-{english_chunk}
-[/영어 원본]
-
-[초벌 번역문]
-{korean_draft}
-[/초벌 번역문]
-
-
-결과물은 아래 형식에 맞춰서, 개선된 번역문과 수정 이유를 명확히 구분해서 작성해줘.
-
----번역문 시작---
-[여기에 개선된 번역문만 작성]
----번역문 끝---
-
----수정 이유 시작---
-[여기에 수정 이유만 작성]
----수정 이유 끝---
-"""
-
-DEFAULT_PROMPT_3_SUGGESTION = """
-너는 용어 추출 전문가야.
-아래 <영어 원문>과 <최종 한국어 번역문>을 비교 분석해서, 'Translation glossary.txt' 파일에 추가할 만한 핵심 용어들을 추출해 줘.
-결과는 반드시 '[원문 용어] - [번역 용어]' 형식으로, 한 줄에 하나씩만 정리해서 보여줘. 다른 설명은 필요 없어.
-
-[영어 원본]
-{english_chunk}
-[/영어 원본]
-
-[최종 한국어 번역문]
-{final_korean_text}
-[/최종 한국어 번역문]
-"""
-
-
-# ==============================================================================
-# 핵심 로직
+# 핵심 로직 래퍼 (오류를 messagebox 로 알림, 실제 로직은 prompt_core.py)
 # ==============================================================================
 
-def get_config_path():
-    """설정 파일의 경로를 반환합니다. (EXE 호환)"""
-    if getattr(sys, 'frozen', False):
-        application_path = os.path.dirname(sys.executable)
-    else:
-        application_path = os.path.dirname(os.path.realpath(__file__))
-    return os.path.join(application_path, CONFIG_FILE_NAME)
-
-def load_settings_from_json():
-    """JSON 설정 파일에서 프롬프트와 설정을 불러옵니다."""
-    config_path = get_config_path()
-    defaults = {
-        "prompt1": ORIGINAL_DEFAULT_PROMPT_1.strip(),
-        "prompt2": ORIGINAL_DEFAULT_PROMPT_2.strip(),
-        "chunk_size": 400
-    }
-    if not os.path.exists(config_path):
-        return defaults
-
-    try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            defaults.update(config)
-            return defaults
-    except (json.JSONDecodeError, Exception) as e:
-        messagebox.showwarning("설정 파일 오류", f"설정 파일({CONFIG_FILE_NAME})을 읽는 중 오류가 발생했습니다.\n기본 설정으로 시작합니다.\n\n오류: {e}")
-        return defaults
-
 def save_settings_to_json(settings):
     """설정을 JSON 파일에 저장합니다."""
-    config_path = get_config_path()
     try:
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, ensure_ascii=False, indent=4)
+        prompt_core.save_settings_to_json(settings)
         return True
     except Exception as e:
         messagebox.showerror("설정 저장 오류", f"설정 파일 저장 중 오류가 발생했습니다:\n{e}")
         return False
 
-def iter_all_text_blocks(document):
-    """
-    [새로운 헬퍼 함수]
-    문서의 모든 텍스트 소스(본문, 표, 텍스트 상자, 머리글, 바닥글 등)를 순회하는 제너레이터.
-    """
-    # 1. 본문(Body)의 문단과 표 순회 (기존 로직)
-    for block in document.element.body:
-        if isinstance(block, CT_P):
-            yield Paragraph(block, document).text
-        elif isinstance(block, CT_Tbl):
-            table = Table(block, document)
-            for row in table.rows:
-                yield "\t".join(cell.text for cell in row.cells)
-
-    # 2. 모든 섹션의 머리글(Header) 순회
-    for section in document.sections:
-        for paragraph in section.header.paragraphs:
-            yield paragraph.text
-
-    # 3. 모든 섹션의 바닥글(Footer) 순회
-    for section in document.sections:
-        for paragraph in section.footer.paragraphs:
-            yield paragraph.text
-            
-    # 4. 텍스트 상자(Text Box) 및 도형(Shape) 안의 텍스트 순회
-    #    문서의 모든 문단을 순회하며 텍스트 상자 XML 태그 안에 있는지 확인
-    for p in document.paragraphs:
-        if p._p.xpath('.//w:txbxContent'):
-            yield p.text
-            
-    # 5. 각주(Footnotes) 순회 (오류 방지 코드 추가)
-    #    문서에 각주 파트가 있는지 먼저 확인
-    if hasattr(document.part, 'footnotes_part') and document.part.footnotes_part:
-        footnotes = document.part.footnotes_part.footnotes
-        for footnote in footnotes:
-            # 각주 내의 모든 문단 텍스트를 결합
-            yield "".join(p.text for p in footnote.paragraphs)
-
-    # 6. 미주(Endnotes) 순회 (오류 방지 코드 추가)
-    #    문서에 미주 파트가 있는지 먼저 확인
-    if hasattr(document.part, 'endnotes_part') and document.part.endnotes_part:
-        endnotes = document.part.endnotes_part.endnotes
-        for endnote in endnotes:
-            yield "".join(p.text for p in endnote.paragraphs)
-
-
-def chunk_document_by_word_count(doc_path, target_words=400):
-    """
-    [개선된 함수]
-    문서(.docx)를 단어 수 기준으로 청크로 나눕니다.
-    문서의 모든 텍스트(문단, 표, 텍스트 상자, 머리글/바닥글 등)를 읽어 누락을 방지합니다.
-    """
-    try:
-        doc = Document(doc_path)
-        chunks = []
-        current_chunk_texts = []
-        current_word_count = 0
-
-        # 개선된 제너레이터를 통해 모든 텍스트 블록을 순회하며 청크 생성
-        for text_block in iter_all_text_blocks(doc):
-            text_block = text_block.strip()
-            if not text_block: # 내용이 없는 블록은 건너뜀
-                continue
-
-            word_count = len(text_block.split())
-
-            # 현재 청크에 새 블록을 추가하면 목표 단어 수를 초과하는 경우,
-            # 기존 청크를 저장하고 새 청크를 시작
-            if current_word_count > 0 and current_word_count + word_count > target_words:
-                chunks.append("\n".join(current_chunk_texts))
-                current_chunk_texts = []
-                current_word_count = 0
-
-            current_chunk_texts.append(text_block)
-            current_word_count += word_count
-
-        # 마지막으로 남은 텍스트가 있다면 최종 청크로 추가
-        if current_chunk_texts:
-            chunks.append("\n".join(current_chunk_texts))
-
-        return chunks
-    except Exception as e:
-        messagebox.showerror("파일 오류", f"문서 파일을 읽는 중 오류가 발생했습니다: {e}")
-        return None
-
-
-def load_glossary(file_path):
-    if not file_path or not os.path.exists(file_path): return {}
-    try:
-        glossary = {}
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                match = re.match(r'\[(.*?)\]\s*-\s*\[(.*?)\]', line)
-                if match:
-                    eng, kor = match.groups()
-                    glossary[eng.strip()] = kor.strip()
-                elif ' - ' in line:
-                    parts = [p.strip() for p in line.rsplit(' - ', 1)]
-                    if len(parts) == 2 and parts[0] and parts[1]:
-                        glossary[parts[0]] = parts[1]
-        return glossary
-    except Exception as e:
-        messagebox.showwarning("용어집 오류", f"용어집 파일을 읽는 중 오류가 발생했습니다: {e}")
-        return {}
-
-def save_glossary(file_path, glossary_data):
-    try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            for eng, kor in sorted(glossary_data.items()):
-                f.write(f"[{eng}] - [{kor}]\n")
-        return True
-    except Exception as e:
-        messagebox.showerror("저장 오류", f"용어집 파일 저장 중 오류가 발생했습니다: {e}")
-        return False
-
 # ==============================================================================
 # GUI 클래스 (이하 코드는 변경되지 않았습니다)
 # ==============================================================================
 
 class PromptSettingsWindow(tk.Toplevel):
+    CHUNK_MODES = {"단어 수": CHUNK_MODE_WORDS, "토큰 예산": CHUNK_MODE_TOKENS}
+    TRACE_MODES = {"끄기": "off", "시간": "timing", "시간 + 메모리": "memory", "프로파일 (cProfile)": "profile"}
+    TM_MODES = {"끄기": "off", "참고 번역 넣기": "reference", "전체 일치는 건너뛰기": "skip"}
+
     def __init__(self, parent_app):
         super().__init__(parent_app.root)
         self.parent_app = parent_app
         self.title("설정")
-        self.geometry("700x700")
+        self.geometry("700x960")
         self.transient(parent_app.root); self.grab_set()
         self.setup_widgets()
         self.load_settings()
@@ -251,13 +74,33 @@ class PromptSettingsWindow(tk.Toplevel):
         ttk.Label(chunk_frame, text="청크 크기 (단어 수 기준):").grid(row=0, column=0, sticky="w", padx=5, pady=5)
         self.chunk_size_var = tk.StringVar(); ttk.Entry(chunk_frame, textvariable=self.chunk_size_var, width=10).grid(row=0, column=1, sticky="w", padx=5)
         ttk.Label(chunk_frame, text="(기본값: 400)").grid(row=0, column=2, sticky="w", padx=5)
+        ttk.Label(chunk_frame, text="분할 기준:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+        self.chunk_mode_var = tk.StringVar(); ttk.Combobox(chunk_frame, textvariable=self.chunk_mode_var, values=list(self.CHUNK_MODES), state="readonly", width=12).grid(row=1, column=1, sticky="w", padx=5)
+        ttk.Label(chunk_frame, text="토큰 예산 (토큰 기준일 때):").grid(row=2, column=0, sticky="w", padx=5, pady=5)
+        self.token_budget_var = tk.StringVar(); ttk.Entry(chunk_frame, textvariable=self.token_budget_var, width=10).grid(row=2, column=1, sticky="w", padx=5)
+        ttk.Label(chunk_frame, text="(기본값: 1500, 큰 문단은 문장 단위로 분할)").grid(row=2, column=2, sticky="w", padx=5)
+        ttk.Label(chunk_frame, text="겹침 문맥 (토큰):").grid(row=3, column=0, sticky="w", padx=5, pady=5)
+        self.overlap_var = tk.StringVar(); ttk.Entry(chunk_frame, textvariable=self.overlap_var, width=10).grid(row=3, column=1, sticky="w", padx=5)
+        ttk.Label(chunk_frame, text="(0 = 사용 안 함, 직전 청크 끝부분을 다음 청크 앞에 포함)").grid(row=3, column=2, sticky="w", padx=5)
+        self.dedup_var = tk.BooleanVar(); ttk.Checkbutton(chunk_frame, text="반복 블록 제거 (섹션마다 반복되는 머리글/바닥글, 안내문, 표 머리글은 처음 한 번만 번역)", variable=self.dedup_var).grid(row=4, column=0, columnspan=3, sticky="w", padx=5, pady=5)
+        self.notes_var = tk.BooleanVar(); ttk.Checkbutton(chunk_frame, text="각주/미주 포함 (문서 끝에 각주, 미주 순으로 추가)", variable=self.notes_var).grid(row=5, column=0, columnspan=3, sticky="w", padx=5, pady=5)
         prompt_frame = ttk.LabelFrame(main_frame, text="프롬프트 템플릿 설정", padding="10"); prompt_frame.pack(fill="both", expand=True, pady=10)
         ttk.Label(prompt_frame, text="1단계: 초벌 번역 프롬프트", font=("Malgun Gothic", 11, "bold")).pack(anchor="w")
         self.prompt1_text = scrolledtext.ScrolledText(prompt_frame, wrap=tk.WORD, height=8, font=("Malgun Gothic", 10)); self.prompt1_text.pack(fill="both", expand=True, pady=5)
-        ttk.Label(prompt_frame, text="사용 가능 변수: {english_chunk}", foreground="blue").pack(anchor="w", pady=(0, 15))
+        ttk.Label(prompt_frame, text="사용 가능 변수: {english_chunk}, {glossary}, {tm_reference}", foreground="blue").pack(anchor="w", pady=(0, 15))
         ttk.Label(prompt_frame, text="2단계: 개선 번역 프롬프트", font=("Malgun Gothic", 11, "bold")).pack(anchor="w")
         self.prompt2_text = scrolledtext.ScrolledText(prompt_frame, wrap=tk.WORD, height=8, font=("Malgun Gothic", 10)); self.prompt2_text.pack(fill="both", expand=True, pady=5)
-        ttk.Label(prompt_frame, text="사용 가능 변수: {english_chunk}, {korean_draft}", foreground="blue").pack(anchor="w")
+        ttk.Label(prompt_frame, text="사용 가능 변수: {english_chunk}, {korean_draft}, {glossary}, {tm_reference}", foreground="blue").pack(anchor="w")
+        ttk.Label(prompt_frame, text="{glossary}: 용어집 중 해당 청크에 등장하는 용어만 '[eng] - [kor]' 형식으로 채워집니다.").pack(anchor="w")
+        ttk.Label(prompt_frame, text="{tm_reference}: 번역 메모리의 비슷한 번역 (변수가 없으면 참고 번역이 있을 때 프롬프트 끝에 붙습니다)").pack(anchor="w")
+        glossary_frame = ttk.LabelFrame(main_frame, text="청크별 용어집 주입 효과", padding="10"); glossary_frame.pack(fill="x")
+        ttk.Label(glossary_frame, text=self.parent_app.glossary_savings_text(), justify="left").pack(anchor="w")
+        tm_frame = ttk.LabelFrame(main_frame, text="번역 메모리", padding="10"); tm_frame.pack(fill="x", pady=(10, 0))
+        self.tm_mode_var = tk.StringVar(); ttk.Combobox(tm_frame, textvariable=self.tm_mode_var, values=list(self.TM_MODES), state="readonly", width=18).pack(side="left", padx=5)
+        ttk.Label(tm_frame, text="(확정된 번역을 저장해 두었다가 같거나 비슷한 원문에 다시 사용)").pack(side="left", padx=5)
+        trace_frame = ttk.LabelFrame(main_frame, text="성능 기록", padding="10"); trace_frame.pack(fill="x", pady=(10, 0))
+        self.trace_mode_var = tk.StringVar(); ttk.Combobox(trace_frame, textvariable=self.trace_mode_var, values=list(self.TRACE_MODES), state="readonly", width=18).pack(side="left", padx=5)
+        ttk.Label(trace_frame, text=f"(작업별 소요 시간을 상태 표시줄과 {perf_trace.TRACE_DIR_NAME}/{perf_trace.TRACE_FILE_NAME} 에 기록)").pack(side="left", padx=5)
         button_frame = ttk.Frame(main_frame); button_frame.pack(fill="x", pady=10)
         ttk.Button(button_frame, text="저장", command=self.save_settings).pack(side="right", padx=5)
         ttk.Button(button_frame, text="초기화", command=self.reset_prompts).pack(side="right", padx=5)
@@ -265,6 +108,11 @@ class PromptSettingsWindow(tk.Toplevel):
 
     def load_settings(self):
         self.chunk_size_var.set(str(self.parent_app.chunk_size))
+        settings = self.parent_app.settings
+        self.chunk_mode_var.set(next((k for k, v in self.CHUNK_MODES.items() if v == settings["chunk_mode"]), "단어 수"))
+        self.token_budget_var.set(str(settings["token_budget"])); self.overlap_var.set(str(settings["chunk_overlap_tokens"])); self.dedup_var.set(bool(settings.get("dedup_blocks"))); self.notes_var.set(bool(settings.get("include_notes")))
+        self.trace_mode_var.set(next((k for k, v in self.TRACE_MODES.items() if v == perf_trace.get_mode()), "끄기"))
+        self.tm_mode_var.set(next((k for k, v in self.TM_MODES.items() if v == settings["tm_mode"]), "참고 번역 넣기"))
         self.prompt1_text.insert("1.0", self.parent_app.prompt_1_template)
         self.prompt2_text.insert("1.0", self.parent_app.prompt_2_template)
 
@@ -272,12 +120,24 @@ class PromptSettingsWindow(tk.Toplevel):
         try: new_chunk_size = int(self.chunk_size_var.get())
         except ValueError: return messagebox.showwarning("입력 오류", "청크 크기는 숫자여야 합니다.", parent=self)
         if new_chunk_size <= 0: return messagebox.showwarning("입력 오류", "청크 크기는 0보다 커야 합니다.", parent=self)
+        try: new_token_budget, new_overlap = int(self.token_budget_var.get()), int(self.overlap_var.get())
+        except ValueError: return messagebox.showwarning("입력 오류", "토큰 예산과 겹침 문맥은 숫자여야 합니다.", parent=self)
+        if new_token_budget <= 0 or new_overlap < 0: return messagebox.showwarning("입력 오류", "토큰 예산은 0보다 크고, 겹침 문맥은 0 이상이어야 합니다.", parent=self)
         new_prompt1 = self.prompt1_text.get("1.0", tk.END).strip()
         new_prompt2 = self.prompt2_text.get("1.0", tk.END).strip()
-        if "{english_chunk}" not in new_prompt1 or "{english_chunk}" not in new_prompt2 or "{korean_draft}" not in new_prompt2:
-            return messagebox.showwarning("오류", "프롬프트에 필수 변수가 포함되어 있는지 확인하세요.", parent=self)
-        new_settings = {"prompt1": new_prompt1, "prompt2": new_prompt2, "chunk_size": new_chunk_size}
+        # 저장하기 전에 템플릿을 해석해 중괄호 짝과 변수 이름을 검사하고, 오류 위치로 커서를 옮깁니다.
+        for kind, widget, template in (("prompt1", self.prompt1_text, new_prompt1), ("prompt2", self.prompt2_text, new_prompt2)):
+            try: compile_template(template, kind)
+            except TemplateError as e:
+                if e.position is not None:
+                    raw = widget.get("1.0", "end-1c"); widget.mark_set("insert", f"1.0+{len(raw) - len(raw.lstrip()) + e.position}c"); widget.see("insert"); widget.focus_set()
+                return messagebox.showwarning("프롬프트 오류", str(e), parent=self)
+        # 이 창에서 다루지 않는 설정 항목(예: tokenizer)은 그대로 유지합니다.
+        new_settings = {**self.parent_app.settings, "prompt1": new_prompt1, "prompt2": new_prompt2, "chunk_size": new_chunk_size,
+                        "chunk_mode": self.CHUNK_MODES[self.chunk_mode_var.get()], "token_budget": new_token_budget, "chunk_overlap_tokens": new_overlap, "dedup_blocks": self.dedup_var.get(), "include_notes": self.notes_var.get(),
+                        "trace_mode": self.TRACE_MODES[self.trace_mode_var.get()], "tm_mode": self.TM_MODES[self.tm_mode_var.get()]}
         if save_settings_to_json(new_settings):
+            self.parent_app.settings = new_settings; perf_trace.configure(new_settings["trace_mode"]); self.parent_app.tm_matches.clear()
             self.parent_app.prompt_1_template, self.parent_app.prompt_2_template, self.parent_app.chunk_size = new_prompt1, new_prompt2, new_chunk_size
             messagebox.showinfo("저장 완료", f"설정이 {CONFIG_FILE_NAME} 파일에 저장되었습니다.", parent=self); self.destroy()
 
@@ -287,53 +147,119 @@ class PromptSettingsWindow(tk.Toplevel):
             self.prompt2_text.delete("1.0", tk.END); self.prompt2_text.insert("1.0", ORIGINAL_DEFAULT_PROMPT_2.strip())
 
 class GlossaryConflictWindow(tk.Toplevel):
-    def __init__(self, parent, conflicts):
+    """
+    제안 용어 일괄 검토 창. 항목이 수천 개여도 보이는 줄만 Treeview 에 넣고, 스크롤하면 그 위치의 줄로 다시 그립니다.
+    entries 는 glossary_merge.classify_suggestions 의 결과이며, 결정(action)은 항목에 바로 기록됩니다.
+    decisions: 확인하면 entries, 취소하면 None
+    """
+    KIND_LABELS = {KIND_CONFLICT: "충돌", KIND_VARIANT: "대소문자/공백 변형", KIND_NEW: "신규", KIND_IDENTICAL: "동일"}
+    ACTION_LABELS = {ACTION_KEEP: "기존 유지", ACTION_UPDATE: "새로 업데이트", ACTION_ADD: "새 항목 추가"}
+    FILTERS = {"충돌·변형": (KIND_CONFLICT, KIND_VARIANT), "충돌": (KIND_CONFLICT,), "대소문자/공백 변형": (KIND_VARIANT,),
+               "신규": (KIND_NEW,), "전체": (KIND_CONFLICT, KIND_VARIANT, KIND_NEW, KIND_IDENTICAL)}
+    RULES = ("기존 유지, 등장 청크가 N개 초과면 새 번역", "새 번역, 등장 청크가 N개 초과면 기존 유지")
+
+    def __init__(self, parent, entries):
         super().__init__(parent)
-        self.decisions = {}; self.title("용어집 충돌 해결"); self.geometry("800x500")
+        self.entries, self.decisions = entries, None; self.title("용어집 충돌 해결"); self.geometry("950x600")
+        self.visible, self.offset, self.rows = [], 0, 20
+        # 줄 높이는 테마 설정, 없으면 글꼴 높이로 어림합니다. (창에 다 들어가는 줄만 그리기 위함)
+        self.row_height = int(ttk.Style(self).lookup("Treeview", "rowheight") or 0) or tkfont.nametofont("TkDefaultFont").metrics("linespace") + 4
         self.transient(parent); self.grab_set()
-        self.setup_widgets(); self.populate_conflicts(conflicts)
+        self.setup_widgets(); self.apply_filter()
         self.protocol("WM_DELETE_WINDOW", self.on_cancel); self.wait_window(self)
 
     def setup_widgets(self):
         main_frame = ttk.Frame(self, padding="10"); main_frame.pack(fill="both", expand=True)
-        ttk.Label(main_frame, text="기존 용어와 충돌하는 항목이 발견되었습니다.", wraplength=780).pack(anchor="w", pady=(0, 10))
+        counts = summarize(self.entries)
+        summary = " · ".join(f"{label} {counts[kind]:,}개" for kind, label in self.KIND_LABELS.items() if counts[kind])
+        ttk.Label(main_frame, text=f"기존 용어와 충돌하는 항목이 발견되었습니다. ({summary})", wraplength=930).pack(anchor="w", pady=(0, 10))
         batch_frame = ttk.Frame(main_frame); batch_frame.pack(fill="x", pady=5)
-        ttk.Button(batch_frame, text="모두 기존 번역 유지", command=lambda: self.set_all_actions("기존 유지")).pack(side="left", padx=5)
-        ttk.Button(batch_frame, text="모두 새 번역으로 업데이트", command=lambda: self.set_all_actions("새로 업데이트")).pack(side="left", padx=5)
+        ttk.Label(batch_frame, text="표시:").pack(side="left")
+        self.filter_var = tk.StringVar(value="충돌·변형")
+        filter_combo = ttk.Combobox(batch_frame, textvariable=self.filter_var, values=list(self.FILTERS), state="readonly", width=16)
+        filter_combo.pack(side="left", padx=5); filter_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
+        ttk.Button(batch_frame, text="모두 기존 번역 유지", command=lambda: self.set_all_actions(ACTION_KEEP)).pack(side="left", padx=5)
+        ttk.Button(batch_frame, text="모두 새 번역으로 업데이트", command=lambda: self.set_all_actions(ACTION_UPDATE)).pack(side="left", padx=5)
+        rule_frame = ttk.Frame(main_frame); rule_frame.pack(fill="x", pady=5)
+        ttk.Label(rule_frame, text="규칙:").pack(side="left")
+        self.rule_var = tk.StringVar(value=self.RULES[0])
+        ttk.Combobox(rule_frame, textvariable=self.rule_var, values=self.RULES, state="readonly", width=36).pack(side="left", padx=5)
+        ttk.Label(rule_frame, text="N =").pack(side="left")
+        self.rule_n_var = tk.IntVar(value=3)
+        ttk.Spinbox(rule_frame, from_=0, to=100000, textvariable=self.rule_n_var, width=7).pack(side="left", padx=5)
+        ttk.Button(rule_frame, text="규칙 적용", command=self.apply_rule).pack(side="left", padx=5)
+        self.rule_status = ttk.Label(rule_frame, text="", foreground="gray"); self.rule_status.pack(side="left", padx=5)
         tree_frame = ttk.Frame(main_frame); tree_frame.pack(fill="both", expand=True)
-        self.tree = ttk.Treeview(tree_frame, columns=("eng", "old", "new", "action"), show="headings")
-        self.tree.heading("eng", text="영어 원문"); self.tree.heading("old", text="기존 번역"); self.tree.heading("new", text="새 번역"); self.tree.heading("action", text="선택")
-        self.tree.column("eng", width=200); self.tree.column("old", width=200); self.tree.column("new", width=200); self.tree.column("action", width=120, anchor="center")
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview); self.tree.configure(yscrollcommand=vsb.set)
-        self.tree.pack(side="left", fill="both", expand=True); vsb.pack(side="right", fill="y")
-        self.tree.bind("<Button-1>", self.on_tree_click)
+        self.tree = ttk.Treeview(tree_frame, columns=("kind", "eng", "old", "new", "chunks", "action"), show="headings", selectmode="none")
+        self.tree.heading("kind", text="종류"); self.tree.heading("eng", text="영어 원문"); self.tree.heading("old", text="기존 번역")
+        self.tree.heading("new", text="새 번역"); self.tree.heading("chunks", text="등장 청크"); self.tree.heading("action", text="선택")
+        self.tree.column("kind", width=110); self.tree.column("eng", width=200); self.tree.column("old", width=190); self.tree.column("new", width=190)
+        self.tree.column("chunks", width=70, anchor="e"); self.tree.column("action", width=110, anchor="center")
+        # 스크롤바는 Treeview 가 아니라 전체 항목 목록의 위치를 나타냅니다.
+        self.vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True); self.vsb.pack(side="right", fill="y")
+        self.tree.bind("<Button-1>", self.on_tree_click); self.tree.bind("<Configure>", self.on_tree_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_to(self.offset - (3 if e.delta > 0 else -3)))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.offset - 3)); self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.offset + 3))
         button_frame = ttk.Frame(main_frame); button_frame.pack(fill="x", pady=10)
         ttk.Button(button_frame, text="결정 사항 적용", command=self.on_confirm).pack(side="right", padx=5)
         ttk.Button(button_frame, text="취소", command=self.on_cancel).pack(side="right")
 
-    def populate_conflicts(self, conflicts):
-        for c in conflicts:
-            item_id = self.tree.insert("", "end", values=(c['eng'], c['old_kor'], c['new_kor'], "새로 업데이트"))
-            self.decisions[item_id] = "새로 업데이트"
+    def apply_filter(self):
+        kinds = self.FILTERS[self.filter_var.get()]
+        self.visible = [i for i, e in enumerate(self.entries) if e["kind"] in kinds]
+        self.scroll_to(0)
+
+    def on_tree_resize(self, event):
+        # 제목 줄을 뺀, 창에 들어가는 줄 수만큼만 그립니다.
+        rows = max(1, event.height // self.row_height - 1)
+        if rows != self.rows: self.rows = rows; self.scroll_to(self.offset)
+
+    def on_scroll(self, *args):
+        if args[0] == "moveto": self.scroll_to(int(float(args[1]) * len(self.visible)))
+        elif args[0] == "scroll": self.scroll_to(self.offset + int(args[1]) * (self.rows if args[2] == "pages" else 1))
+
+    def scroll_to(self, offset):
+        total = len(self.visible)
+        self.offset = max(0, min(offset, total - self.rows))
+        if hasattr(self, "cb"): self.cb.destroy()
+        self.tree.delete(*self.tree.get_children())
+        for i in self.visible[self.offset:self.offset + self.rows]:
+            self.tree.insert("", "end", iid=str(i), values=self.row_values(self.entries[i]))
+        self.vsb.set(self.offset / total, (self.offset + self.rows) / total) if total else self.vsb.set(0, 1)
+
+    def row_values(self, e):
+        old = "" if e["old_kor"] is None else (e["old_kor"] if e["target"] == e["eng"] else f"{e['old_kor']} ({e['target']})")
+        new = e["new_kor"] + (f" (다른 제안: {', '.join(e['alternatives'])})" if e["alternatives"] else "")
+        return (self.KIND_LABELS[e["kind"]], e["eng"], old, new, e["chunks"], self.ACTION_LABELS[e["action"]])
 
     def on_tree_click(self, event):
-        if self.tree.identify_region(event.x, event.y) == "cell" and self.tree.identify_column(event.x) == "#4":
+        if self.tree.identify_region(event.x, event.y) == "cell" and self.tree.identify_column(event.x) == "#6":
             self.edit_action(self.tree.identify_row(event.y))
 
     def edit_action(self, item_id):
         if hasattr(self, "cb"): self.cb.destroy()
         bbox = self.tree.bbox(item_id, column="action")
         if not bbox: return
-        self.cb = ttk.Combobox(self.tree, values=["기존 유지", "새로 업데이트"], state="readonly")
+        entry = self.entries[int(item_id)]
+        labels = {self.ACTION_LABELS[a]: a for a in ALLOWED_ACTIONS[entry["kind"]]}
+        self.cb = ttk.Combobox(self.tree, values=list(labels), state="readonly")
         self.cb.set(self.tree.set(item_id, "action")); self.cb.place(x=bbox[0], y=bbox[1], width=bbox[2], height=bbox[3]); self.cb.focus_set()
-        def on_select(e): self.tree.set(item_id, "action", self.cb.get()); self.decisions[item_id] = self.cb.get(); self.cb.destroy()
+        def on_select(e): set_action(entry, labels[self.cb.get()]); self.tree.set(item_id, "action", self.cb.get()); self.cb.destroy()
         self.cb.bind("<<ComboboxSelected>>", on_select); self.cb.bind("<FocusOut>", lambda e: self.cb.destroy())
 
     def set_all_actions(self, action):
-        for item_id in self.tree.get_children(): self.tree.set(item_id, "action", action); self.decisions[item_id] = action
-    def on_confirm(self):
-        self.decisions = [{'eng': self.tree.item(i)['values'][0], 'action': self.decisions.get(i), 'new_kor': self.tree.item(i)['values'][2]} for i in self.tree.get_children()]
-        self.destroy()
+        """현재 표시 중인 종류의 항목 전체에 적용합니다. (보이지 않는 줄 포함)"""
+        apply_rule(self.entries, action, kinds=self.FILTERS[self.filter_var.get()]); self.scroll_to(self.offset)
+
+    def apply_rule(self):
+        try: n = self.rule_n_var.get()
+        except tk.TclError: return messagebox.showwarning("입력 오류", "N 에는 0 이상의 정수를 입력해 주세요.", parent=self)
+        first, otherwise = (ACTION_UPDATE, ACTION_KEEP) if self.rule_var.get() == self.RULES[0] else (ACTION_KEEP, ACTION_UPDATE)
+        changed = apply_rule(self.entries, first, kinds=self.FILTERS[self.filter_var.get()], min_chunks=n, otherwise=otherwise)
+        self.rule_status.config(text=f"{changed:,}개 항목의 선택이 바뀌었습니다."); self.scroll_to(self.offset)
+
+    def on_confirm(self): self.decisions = self.entries; self.destroy()
     def on_cancel(self): self.decisions = None; self.destroy()
 
 class ReviewWindow(tk.Toplevel):
@@ -363,20 +289,24 @@ class ReviewWindow(tk.Toplevel):
         ttk.Button(main, text="변경사항 저장 후 닫기", command=self.save_and_close).pack(pady=10, fill="x")
 
     def extract_translation(self, text):
-        match = re.search(r"---번역문 시작---(.*?)---번역문 끝---", text, re.DOTALL)
-        return match.group(1).strip() if match else text
+        return extract_translation(text)
 
     def check_discrepancies(self):
-        # --- 변경: 검사 직전에 용어집 파일 다시 읽어와 메모리와 병합 ---
-        self.parent_app.reload_and_sync_glossary()
-        
-        self.d_list.delete(*self.d_list.get_children())
         text = self.final_text.get("1.0", tk.END)
-        if not text.strip(): return messagebox.showwarning("입력 필요", "최종 번역문을 붙여넣어 주세요.", parent=self)
-        trans = self.extract_translation(text)
-        glossary, chunk = self.parent_app.glossary_data, self.parent_app.chunks[self.parent_app.current_chunk_index]
-        mismatches = [f"{e} ({k})" for e, k in glossary.items() if re.search(r'\b' + re.escape(e) + r'\b', chunk, re.I) and k not in trans]
-        for term in mismatches: self.d_list.insert("", "end", values=(term, "누락됨"))
+        if not text.strip():
+            self.d_list.delete(*self.d_list.get_children())
+            return messagebox.showwarning("입력 필요", "최종 번역문을 붙여넣어 주세요.", parent=self)
+        with span("check_discrepancies") as sp:
+            # --- 변경: 검사 직전에 용어집 파일 다시 읽어와 메모리와 병합 ---
+            with span("reload_glossary"): self.parent_app.reload_and_sync_glossary()
+            self.d_list.delete(*self.d_list.get_children())
+            trans = self.extract_translation(text); self.parent_app.record_chunk(stage=STAGE_DONE, final=trans)
+            glossary, chunk = self.parent_app.glossary_data, self.parent_app.chunks[self.parent_app.current_chunk_index]
+            with span("find_terms"): hits = self.parent_app.get_glossary_matcher().find_terms(chunk)
+            mismatches = [f"{e} ({k})" for e, k in find_glossary_mismatches(glossary, hits, trans)]
+            with span("tk_insert"):
+                for term in mismatches: self.d_list.insert("", "end", values=(term, "누락됨"))
+            sp.set(terms=len(hits), mismatches=len(mismatches))
         if not mismatches: messagebox.showinfo("검토 완료", "용어집과 충돌하는 항목을 찾지 못했습니다.", parent=self)
 
     def generate_suggestion_prompt(self):
@@ -384,6 +314,7 @@ class ReviewWindow(tk.Toplevel):
         if not text: return messagebox.showwarning("입력 필요", "최종 번역문을 붙여넣어 주세요.", parent=self)
         trans = self.extract_translation(text)
         if not trans: return messagebox.showwarning("오류", "AI 답변에서 번역문을 추출할 수 없습니다.", parent=self)
+        self.parent_app.record_chunk(stage=STAGE_DONE, final=trans)
         prompt = DEFAULT_PROMPT_3_SUGGESTION.format(english_chunk=self.parent_app.chunks[self.parent_app.current_chunk_index], final_korean_text=trans)
         pw = tk.Toplevel(self); pw.title("신규 용어 추출 프롬프트"); pw.geometry("600x400")
         ta = scrolledtext.ScrolledText(pw, wrap=tk.WORD); ta.pack(fill="both", expand=True, padx=10, pady=10)
@@ -397,28 +328,16 @@ class ReviewWindow(tk.Toplevel):
     def apply_suggestions(self):
         text = self.s_input.get("1.0", tk.END).strip()
         if not text: return messagebox.showwarning("입력 필요", "AI 답변(용어 목록)을 먼저 붙여넣어 주세요.", parent=self)
-        new, conflicts = {}, []
-        for line in text.split('\n'):
-            if not (line := line.strip()): continue
-            eng, kor = None, None
-            if m := re.match(r'\[(.*?)\]\s*-\s*\[(.*?)\]', line): eng, kor = m.groups()
-            elif ' - ' in line:
-                parts = [p.strip() for p in line.rsplit(' - ', 1)]
-                if len(parts) == 2 and parts[0] and parts[1]: eng, kor = parts
-            if eng and kor:
-                eng, kor = eng.strip(), kor.strip()
-                if eng in self.parent_app.glossary_data and self.parent_app.glossary_data[eng] != kor:
-                    conflicts.append({'eng': eng, 'old_kor': self.parent_app.glossary_data[eng], 'new_kor': kor})
-                elif eng not in self.parent_app.glossary_data and eng not in new: new[eng] = kor
-        updated = 0
-        if conflicts:
-            decisions = GlossaryConflictWindow(self, conflicts).decisions
-            if decisions is None: return messagebox.showinfo("알림", "용어 추가 작업이 취소되었습니다.", parent=self)
-            for d in decisions:
-                if d['action'] == '새로 업데이트':
-                    self.parent_app.glossary_data[d['eng']] = d['new_kor']; updated += 1
-        self.parent_app.glossary_data.update(new)
-        added = len(new)
+        app = self.parent_app
+        with span("apply_suggestions") as sp:
+            # 모든 제안 줄을 한 번에 해석·분류합니다. (신규/동일/충돌/대소문자·공백 변형)
+            suggestions, entries = merge_suggestion_text(text, app.glossary_data, app.get_glossary_matcher(), app.term_chunk_counts())
+            app.record_chunk(suggestions=suggestions)
+            counts = summarize(entries)
+            sp.set(lines=len(suggestions), **counts)
+        if counts[KIND_CONFLICT] or counts[KIND_VARIANT]:
+            if GlossaryConflictWindow(self, entries).decisions is None: return messagebox.showinfo("알림", "용어 추가 작업이 취소되었습니다.", parent=self)
+        added, updated = apply_merge(app.glossary_data, entries); app.added_terms.update(e["eng"] for e in entries if e["eng"] in app.glossary_data)
         msg = [f"{c}개의 {t}을(를) 메모리에 {a}했습니다." for c, t, a in [(added, "새 용어", "추가"), (updated, "기존 용어", "업데이트")] if c > 0]
         if not msg: return messagebox.showinfo("알림", "새로 추가/업데이트할 용어가 없습니다.", parent=self)
         messagebox.showinfo("적용 완료", "\n".join(msg) + "\n\n'변경사항 저장 후 닫기'를 눌러 파일에 최종 반영하세요.", parent=self)
@@ -427,6 +346,139 @@ class ReviewWindow(tk.Toplevel):
     def save_and_close(self):
         self.parent_app.save_current_glossary(); self.destroy()
 
+class PipelineWindow(tk.Toplevel):
+    """자동 3단계 번역 실행 창. 파이프라인은 백그라운드 스레드에서 돌고, 진행 상황은 큐로 받아 표시합니다."""
+    API_FIELDS = [("api_base_url", "API 주소", 50), ("api_model", "모델", 30), ("api_key", "API 키", 50),
+                  ("api_concurrency", "동시 요청 수", 8), ("api_requests_per_minute", "분당 요청 수", 8)]
+
+    def __init__(self, parent_app):
+        super().__init__(parent_app.root)
+        self.parent_app = parent_app; self.title("자동 번역 (3단계 일괄 실행)"); self.geometry("650x420")
+        self.transient(parent_app.root)
+        self.runner, self.events = None, queue.Queue()
+        self.setup_widgets(); self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def setup_widgets(self):
+        main = ttk.Frame(self, padding="10"); main.pack(fill="both", expand=True)
+        api = ttk.LabelFrame(main, text="API 설정 (OpenAI 호환)", padding="10"); api.pack(fill="x")
+        from translation_pipeline import DEFAULT_API_SETTINGS
+        settings, self.vars = {**DEFAULT_API_SETTINGS, **self.parent_app.settings}, {}
+        for row, (key, label, width) in enumerate(self.API_FIELDS):
+            ttk.Label(api, text=label + ":").grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            self.vars[key] = tk.StringVar(value=str(settings[key]))
+            ttk.Entry(api, textvariable=self.vars[key], width=width, show="*" if key == "api_key" else "").grid(row=row, column=1, sticky="w", padx=5)
+        ttk.Label(api, text="(API 키가 비어 있으면 OPENAI_API_KEY 환경 변수를 사용합니다.)").grid(row=len(self.API_FIELDS), column=0, columnspan=2, sticky="w", padx=5)
+        self.progress = ttk.Progressbar(main, maximum=max(1, len(self.parent_app.chunks))); self.progress.pack(fill="x", pady=(10, 5))
+        self.status = ttk.Label(main, text="대기 중"); self.status.pack(anchor="w")
+        self.log = scrolledtext.ScrolledText(main, wrap=tk.WORD, height=8); self.log.pack(fill="both", expand=True, pady=5)
+        buttons = ttk.Frame(main); buttons.pack(fill="x")
+        self.start_btn = ttk.Button(buttons, text="시작 / 이어하기", command=self.start); self.start_btn.pack(side="left", padx=5)
+        self.cancel_btn = ttk.Button(buttons, text="취소", command=self.cancel, state="disabled"); self.cancel_btn.pack(side="left", padx=5)
+        ttk.Button(buttons, text="결과 저장 (JSONL)", command=self.export_results).pack(side="right", padx=5)
+        ttk.Button(buttons, text="위치별 번역 저장", command=self.export_expanded).pack(side="right", padx=5)
+        self.report_btn = ttk.Button(buttons, text="용어 일관성 보고서", command=self.export_consistency_report); self.report_btn.pack(side="right", padx=5)
+
+    def read_api_settings(self):
+        values = {k: v.get().strip() for k, v in self.vars.items()}
+        for key in ("api_concurrency", "api_requests_per_minute"):
+            values[key] = int(values[key])
+            if values[key] <= 0: raise ValueError(f"{key} 는 0보다 커야 합니다.")
+        return values
+
+    def start(self):
+        app = self.parent_app
+        if not app.chunks: return messagebox.showwarning("문서 없음", "먼저 문서를 불러와 주세요.", parent=self)
+        if app.loader: return messagebox.showwarning("불러오는 중", "문서를 모두 불러온 뒤에 시작해 주세요.", parent=self)
+        try: api_settings = self.read_api_settings()
+        except ValueError as e: return messagebox.showwarning("입력 오류", f"동시 요청 수와 분당 요청 수는 양의 정수여야 합니다.\n{e}", parent=self)
+        new_settings = {**app.settings, **api_settings}
+        if new_settings != app.settings and save_settings_to_json(new_settings): app.settings = new_settings
+        settings = {**new_settings, "prompt1": app.prompt_1_template, "prompt2": app.prompt_2_template}
+        # 프로젝트에 기록된 진행 상황에서 이어서 실행합니다. (완료된 청크는 건너뜀)
+        app.project.flush(); app.pipeline_results = [{**state, "error": None} for state in app.project.iter_states()]
+        glossary_texts = [app.get_chunk_glossary(i) for i in range(len(app.chunks))]
+        tm_matches = [app.get_tm_match(i) for i in range(len(app.chunks))]
+        from translation_pipeline import PipelineRunner
+        self.runner = PipelineRunner(settings, list(app.chunks), glossary_texts, app.pipeline_results,
+                                     on_update=lambda r: self.events.put(("update", r)),
+                                     on_finish=lambda results, error: self.events.put(("finish", error)), tm_matches=tm_matches)
+        self.start_btn.config(state="disabled"); self.cancel_btn.config(state="normal")
+        self.update_progress(); self.runner.start(); self.after(100, self.poll_events)
+
+    def poll_events(self):
+        finished = False
+        while True:
+            try: kind, payload = self.events.get_nowait()
+            except queue.Empty: break
+            if kind == "update":
+                self.parent_app.project.update_from_result(payload)
+                if payload["final"] and payload["stage"] >= 3: self.parent_app.remember_translation(payload["index"], payload["final"])
+                if payload["error"]: self.log.insert(tk.END, f"청크 {payload['index'] + 1}: 오류 - {payload['error']}\n"); self.log.see(tk.END)
+            elif kind == "finish":
+                finished = True
+                if payload: self.log.insert(tk.END, f"실행 오류: {payload}\n")
+        self.update_progress()
+        if not finished: return self.after(100, self.poll_events)
+        self.runner = None; self.start_btn.config(state="normal"); self.cancel_btn.config(state="disabled")
+        self.parent_app.project.flush(); self.parent_app.update_ui_for_chunk()
+
+    def update_progress(self):
+        results = self.parent_app.pipeline_results or []
+        done = sum(1 for r in results if r["stage"] == STAGE_DONE)
+        failed = sum(1 for r in results if r["error"])
+        self.progress.config(value=done)
+        self.status.config(text=f"완료 {done}/{len(results)} 청크, 실패 {failed}" + (" - 실행 중..." if self.runner else ""))
+
+    def cancel(self):
+        if self.runner: self.runner.cancel(); self.status.config(text="취소 중... (진행 중인 요청이 끝나면 멈춥니다)")
+
+    def export_results(self):
+        app = self.parent_app
+        if not app.pipeline_results: return messagebox.showwarning("결과 없음", "저장할 결과가 없습니다.", parent=self)
+        if not (fp := filedialog.asksaveasfilename(parent=self, defaultextension=".jsonl", filetypes=(("JSON Lines", "*.jsonl"), ("All", "*.*")))): return
+        with open(fp, "w", encoding="utf-8") as f:
+            for r in app.pipeline_results: f.write(json.dumps({**r, "english_chunk": app.chunks[r["index"]]}, ensure_ascii=False) + "\n")
+        messagebox.showinfo("저장 완료", f"'{os.path.basename(fp)}' 파일에 결과를 저장했습니다.", parent=self)
+
+    def export_expanded(self):
+        """반복 블록을 원래 위치마다 다시 펼친 블록별 번역을 저장합니다. (단어 수 분할 + 반복 블록 제거일 때)"""
+        app = self.parent_app
+        dedup = app.project.get_meta("dedup") if app.chunks and not app.loader else None
+        if not dedup or dedup["key"] != prompt_core.chunking_key(app.settings) or app.settings.get("chunk_mode") == CHUNK_MODE_TOKENS:
+            return messagebox.showwarning("저장 불가", "단어 수 분할에서 반복 블록 제거를 켜고 문서를 다시 불러온 뒤에 사용할 수 있습니다.", parent=self)
+        if not (fp := filedialog.asksaveasfilename(parent=self, defaultextension=".jsonl", filetypes=(("JSON Lines", "*.jsonl"), ("All", "*.*")))): return
+        finals = [state["final"] for state in app.project.iter_states()]
+        with open(fp, "w", encoding="utf-8") as f:
+            for record in iter_expanded_records(dedup["block_map"], app.chunks, finals): f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        messagebox.showinfo("저장 완료", f"'{os.path.basename(fp)}' 파일에 위치별 번역을 저장했습니다.", parent=self)
+
+    def export_consistency_report(self):
+        """확정된 번역 전체의 용어 누락/불일치/영어로 남은 용어를 작업 스레드에서(CPU 코어별 병렬로) 검사해 CSV/JSON 으로 저장합니다."""
+        app = self.parent_app
+        if not app.chunks or app.loader: return messagebox.showwarning("문서 없음", "먼저 문서를 모두 불러와 주세요.", parent=self)
+        from consistency_report import items_from_states
+        app.project.flush(); items = items_from_states(app.chunks, app.project.iter_states())
+        if not items: return messagebox.showwarning("번역 없음", "확정된 번역이 있는 청크가 없습니다.", parent=self)
+        if not (fp := filedialog.asksaveasfilename(parent=self, defaultextension=".csv", initialfile="consistency_report.csv", filetypes=(("CSV", "*.csv"), ("JSON", "*.json"), ("All", "*.*")))): return
+        app.reload_and_sync_glossary(); glossary, results = dict(app.glossary_data), queue.Queue()
+        def work():
+            from consistency_report import build_report, write_report
+            try: report = build_report(items, glossary); write_report(report, fp); results.put((report["summary"], None))
+            except Exception as e: results.put((None, e))
+        self.report_btn.config(state="disabled"); self.status.config(text=f"용어 일관성 검사 중... (청크 {len(items):,}개)")
+        threading.Thread(target=work, name="consistency-report", daemon=True).start(); self.after(100, self.poll_report, results, fp)
+
+    def poll_report(self, results, fp):
+        try: summary, error = results.get_nowait()
+        except queue.Empty: return self.after(100, self.poll_report, results, fp)
+        self.report_btn.config(state="normal"); self.update_progress()
+        if error: return messagebox.showerror("보고서 오류", f"용어 일관성 보고서를 만드는 중 오류가 발생했습니다: {error}", parent=self)
+        from consistency_report import format_summary
+        messagebox.showinfo("보고서 저장 완료", f"{format_summary(summary)}\n\n'{os.path.basename(fp)}' 파일에 저장했습니다.", parent=self)
+
+    def on_close(self):
+        self.cancel(); self.destroy()
+
 class PromptGeneratorApp:
     def __init__(self, root):
         self.root = root; self.root.title("3단계 번역 프롬프트 생성기")
@@ -434,10 +486,65 @@ class PromptGeneratorApp:
         self.root.geometry(f"{w}x{h}")
         self.doc_path, self.glossary_path = tk.StringVar(), tk.StringVar()
         self.chunks, self.glossary_data = [], {}
+        self.glossary_matcher, self.glossary_store = GlossaryMatcher(), None
+        self.added_terms = set()  # 용어집에 더해졌지만 아직 매처에 넣지 않은 용어 (용어집은 추가/수정만 되고 용어가 빠지지 않음)
+        self.chunk_cache = ChunkCache()
+        self.chunk_terms = []  # 청크별 등장 용어 (불러오기 작업이 청크와 함께 계산)
+        self.pipeline_results = None  # 실행 중인 자동 번역의 작업 목록 (진행 상황은 project 에 기록)
+        self.project = None  # 문서별 진행 상황 저장소 (ProjectStore)
+        self.tm, self.tm_matches = None, {}  # 번역 메모리 (처음 쓸 때 열림) 와 청크별 비교 결과
+        self.loader, self.load_events = None, queue.Queue()  # 백그라운드 불러오기 (DocumentLoader)
+        self.background_traces = queue.Queue()  # 작업 스레드에서 끝난 성능 기록 (메인 스레드에서 표시)
         self.current_chunk_index, self.current_step = 0, 1
-        settings = load_settings_from_json()
-        self.prompt_1_template, self.prompt_2_template, self.chunk_size = settings["prompt1"], settings["prompt2"], settings["chunk_size"]
+        # 청크별 화면 진행 단계. 프롬프트만 만들고 번역을 아직 받지 않은 단계는 프로젝트에 기록하지 않고 여기에만 둡니다.
+        # (프로젝트의 단계는 자동 번역과 같은 뜻: 2 = 초벌 번역 있음, 4 = 최종 번역 있음)
+        self.shown_steps = {}
+        self.startup_timer = None  # 시작 시간 측정 모드에서만 사용 (StartupTimer)
+        # 창을 먼저 띄우고 설정 파일은 백그라운드에서 읽습니다. 읽기 전까지는 기본 설정을 씁니다.
+        self.settings_ready, self.settings_events = False, queue.Queue()
+        self.apply_settings(prompt_core.default_settings())
         self.create_widgets()
+        for btn in (self.load_btn, self.settings_btn, self.pipeline_btn): btn.config(state="disabled")
+        perf_trace.add_listener(self.show_trace)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        threading.Thread(target=self.read_settings, name="settings-reader", daemon=True).start()
+        self.root.after(10, self.poll_settings)
+
+    def read_settings(self):
+        """(작업 스레드) 설정 파일을 읽어 settings_events 큐에 넣습니다."""
+        try: self.settings_events.put((prompt_core.load_settings_from_json(), None))
+        except Exception as e: self.settings_events.put((prompt_core.default_settings(), e))
+
+    def poll_settings(self):
+        try: settings, error = self.settings_events.get_nowait()
+        except queue.Empty: return self.root.after(10, self.poll_settings)
+        if error: messagebox.showwarning("설정 파일 오류", f"설정 파일({CONFIG_FILE_NAME})을 읽는 중 오류가 발생했습니다.\n기본 설정으로 시작합니다.\n\n오류: {error}")
+        self.apply_settings(settings); self.settings_ready = True
+        for btn in (self.load_btn, self.settings_btn, self.pipeline_btn): btn.config(state="normal")
+        if self.startup_timer: self.startup_timer.mark("settings_ready")
+
+    def apply_settings(self, settings):
+        # 설정 파일을 직접 고쳐 템플릿이 잘못되었으면, 프롬프트를 만들 때가 아니라 지금 알리고 그 단계만 기본값을 씁니다.
+        for kind, default in (("prompt1", ORIGINAL_DEFAULT_PROMPT_1), ("prompt2", ORIGINAL_DEFAULT_PROMPT_2)):
+            try: compile_template(settings[kind], kind)
+            except TemplateError as e:
+                messagebox.showwarning("프롬프트 오류", f"설정 파일({CONFIG_FILE_NAME})의 프롬프트 템플릿에 오류가 있어 기본 프롬프트를 사용합니다.\n\n{e}"); settings = {**settings, kind: default.strip()}
+        self.settings = settings
+        self.prompt_1_template, self.prompt_2_template, self.chunk_size = settings["prompt1"], settings["prompt2"], settings["chunk_size"]
+        mode = perf_trace.mode_from_env(settings.get("trace_mode", "off"))
+        perf_trace.configure(mode if mode in perf_trace.TRACE_MODES else "off")
+
+    def show_trace(self, record):
+        """성능 기록이 켜져 있으면 마지막 작업의 구간 시간을 상태 표시줄에 보여 줍니다."""
+        if threading.current_thread() is threading.main_thread():
+            self.trace_status.config(text=f"⏱ {perf_trace.format_summary(record)}")
+        else: self.background_traces.put(record)
+
+    def on_close(self):
+        if self.loader: self.loader.cancel()
+        if self.project: self.project.close()
+        if self.tm: self.tm.close()
+        self.root.destroy()
 
     def create_widgets(self):
         top = ttk.Frame(self.root, padding="10"); top.pack(fill="x")
@@ -448,22 +555,34 @@ class PromptGeneratorApp:
         ttk.Entry(top, textvariable=self.glossary_path).grid(row=1, column=1, sticky="ew")
         ttk.Button(top, text="파일 선택/생성", command=self.setup_glossary_path).grid(row=1, column=2, padx=5)
         action = ttk.Frame(top); action.grid(row=0, column=3, rowspan=2, padx=10)
-        ttk.Button(action, text="불러오기", command=self.load_files).pack(fill="x", ipady=4)
-        ttk.Button(action, text="설정", command=self.open_settings).pack(fill="x", pady=2)
+        self.load_btn = ttk.Button(action, text="불러오기", command=self.load_files); self.load_btn.pack(fill="x", ipady=4)
+        self.settings_btn = ttk.Button(action, text="설정", command=self.open_settings); self.settings_btn.pack(fill="x", pady=2)
+        self.pipeline_btn = ttk.Button(action, text="자동 번역", command=self.open_pipeline); self.pipeline_btn.pack(fill="x")
         top.columnconfigure(1, weight=1)
         mid = ttk.Frame(self.root, padding="10"); mid.pack(fill="x")
         ttk.Label(mid, text="[2단계용] 초벌 번역 결과 입력:").pack(anchor="w")
         self.draft_text = scrolledtext.ScrolledText(mid, wrap=tk.WORD, height=8); self.draft_text.pack(fill="x", expand=True, pady=5)
         bot = ttk.Frame(self.root, padding="10"); bot.pack(fill="both", expand=True)
         self.status = ttk.Label(bot, text="진행 상태: 대기 중", font=("", 10, "bold")); self.status.pack(anchor="w")
+        self.trace_status = ttk.Label(bot, text="", foreground="gray"); self.trace_status.pack(anchor="w")
+        # 불러오기 진행 표시 (불러오는 동안만 보임)
+        self.load_frame = ttk.Frame(bot)
+        self.load_progress = ttk.Progressbar(self.load_frame, mode="indeterminate", length=200); self.load_progress.pack(side="left")
+        self.load_label = ttk.Label(self.load_frame, text=""); self.load_label.pack(side="left", padx=10)
+        self.cancel_load_btn = ttk.Button(self.load_frame, text="불러오기 취소", command=self.cancel_loading); self.cancel_load_btn.pack(side="right")
+        self.load_info = ttk.Label(bot, text="", foreground="gray"); self.load_info.pack(anchor="w")
         self.prompt_display = scrolledtext.ScrolledText(bot, wrap=tk.WORD); self.prompt_display.pack(fill="both", expand=True, pady=5)
         ctrl = ttk.Frame(bot); ctrl.pack(fill="x", pady=5)
         self.action_btn = ttk.Button(ctrl, text="단계별 진행", command=self.process_action, state="disabled"); self.action_btn.pack(side="left", padx=10, fill="x", expand=True)
         self.copy_btn = ttk.Button(ctrl, text="프롬프트 복사", command=self.copy_prompt, state="disabled"); self.copy_btn.pack(side="left", padx=10)
+        self.export_btn = ttk.Menubutton(ctrl, text="전체 1단계 프롬프트", state="disabled"); self.export_btn.pack(side="left", padx=10)
+        export_menu = tk.Menu(self.export_btn, tearoff=0); self.export_btn["menu"] = export_menu
+        export_menu.add_command(label="파일로 저장...", command=self.export_all_prompts); export_menu.add_command(label="클립보드에 복사", command=lambda: self.export_all_prompts(clipboard=True))
         self.prev_btn = ttk.Button(ctrl, text="◀ 이전", command=lambda: self.navigate_chunk(-1), state="disabled"); self.prev_btn.pack(side="left", padx=10)
         self.next_btn = ttk.Button(ctrl, text="다음 ▶", command=lambda: self.navigate_chunk(1), state="disabled"); self.next_btn.pack(side="left", padx=10)
 
     def open_settings(self): PromptSettingsWindow(self)
+    def open_pipeline(self): PipelineWindow(self)
     def select_file(self, path_var, ftypes):
         if fp := filedialog.askopenfilename(filetypes=ftypes): path_var.set(fp)
     def setup_glossary_path(self):
@@ -475,50 +594,179 @@ class PromptGeneratorApp:
                 except Exception as e: messagebox.showerror("생성 실패", f"파일 생성 오류: {e}")
 
     def load_files(self):
+        if self.loader: return
         if not (path := self.doc_path.get()): return messagebox.showwarning("파일 없음", "영어 원문 파일을 선택해주세요.")
         if not self.glossary_path.get(): self.setup_glossary_path()
         if not self.glossary_path.get(): return
-        self.chunks = chunk_document_by_word_count(path, self.chunk_size)
-        self.glossary_data = load_glossary(self.glossary_path.get())
-        if self.chunks:
-            self.current_chunk_index, self.current_step = 0, 1; self.update_ui_for_chunk()
-            messagebox.showinfo("완료", f"총 {len(self.chunks)}개 청크, {len(self.glossary_data)}개 용어 로드 완료.")
-        else: self.reset_state()
+        # 용어집 읽기와 문서 분할은 작업 스레드에서 하고, 결과는 poll_loading 이 큐에서 받아 반영합니다.
+        self.reset_state(); self.chunk_terms, self.pipeline_results = [], None; self.tm_matches.clear()
+        self.open_project(path); self.showing_first_chunk = False
+        self.loader = DocumentLoader(path, self.glossary_path.get(), self.settings, self.chunk_cache, self.load_events, self.project.get_layout())
+        for btn in (self.load_btn, self.settings_btn, self.pipeline_btn): btn.config(state="disabled")
+        self.load_info.config(text=""); self.load_label.config(text="용어집 읽는 중..."); self.cancel_load_btn.config(state="normal")
+        self.load_frame.pack(fill="x", before=self.load_info); self.load_progress.start(15)
+        self.loader.start(); self.root.after(50, self.poll_loading)
+
+    def cancel_loading(self):
+        if self.loader: self.loader.cancel(); self.cancel_load_btn.config(state="disabled"); self.load_label.config(text="취소 중...")
+
+    def poll_loading(self):
+        """불러오기 작업의 이벤트를 메인 스레드에서 반영합니다."""
+        finished = None
+        while True:
+            try: kind, payload = self.load_events.get_nowait()
+            except queue.Empty: break
+            if kind == "glossary":
+                self.glossary_store, self.glossary_data, self.glossary_matcher, error = payload; self.added_terms.clear()
+                if error: messagebox.showwarning("용어집 오류", f"용어집 파일을 읽는 중 오류가 발생했습니다: {error}")
+                self.load_label.config(text=f"용어 {len(self.glossary_data):,}개 - 문서 분할 중...")
+            elif kind == "revision": self.project.apply_revision(payload[1]["origins"], payload[0])
+            elif kind == "chunks": self.add_loaded_chunks(payload)
+            elif kind == "done": finished = payload
+        while not self.background_traces.empty(): self.show_trace(self.background_traces.get_nowait())
+        if finished is None:
+            if self.chunks: self.load_label.config(text=f"용어 {len(self.glossary_data):,}개, 청크 {len(self.chunks):,}개 준비됨 - 분할 중...")
+            return self.root.after(50, self.poll_loading)
+        self.finish_loading(finished)
+
+    def add_loaded_chunks(self, batch):
+        start = len(self.chunks)
+        for chunk, terms in batch: self.chunks.append(chunk); self.chunk_terms.append(terms)
+        self.project.sync_chunks(self.chunks, start=start, complete=False)
+        if not self.showing_first_chunk:
+            # 이전에 작업하던 문서라면 완료되지 않은 첫 청크부터 보여 줍니다. (그 청크가 준비되는 즉시)
+            first = next((i for i in range(start, len(self.chunks)) if self.project.get_stage(i) < STAGE_DONE), None)
+            if first is not None: self.showing_first_chunk = True; self.current_chunk_index = first; self.update_ui_for_chunk()
+        else: self.update_button_states()
+
+    def finish_loading(self, result):
+        self.loader = None; self.load_progress.stop(); self.load_frame.pack_forget()
+        for btn in (self.load_btn, self.settings_btn, self.pipeline_btn): btn.config(state="normal")
+        while not self.background_traces.empty(): self.show_trace(self.background_traces.get_nowait())
+        if result["error"] and not self.chunks:
+            self.reset_state(); return messagebox.showerror("파일 오류", f"문서 파일을 읽는 중 오류가 발생했습니다: {result['error']}")
+        if not self.chunks: return self.reset_state()
+        if result["cancelled"] or result["error"]:
+            # 이미 받은 청크는 그대로 사용할 수 있습니다. (목록이 완전하지 않으므로 프로젝트 기록은 정리하지 않음)
+            reason = "취소됨" if result["cancelled"] else f"오류: {result['error']}"
+            self.load_info.config(text=f"불러오기 {reason} - 앞부분 {len(self.chunks):,}개 청크만 사용할 수 있습니다.")
+        else:
+            self.project.sync_chunks(self.chunks, start=len(self.chunks))
+            if result["layout"]: self.project.set_layout(result["layout"])
+            done = len(self.project.completed_indices())
+            resumed = f" (이전 작업: {done}개 청크 완료)" if done else ""
+            if rev := result["revision"]: resumed += f"\n개정판 반영: 청크 {rev['kept']:,}개 유지, {rev['rechunked']:,}개 새로 분할 (이전 청크 {rev['removed']:,}개 제거)"
+            self.load_info.config(text=f"불러오기 완료: 총 {len(self.chunks):,}개 청크, {len(self.glossary_data):,}개 용어{resumed}{self.dedup_summary(result['dedup'])}")
+        if not self.showing_first_chunk: self.showing_first_chunk = True; self.current_chunk_index = 0; self.update_ui_for_chunk()
+        else: self.update_button_states()
+
+    def dedup_summary(self, dedup):
+        """반복 블록 제거로 줄어든 양 안내 문구. 청크 캐시를 쓴 경우에는 프로젝트에 기록해 둔 값을 씁니다."""
+        if dedup: self.project.set_meta("dedup", dedup)
+        elif self.settings.get("dedup_blocks") and (stored := self.project.get_meta("dedup")) and stored["key"] == prompt_core.chunking_key(self.settings): dedup = stored
+        if not dedup or not dedup["stats"]["saved_words"]: return ""
+        st = dedup["stats"]
+        return (f"\n반복 블록 {st['blocks'] - st['unique_blocks']:,}개 제외: 단어 {st['saved_words']:,}개, "
+                f"청크 {'약 ' if st['estimated'] else ''}{st['saved_chunks']:,}개 절약")
+
+    def open_project(self, doc_path):
+        """문서의 프로젝트 DB 를 열고 현재 청크 목록과 맞춥니다. (열 수 없으면 메모리에만 기록)"""
+        if self.project: self.project.close()
+        try: self.project = ProjectStore.for_document(doc_path)
+        except Exception as e:
+            messagebox.showwarning("프로젝트 오류", f"작업 기록을 열 수 없어 이번 작업은 저장되지 않습니다: {e}")
+            self.project = ProjectStore(":memory:")
+
+    def record_chunk(self, **fields):
+        """현재 청크의 진행 상황(단계, 초벌/최종 번역, 용어 제안)을 프로젝트에 기록합니다."""
+        if self.project and self.chunks: self.project.update_chunk(self.current_chunk_index, **fields)
+        if fields.get("final") and self.chunks: self.remember_translation(self.current_chunk_index, fields["final"])
+
+    # --- 번역 메모리 ---
+    def get_translation_memory(self):
+        """번역 메모리를 엽니다. (설정에서 끄면 None, 열 수 없으면 이번 실행 동안 끔)"""
+        if self.settings["tm_mode"] == "off": return None
+        if self.tm is None:
+            try: self.tm = TranslationMemory()
+            except Exception as e:
+                messagebox.showwarning("번역 메모리 오류", f"번역 메모리를 열 수 없어 이번 실행에서는 사용하지 않습니다: {e}")
+                self.settings = {**self.settings, "tm_mode": "off"}; return None
+        return self.tm
+
+    def get_tm_match(self, index):
+        """청크의 번역 메모리 비교 결과 (TranslationMemory.match_chunk, 사용 안 하면 None)"""
+        if index not in self.tm_matches:
+            tm = self.get_translation_memory()
+            self.tm_matches[index] = tm.match_chunk(self.chunks[index], threshold=self.settings.get("tm_fuzzy_threshold", DEFAULT_FUZZY_THRESHOLD)) if tm else None
+        return self.tm_matches[index]
+
+    def remember_translation(self, index, final):
+        """확정된 번역을 번역 메모리에 저장합니다. (다른 청크의 비교 결과는 다시 계산)"""
+        if (tm := self.get_translation_memory()) and tm.add(self.chunks[index], final): self.tm_matches.clear()
 
     def process_action(self):
         if not self.chunks: return
         chunk = self.chunks[self.current_chunk_index]
-        if self.current_step == 1: prompt, self.current_step = self.prompt_1_template.format(english_chunk=chunk), 2
+        glossary = self.get_chunk_glossary(self.current_chunk_index)
+        match = self.get_tm_match(self.current_chunk_index) if self.current_step < 3 else None
+        reference = format_tm_reference(match)
+        if self.current_step == 1 and match and match["full"]:
+            # 번역 메모리에 청크 전체가 있으면 1단계를 건너뛰고(skip 모드는 바로 완료) LLM 요청을 줄입니다.
+            full = match["full"]; self.draft_text.delete('1.0', tk.END); self.draft_text.insert('1.0', full)
+            if self.settings["tm_mode"] == "skip":
+                self.current_step = 4; self.record_chunk(stage=4, draft=full, final=full)
+                self.prompt_display.delete('1.0', tk.END); self.prompt_display.insert(tk.END, full); return self.update_button_states()
+            prompt = render_prompt(self.prompt_2_template, reference, english_chunk=chunk, korean_draft=full, glossary=glossary); self.record_chunk(stage=2, draft=full); self.shown_steps[self.current_chunk_index] = 3
+        elif self.current_step == 1: prompt = render_prompt(self.prompt_1_template, reference, english_chunk=chunk, glossary=glossary); self.shown_steps[self.current_chunk_index] = 2
         elif self.current_step == 2:
             if not (draft := self.draft_text.get('1.0', tk.END).strip()): return messagebox.showwarning("입력 필요", "초벌 번역 결과를 입력해주세요.")
-            prompt, self.current_step = self.prompt_2_template.format(english_chunk=chunk, korean_draft=draft), 3
+            prompt = render_prompt(self.prompt_2_template, reference, english_chunk=chunk, korean_draft=draft, glossary=glossary); self.record_chunk(stage=2, draft=draft); self.shown_steps[self.current_chunk_index] = 3
         elif self.current_step == 3:
-            ReviewWindow(self); self.current_step = 4; return self.update_button_states()
+            # 완료 단계는 검토 창에서 최종 번역을 기록할 때 저장합니다.
+            self.shown_steps[self.current_chunk_index] = 4; ReviewWindow(self); return self.update_button_states()
         self.prompt_display.delete('1.0', tk.END); self.prompt_display.insert(tk.END, prompt); self.update_button_states()
 
     def navigate_chunk(self, direction):
         new_index = self.current_chunk_index + direction
         if 0 <= new_index < len(self.chunks):
-            self.current_chunk_index, self.current_step = new_index, 1; self.update_ui_for_chunk()
+            self.project.flush(); self.current_chunk_index = new_index; self.update_ui_for_chunk()
         else: messagebox.showinfo("문서 끝", "문서의 처음 또는 마지막입니다.")
     
     def update_ui_for_chunk(self):
-        self.prompt_display.delete('1.0', tk.END); self.draft_text.delete('1.0', tk.END)
-        self.current_step = 1; self.update_button_states()
+        with span("update_ui_for_chunk"):
+            self.prompt_display.delete('1.0', tk.END); self.draft_text.delete('1.0', tk.END)
+            # 기록된 초벌 번역(직접 입력 또는 자동 번역)이 있으면 2단계 입력란에 채워 둡니다.
+            if draft := self.project.get_chunk(self.current_chunk_index)["draft"]: self.draft_text.insert('1.0', draft)
+            # 번역 메모리에 청크 전체가 있으면 그 번역을 초벌 번역으로 미리 채웁니다.
+            elif self.project.get_stage(self.current_chunk_index) < 3 and (match := self.get_tm_match(self.current_chunk_index)) and match["full"]:
+                self.draft_text.insert('1.0', match["full"])
+            self.update_button_states()
 
     def update_button_states(self):
         if not self.chunks: return self.reset_state()
         total, num = len(self.chunks), self.current_chunk_index + 1
+        # 진행 단계는 메모리에 따로 두지 않고 프로젝트 기록에서 읽습니다.
+        self.current_step = max(self.project.get_stage(self.current_chunk_index), self.shown_steps.get(self.current_chunk_index, 1))
+        done, _ = self.project.progress()
         self.copy_btn.config(state="normal" if self.prompt_display.get('1.0', 'end-1c').strip() else "disabled")
+        self.export_btn.config(state="disabled" if self.loader else "normal")
         info = {1:("1단계","초벌 번역 프롬프트 생성","normal"), 2:("2단계","개선 번역 프롬프트 생성","normal"), 3:("3단계","번역 검토 및 완료","normal"), 4:("완료","완료됨","disabled")}
         s, t, st = info.get(self.current_step)
-        self.status.config(text=f"진행: 청크 {num}/{total} - [{s}]"); self.action_btn.config(text=f"{self.current_step}. {t}", state=st)
+        # 불러오는 중에는 용어집이 바뀔 수 있는 3단계(검토)를 막고, 전체 청크 수 뒤에 '+' 를 붙입니다.
+        if self.loader and self.current_step == 3: t, st = t + " (불러오기 완료 후)", "disabled"
+        if self.loader: total = f"{total}+"
+        tm_note = ""
+        if self.current_step < 3 and (match := self.get_tm_match(self.current_chunk_index)):
+            if match["full"]: tm_note = " · 번역 메모리: 전체 일치"
+            elif match["references"]: tm_note = f" · 번역 메모리: 참고 번역 {len(match['references'])}개"
+            if match["full"] and self.current_step == 1: t = "번역 메모리로 완료 (LLM 생략)" if self.settings["tm_mode"] == "skip" else "번역 메모리 초벌로 개선 프롬프트 생성"
+        self.status.config(text=f"진행: 청크 {num}/{total} - [{s}] (완료 {done}/{total}){tm_note}"); self.action_btn.config(text=f"{self.current_step}. {t}", state=st)
         self.prev_btn.config(state="normal" if self.current_chunk_index > 0 else "disabled")
-        self.next_btn.config(state="normal" if self.current_chunk_index < total - 1 else "disabled")
+        self.next_btn.config(state="normal" if self.current_chunk_index < len(self.chunks) - 1 else "disabled")
 
     def reset_state(self):
-        self.chunks = []
-        for btn in [self.action_btn, self.copy_btn, self.prev_btn, self.next_btn]: btn.config(state="disabled")
+        self.chunks, self.shown_steps = [], {}
+        for btn in [self.action_btn, self.copy_btn, self.export_btn, self.prev_btn, self.next_btn]: btn.config(state="disabled")
         self.status.config(text="진행 상태: 대기 중")
         self.prompt_display.delete('1.0', tk.END); self.draft_text.delete('1.0', tk.END)
 
@@ -527,22 +775,120 @@ class PromptGeneratorApp:
             self.root.clipboard_clear(); self.root.clipboard_append(p); messagebox.showinfo("복사 완료", "프롬프트가 클립보드에 복사되었습니다.")
         else: messagebox.showwarning("복사 실패", "복사할 내용이 없습니다.")
     
+    def export_all_prompts(self, clipboard=False):
+        """문서 전체의 1단계 프롬프트를 파일이나 클립보드로 내보냅니다. (번역 메모리 참고 번역은 넣지 않음)"""
+        if not self.chunks or self.loader: return
+        if not clipboard and not (fp := filedialog.asksaveasfilename(defaultextension=".txt", initialfile=f"{os.path.splitext(os.path.basename(self.doc_path.get()))[0]}_prompts.txt", filetypes=(("Text", "*.txt"), ("All", "*.*")))): return
+        matcher = self.get_glossary_matcher()  # 용어집 동기화는 한 번만
+        def rows():
+            for i, chunk in enumerate(self.chunks):
+                if self.chunk_terms[i] is None: self.chunk_terms[i] = matcher.find_terms(chunk)
+                yield {"english_chunk": chunk, "glossary": format_chunk_glossary(self.glossary_data, self.chunk_terms[i])}
+        with span("export_prompts", chunks=len(self.chunks), clipboard=clipboard):
+            # 템플릿은 한 번만 해석하고, 프롬프트는 하나씩 만들어 바로 씁니다. (클립보드는 한 번에 넣어야 하므로 메모리에 모음)
+            if clipboard:
+                out = io.StringIO(); write_prompts(out, self.prompt_1_template, rows(), len(self.chunks))
+                self.root.clipboard_clear(); self.root.clipboard_append(out.getvalue())
+            else:
+                try:
+                    with open(fp, "w", encoding="utf-8") as f: write_prompts(f, self.prompt_1_template, rows(), len(self.chunks))
+                except OSError as e: return messagebox.showerror("저장 오류", f"파일을 저장하는 중 오류가 발생했습니다:\n{e}")
+        messagebox.showinfo("내보내기 완료", f"청크 {len(self.chunks)}개의 1단계 프롬프트를 " + ("클립보드에 복사했습니다." if clipboard else f"'{os.path.basename(fp)}' 파일에 저장했습니다."))
+
     # --- 추가: 용어집 실시간 동기화 및 병합 함수 ---
+    def get_glossary_store(self):
+        """현재 용어집 경로의 저장소를 반환합니다. (경로가 바뀌면 새로 만듦)"""
+        path = self.glossary_path.get()
+        if self.glossary_store is None or self.glossary_store.path != path:
+            self.glossary_store = GlossaryStore(path)
+        return self.glossary_store
+
     def reload_and_sync_glossary(self):
-        """용어집 파일을 다시 읽어 메모리의 데이터와 병합합니다."""
+        """용어집 파일에서 바뀐 부분만 다시 읽어 메모리의 데이터와 병합합니다."""
         path = self.glossary_path.get()
         if path and os.path.exists(path):
-            file_glossary = load_glossary(path)
-            # 파일의 내용으로 메모리 데이터를 업데이트합니다.
+            # 파일이 그대로면 읽지 않고, 덧붙은 줄만 있으면 그 줄만 읽습니다.
             # 파일에서 수정된 내용은 덮어쓰고, 메모리에만 있던 내용은 유지됩니다.
-            self.glossary_data.update(file_glossary)
+            try: changes = self.get_glossary_store().refresh(); self.glossary_data.update(changes); self.added_terms.update(changes)
+            except Exception as e: messagebox.showwarning("용어집 오류", f"용어집 파일을 읽는 중 오류가 발생했습니다: {e}")
+
+    def get_glossary_matcher(self):
+        """현재 용어집과 동기화된 용어 매처를 반환합니다. (새로 더해진 용어만 컴파일)"""
+        if self.added_terms:
+            if self.glossary_matcher.add_terms(self.added_terms):
+                # 용어가 늘면 청크별 등장 용어를 필요할 때 다시 계산합니다.
+                self.chunk_terms = [None] * len(self.chunks)
+            self.added_terms.clear()
+        return self.glossary_matcher
+
+    def get_chunk_glossary(self, index):
+        """{glossary} 변수에 들어갈, 해당 청크에 등장하는 용어만 담은 용어집 텍스트."""
+        # 불러오는 중에는 작업 스레드가 매처를 사용하고, 용어는 청크와 함께 미리 계산되어 옵니다.
+        if not self.loader: self.get_glossary_matcher()
+        if self.chunk_terms[index] is None:
+            self.chunk_terms[index] = self.get_glossary_matcher().find_terms(self.chunks[index])
+        return format_chunk_glossary(self.glossary_data, self.chunk_terms[index])
+
+    def term_chunk_counts(self):
+        """용어집 용어별 등장 청크 수. (제안 용어 일괄 병합 규칙에 사용)"""
+        matcher = self.glossary_matcher if self.loader else self.get_glossary_matcher()
+        for i, terms in enumerate(self.chunk_terms):
+            if terms is None: self.chunk_terms[i] = matcher.find_terms(self.chunks[i])
+        return count_term_chunks(self.chunk_terms)
+
+    def glossary_savings_text(self):
+        """전체 용어집 대비 청크별 용어집 주입으로 줄어드는 토큰 수(어림값) 안내 문구."""
+        if not self.chunks or not self.glossary_data:
+            return "문서와 용어집을 불러오면 청크별 토큰 절감량이 표시됩니다."
+        full = sum(estimate_tokens(format_glossary_line(e, k)) for e, k in self.glossary_data.items())
+        per_chunk = [estimate_tokens(self.get_chunk_glossary(i)) for i in range(len(self.chunks))]
+        current, average = per_chunk[self.current_chunk_index], sum(per_chunk) // len(per_chunk)
+        return (f"전체 용어집: 약 {full:,} 토큰 ({len(self.glossary_data):,}개 용어)\n"
+                f"현재 청크({self.current_chunk_index + 1}/{len(self.chunks)}): 약 {current:,} 토큰 → {full - current:,} 토큰 절감\n"
+                f"청크 평균: 약 {average:,} 토큰 → 청크당 {full - average:,} 토큰, 문서 전체 {(full - average) * len(self.chunks):,} 토큰 절감 (1·2단계 각각)")
 
     def save_current_glossary(self):
         if not (path := self.glossary_path.get()): return messagebox.showerror("오류", "용어집 파일 경로가 지정되지 않았습니다.")
-        if save_glossary(path, self.glossary_data): messagebox.showinfo("저장 완료", f"'{os.path.basename(path)}' 파일에 용어집을 저장했습니다.")
-
-if __name__ == "__main__":
+        # 바뀐 항목만 파일 끝에 덧붙이고, 쌓이면 정렬된 파일로 압축합니다.
+        try: self.get_glossary_store().save(self.glossary_data)
+        except Exception as e: return messagebox.showerror("저장 오류", f"용어집 파일 저장 중 오류가 발생했습니다: {e}")
+        messagebox.showinfo("저장 완료", f"'{os.path.basename(path)}' 파일에 용어집을 저장했습니다.")
+
+def report_startup(app, timer, exit_after):
+    """시작 시간 측정 결과를 trace 파일과 표준 출력(있으면), 상태 표시줄에 남깁니다."""
+    record = timer.to_record(frozen=bool(getattr(sys, "frozen", False)), python=sys.version.split()[0])
+    perf_trace.log_record(record)
+    if sys.stdout: print(json.dumps(record, ensure_ascii=False), flush=True)
+    app.trace_status.config(text="⏱ 시작 " + ", ".join(f"{k} {v / 1000:.2f}초" for k, v in record["marks"].items()))
+    if exit_after: app.root.after(0, app.on_close)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="3단계 번역 프롬프트 생성기")
+    parser.add_argument("--startup-timing", action="store_true", help=f"시작 시간(import, 첫 화면, 설정 읽기)을 측정해 기록 (또는 {STARTUP_TIMING_ENV_VAR}=1)")
+    parser.add_argument("--exit-after-startup", action="store_true", help="시작 시간 측정 후 바로 종료 (반복 측정용)")
+    args, _ = parser.parse_known_args(argv)
+    timing = args.startup_timing or args.exit_after_startup or os.environ.get(STARTUP_TIMING_ENV_VAR) == "1"
+    timer = perf_trace.StartupTimer(_STARTUP_T0) if timing else None
+    if timer: timer.marks["imports"] = round((_STARTUP_IMPORTED - _STARTUP_T0) * 1000, 3)
     root = tk.Tk()
-    app = PromptGeneratorApp(root)
+    if timer: timer.mark("tk_root")
+    app = PromptGeneratorApp(root); app.startup_timer = timer
+    if timer:
+        timer.mark("widgets")
+        # 창이 화면에 나타난(Map) 뒤 첫 유휴 시점을 첫 화면 표시 시각으로 봅니다.
+        def on_map(event):
+            if event.widget is root: root.after_idle(lambda: timer.mark("first_paint"))
+        root.bind("<Map>", on_map, add="+")
+        def wait_for_marks():
+            if "first_paint" in timer.marks and "settings_ready" in timer.marks: report_startup(app, timer, args.exit_after_startup)
+            else: root.after(10, wait_for_marks)
+        root.after(10, wait_for_marks)
     root.mainloop()
 
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # 용어 일관성 보고서의 프로세스 풀 (EXE)
+    main()
+
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+프롬프트 생성 서비스 (로컬 HTTP/JSON API)
+
+여러 사람이나 내부 도구가 같은 문서와 용어집을 각자 다시 읽지 않도록, 한 프로세스가 분할 결과와 용어집(매처 포함)을
+메모리에 올려 둔 채 요청을 처리합니다.
+- 문서 분할(chunk_document_by_word_count), 1/2/3단계 프롬프트 생성, 용어집 조회, 용어 불일치 검사
+- 문서/용어집은 경로별 LRU 캐시에 두며, 파일의 크기나 수정 시각이 바뀌면 다시 읽습니다.
+  같은 항목을 여러 요청이 동시에 처음 요청하면 한 번만 읽습니다.
+- 요청은 스레드별로 동시에 처리합니다. (ThreadingHTTPServer, keep-alive)
+- GET /stats 로 캐시 적중률과 경로별 처리 시간을 볼 수 있고, service_load_test.py 로 처리량/지연 시간을 잽니다.
+tkinter 를 사용하지 않습니다.
+
+API (POST 는 JSON 본문, 응답은 모두 JSON. 경로는 서버 기준이며 상대 경로는 --root 기준):
+    GET  /health
+    GET  /stats
+    POST /chunks          {"document", "chunk_size"?, "start"?, "limit"?}
+    POST /prompt          {"stage": 1|2|3, "document"+"chunk" 또는 "text", "glossary"?,
+                           "korean_draft"(2단계), "final_korean_text"(3단계), "tm_reference"?}
+    POST /glossary/lookup {"glossary", "terms"?: [...], "text"?}
+    POST /check           {"glossary", "document"+"chunk" 또는 "text", "translation"}
+
+사용 예:
+    python prompt_service.py --port 8766 -c CustomPrompt.json
+    curl -s localhost:8766/prompt -d '{"stage": 1, "document": "원문.docx", "chunk": 0, "glossary": "Translation glossary.txt"}'
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import prompt_core
+from prompt_core import DEFAULT_PROMPT_3_SUGGESTION, extract_translation, find_glossary_mismatches, format_chunk_glossary
+from glossary_index import open_glossary, matcher_for
+from perf_trace import span
+from prompt_template import TemplateError, compile_template, compile_prompt_settings, render_prompt
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+DEFAULT_MAX_DOCUMENTS = 32
+DEFAULT_MAX_GLOSSARIES = 4
+MAX_BODY_BYTES = 16 * 1024 * 1024
+TERMS_MEMO_SIZE = 4096  # 용어집마다 기억할 청크별 용어 찾기 결과 수
+
+
+class ServiceError(Exception):
+    """요청 오류. status 는 응답 HTTP 상태 코드입니다."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _file_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise ServiceError(404, f"파일이 없습니다: {path}") from None
+    return st.st_size, st.st_mtime_ns
+
+
+class WarmCache:
+    """
+    경로별로 읽은 결과를 메모리에 두는 LRU 캐시.
+    파일의 (크기, 수정 시각)이 기록과 다르면 다시 읽고, 같은 항목을 동시에 처음 요청하면 한 스레드만 읽고 나머지는 기다립니다.
+    밀려난 항목은 다른 요청이 아직 쓰고 있을 수 있으므로 닫지 않고 참조가 없어질 때 정리되게 둡니다.
+    """
+
+    def __init__(self, name, loader, max_entries):
+        self.name, self.loader, self.max_entries = name, loader, max_entries
+        self._entries = OrderedDict()  # (경로, *변형) -> (파일 상태, 값)
+        self._loading = {}             # 읽는 중인 키 -> threading.Event
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, path, *variant):
+        key, stat = (path, *variant), _file_stat(path)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == stat:
+                    self._entries.move_to_end(key); self.hits += 1
+                    return entry[1]
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = threading.Event(); self.misses += 1
+                    break
+            pending.wait()  # 다른 스레드가 읽는 중 (실패했으면 다시 시도)
+        try:
+            with span(f"service_load_{self.name}", path=os.path.basename(path)):
+                value = self.loader(path, *variant)
+            with self._lock:
+                self._entries.pop(key, None)
+                self._entries[key] = (stat, value)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False); self.evictions += 1
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+            pending.set()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "hit_rate": round(self.hits / total, 4) if total else None}
+
+
+def _load_document(path, chunk_size):
+    return prompt_core.chunk_document_by_word_count(path, chunk_size)
+
+
+class WarmGlossary:
+    """캐시에 올려 둔 용어집과 매처. 같은 청크를 여러 번 요청하는 경우가 많아 청크별 용어 찾기 결과도 최근 것부터 기억합니다."""
+
+    def __init__(self, path):
+        self.glossary = open_glossary(path)
+        self.matcher = matcher_for(self.glossary)
+        self._terms, self._lock = OrderedDict(), threading.Lock()
+
+    def find_terms(self, text):
+        with self._lock:
+            terms = self._terms.get(text)
+            if terms is not None:
+                self._terms.move_to_end(text)
+                return terms
+        terms = frozenset(self.matcher.find_terms(text))
+        with self._lock:
+            self._terms[text] = terms
+            if len(self._terms) > TERMS_MEMO_SIZE:
+                self._terms.popitem(last=False)
+        return terms
+
+
+class PromptService:
+    """HTTP 와 무관한 요청 처리. 각 메서드는 요청 dict 를 받아 응답 dict 를 반환하고, 잘못된 요청은 ServiceError 로 알립니다."""
+
+    def __init__(self, settings, root=None, max_documents=DEFAULT_MAX_DOCUMENTS, max_glossaries=DEFAULT_MAX_GLOSSARIES):
+        self.settings = settings
+        # 템플릿은 시작할 때 한 번만 해석/검사합니다. (잘못된 템플릿은 TemplateError)
+        self.templates = {**compile_prompt_settings(settings), "prompt3": compile_template(DEFAULT_PROMPT_3_SUGGESTION, "prompt3")}
+        self.root = os.path.abspath(root) if root else None
+        self.documents = WarmCache("document", _load_document, max_documents)
+        self.glossaries = WarmCache("glossary", WarmGlossary, max_glossaries)
+        self.started = time.time()
+        self._endpoint_stats, self._stats_lock = {}, threading.Lock()
+
+    # --- 입력 ---
+    def _path(self, request, field):
+        value = request.get(field)
+        if not isinstance(value, str) or not value:
+            raise ServiceError(400, f"'{field}' 경로가 필요합니다.")
+        path = os.path.abspath(os.path.join(self.root or os.getcwd(), value))
+        if self.root and os.path.commonpath([self.root, path]) != self.root:
+            raise ServiceError(403, f"허용된 폴더 밖의 경로입니다: {value}")
+        return path
+
+    def _int(self, request, field, default):
+        value = request.get(field, default)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ServiceError(400, f"'{field}' 는 0 이상의 정수여야 합니다.")
+        return value
+
+    def _chunks(self, request):
+        chunk_size = self._int(request, "chunk_size", self.settings["chunk_size"])
+        if not chunk_size:
+            raise ServiceError(400, "'chunk_size' 는 1 이상이어야 합니다.")
+        return self.documents.get(self._path(request, "document"), chunk_size), chunk_size
+
+    def _chunk_text(self, request):
+        """요청의 원문 청크: text 가 있으면 그대로, 없으면 document 의 chunk 번째 청크."""
+        if isinstance(request.get("text"), str):
+            return request["text"]
+        if "chunk" not in request:
+            raise ServiceError(400, "'text' 또는 'document' 와 'chunk' 가 필요합니다.")
+        index = self._int(request, "chunk", 0)
+        chunks, _ = self._chunks(request)
+        if index >= len(chunks):
+            raise ServiceError(404, f"청크 번호가 범위를 벗어났습니다: {index} (청크 {len(chunks)}개)")
+        return chunks[index]
+
+    def _glossary(self, request, required=False):
+        if not request.get("glossary") and not required:
+            return None
+        return self.glossaries.get(self._path(request, "glossary"))
+
+    # --- API ---
+    def chunks(self, request):
+        chunks, chunk_size = self._chunks(request)
+        start = self._int(request, "start", 0)
+        limit = self._int(request, "limit", len(chunks))
+        return {"count": len(chunks), "chunk_size": chunk_size, "start": start, "chunks": list(chunks[start:start + limit])}
+
+    def prompt(self, request):
+        stage = request.get("stage")
+        if stage not in (1, 2, 3):
+            raise ServiceError(400, "'stage' 는 1, 2, 3 중 하나여야 합니다.")
+        chunk = self._chunk_text(request)
+        if stage == 3:
+            final = request.get("final_korean_text")
+            if not isinstance(final, str) or not final.strip():
+                raise ServiceError(400, "3단계에는 'final_korean_text' 가 필요합니다.")
+            return {"stage": stage, "prompt": render_prompt(self.templates["prompt3"], english_chunk=chunk, final_korean_text=final)}
+        warm = self._glossary(request)
+        terms = warm.find_terms(chunk) if warm else frozenset()
+        values = {"english_chunk": chunk, "glossary": format_chunk_glossary(warm.glossary if warm else {}, terms)}
+        if stage == 2:
+            if not isinstance(request.get("korean_draft"), str) or not request["korean_draft"].strip():
+                raise ServiceError(400, "2단계에는 'korean_draft' 가 필요합니다.")
+            values["korean_draft"] = request["korean_draft"]
+        prompt = render_prompt(self.templates[f"prompt{stage}"], request.get("tm_reference") or "", **values)
+        return {"stage": stage, "prompt": prompt, "terms": sorted(terms, key=str.lower)}
+
+    def lookup(self, request):
+        warm = self._glossary(request, required=True)
+        glossary, result = warm.glossary, {}
+        if isinstance(request.get("terms"), list):
+            result["entries"] = {term: {eng: glossary[eng] for eng in sorted(warm.matcher.lookup(term))}
+                                 for term in request["terms"] if isinstance(term, str)}
+        if isinstance(request.get("text"), str):
+            result["found"] = {eng: glossary[eng] for eng in sorted(warm.find_terms(request["text"]), key=str.lower)}
+        if not result:
+            raise ServiceError(400, "'terms' 목록이나 'text' 가 필요합니다.")
+        return result
+
+    def check(self, request):
+        if not isinstance(request.get("translation"), str):
+            raise ServiceError(400, "'translation' 이 필요합니다.")
+        warm = self._glossary(request, required=True)
+        glossary, chunk, translation = warm.glossary, self._chunk_text(request), extract_translation(request["translation"])
+        terms = warm.find_terms(chunk)
+        mismatches = find_glossary_mismatches(glossary, terms, translation)
+        return {"terms": len(terms), "mismatches": [{"eng": eng, "kor": kor} for eng, kor in mismatches]}
+
+    def stats(self, request=None):
+        with self._stats_lock:
+            endpoints = {name: {"requests": s["requests"], "errors": s["errors"],
+                                "mean_ms": round(s["total_s"] / s["requests"] * 1000, 3), "max_ms": round(s["max_s"] * 1000, 3)}
+                         for name, s in self._endpoint_stats.items()}
+        return {"uptime_s": round(time.time() - self.started, 1), "documents": self.documents.stats(),
+                "glossaries": self.glossaries.stats(), "endpoints": endpoints}
+
+    def record(self, name, elapsed, ok):
+        with self._stats_lock:
+            s = self._endpoint_stats.setdefault(name, {"requests": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0})
+            s["requests"] += 1; s["errors"] += not ok; s["total_s"] += elapsed; s["max_s"] = max(s["max_s"], elapsed)
+
+
+POST_ROUTES = {"/chunks": "chunks", "/prompt": "prompt", "/glossary/lookup": "lookup", "/check": "check"}
+GET_ROUTES = {"/health": None, "/stats": "stats"}
+
+
+class PromptServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive 연결 재사용 지원
+    disable_nagle_algorithm = True  # 헤더와 본문을 따로 쓰므로, 켜 두면 응답마다 지연 ACK 만큼(~40ms) 늦어짐
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path not in GET_ROUTES:
+            return self.send_json(404, {"error": f"알 수 없는 경로입니다: {path}"})
+        self.handle_request(path, GET_ROUTES[path], {})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return self.send_json(413, {"error": "요청 본문이 너무 큽니다."})
+        body = self.rfile.read(length)
+        if path not in POST_ROUTES:
+            return self.send_json(404, {"error": f"알 수 없는 경로입니다: {path}"})
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError as e:
+            return self.send_json(400, {"error": f"JSON 형식 오류: {e}"})
+        if not isinstance(request, dict):
+            return self.send_json(400, {"error": "요청 본문은 JSON 객체여야 합니다."})
+        self.handle_request(path, POST_ROUTES[path], request)
+
+    def handle_request(self, path, method, request):
+        service, t0 = self.server.service, time.perf_counter()
+        status = 200
+        try:
+            with span("service_request", path=path):
+                payload = getattr(service, method)(request) if method else {"ok": True}
+        except ServiceError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:  # 한 요청의 실패가 서버를 멈추지 않도록 응답으로 돌려줍니다.
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        service.record(path, time.perf_counter() - t0, status == 200)
+        self.send_json(status, payload)
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PromptServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # 기본값(5)이면 동시 접속이 몰릴 때 연결이 거부됨
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = PromptServiceServer((host, port), PromptServiceHandler)
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="문서 분할/프롬프트 생성/용어 검사를 로컬 HTTP API 로 제공합니다.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"바인딩 주소 (기본값: {DEFAULT_HOST}, 이 컴퓨터에서만 접속)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"포트 (기본값: {DEFAULT_PORT})")
+    parser.add_argument("-c", "--config", help=f"설정 파일 (기본값: 프로그램 폴더의 {prompt_core.CONFIG_FILE_NAME})")
+    parser.add_argument("--root", help="문서/용어집 경로의 기준 폴더. 지정하면 이 폴더 밖의 파일은 읽지 않습니다.")
+    parser.add_argument("--max-documents", type=int, default=DEFAULT_MAX_DOCUMENTS,
+                        help=f"메모리에 둘 분할 결과 수 (기본값: {DEFAULT_MAX_DOCUMENTS})")
+    parser.add_argument("--max-glossaries", type=int, default=DEFAULT_MAX_GLOSSARIES,
+                        help=f"메모리에 둘 용어집 수 (기본값: {DEFAULT_MAX_GLOSSARIES})")
+    args = parser.parse_args(argv)
+
+    if args.root and not os.path.isdir(args.root):
+        parser.error(f"폴더가 없습니다: {args.root}")
+    settings = prompt_core.load_settings_from_json(args.config)
+    try:
+        service = PromptService(settings, args.root, args.max_documents, args.max_glossaries)
+    except TemplateError as e:
+        parser.error(str(e))
+    server = make_server(service, args.host, args.port)
+    print(f"프롬프트 생성 서비스: http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
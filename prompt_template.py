@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+미리 해석한 프롬프트 템플릿
+
+str.format 은 부를 때마다 템플릿을 다시 해석하고, 설정 창에서 잘못 쓴 중괄호나 변수 이름은 프롬프트를 만들 때에야 오류가 납니다.
+여기서는 템플릿을 한 번만 해석해 리터럴 조각과 변수 자리 목록(CompiledTemplate)으로 만들어 두고,
+설정을 저장하거나 불러올 때 단계별 사용 가능 변수와 필수 변수를 검사해 줄/글자 위치와 함께 알려 줍니다.
+- 결과는 str.format 과 같습니다. ({{ }} 이스케이프, !r 변환, :>10 서식 포함)
+- 같은 템플릿 문자열은 다시 해석하지 않습니다. (compile_template 캐시)
+- write_prompts 는 청크별 프롬프트를 하나씩 만들어 바로 쓰므로, 문서 전체를 내보내도 메모리에는 프롬프트 하나만 둡니다.
+tkinter 를 사용하지 않습니다.
+"""
+
+import string
+from functools import lru_cache
+
+# 단계별 사용 가능 변수와 필수 변수 (설정 창 안내문과 같음)
+PROMPT_FIELDS = {
+    "prompt1": ("english_chunk", "glossary", "tm_reference"),
+    "prompt2": ("english_chunk", "korean_draft", "glossary", "tm_reference"),
+    "prompt3": ("english_chunk", "final_korean_text"),
+}
+REQUIRED_FIELDS = {
+    "prompt1": ("english_chunk",),
+    "prompt2": ("english_chunk", "korean_draft"),
+    "prompt3": ("english_chunk", "final_korean_text"),
+}
+PROMPT_LABELS = {"prompt1": "1단계 프롬프트", "prompt2": "2단계 프롬프트", "prompt3": "3단계 프롬프트"}
+
+PROMPT_EXPORT_HEADER = "===== 청크 {number} / {total} =====\n"
+TM_REFERENCE_SECTION = "\n\n[번역 메모리 참고]\n{}\n[/번역 메모리 참고]\n"
+
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+_parse = string.Formatter().parse
+
+
+class TemplateError(ValueError):
+    """템플릿 형식 오류. position 은 문제가 된 글자의 위치(없으면 None)입니다."""
+
+    def __init__(self, message, position=None):
+        super().__init__(message)
+        self.position = position
+
+
+def _location(text, position):
+    line = text.count("\n", 0, position) + 1
+    column = position - (text.rfind("\n", 0, position) + 1) + 1
+    return f"{line}번째 줄 {column}번째 글자"
+
+
+def _brace_error_position(text):
+    """짝이 맞지 않는 첫 중괄호의 위치. ('{{', '}}' 는 글자 그대로의 중괄호)"""
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "{}" and text.startswith(ch * 2, i):
+            i += 2
+        elif ch == "}":
+            return i
+        elif ch == "{":
+            depth, j = 1, i + 1
+            while j < n and depth:
+                depth += {"{": 1, "}": -1}.get(text[j], 0); j += 1
+            if depth:
+                return i
+            i = j
+        else:
+            i += 1
+    return None
+
+
+class CompiledTemplate:
+    """
+    한 번 해석해 둔 템플릿. 렌더링은 리터럴 조각 사이의 변수 자리만 채워 이어 붙입니다.
+    allowed 를 주면 그 밖의 변수를, required 의 변수가 없으면 TemplateError 로 알립니다.
+    """
+
+    __slots__ = ("text", "fields", "_pieces", "_slots")
+
+    def __init__(self, text, allowed=None, required=(), label="프롬프트"):
+        self.text = text
+        pieces, slots = [], []  # pieces: 리터럴 조각과 변수 자리(None), slots: (pieces 안의 위치, 변수 이름, 변환, 서식)
+        try:
+            for literal, name, spec, conversion in _parse(text):
+                if literal:
+                    if pieces and pieces[-1] is not None:
+                        pieces[-1] += literal  # '{{' 에서 나뉜 조각은 이어 붙임
+                    else:
+                        pieces.append(literal)
+                if name is None:
+                    continue
+                if not name.isidentifier() or (allowed is not None and name not in allowed):
+                    where = text.find("{" + name)
+                    names = f" (사용 가능: {', '.join(f'{{{f}}}' for f in allowed)})" if allowed is not None else ""
+                    raise TemplateError(f"{label}: {_location(text, where)}의 {{{name}}} 는 사용할 수 없는 변수입니다.{names}"
+                                        f" 중괄호를 글자 그대로 쓰려면 '{{{{', '}}}}' 처럼 두 번 쓰세요.", where)
+                if spec and "{" in spec:
+                    raise TemplateError(f"{label}: 변수 {{{name}}} 의 서식 안에는 다른 변수를 쓸 수 없습니다.")
+                slots.append((len(pieces), name, _CONVERSIONS[conversion] if conversion else None, spec))
+                pieces.append(None)
+        except ValueError as e:
+            if isinstance(e, TemplateError):
+                raise
+            where = _brace_error_position(text)
+            if where is None:
+                raise TemplateError(f"{label}: 템플릿 형식 오류 ({e})") from None
+            raise TemplateError(f"{label}: {_location(text, where)}의 '{text[where]}' 짝이 맞지 않습니다."
+                                f" 중괄호를 글자 그대로 쓰려면 '{text[where] * 2}' 처럼 두 번 쓰세요.", where) from None
+        self.fields = frozenset(name for _, name, _, _ in slots)
+        for name in required:
+            if name not in self.fields:
+                raise TemplateError(f"{label}에 필수 변수 {{{name}}} 가 없습니다.")
+        self._pieces, self._slots = pieces, tuple(slots)
+
+    def render(self, values):
+        """values(dict)로 변수를 채운 문자열. 쓰이지 않는 값은 무시하고, 없는 값은 KeyError 입니다. (str.format 과 같음)"""
+        pieces = self._pieces.copy()
+        for slot, name, convert, spec in self._slots:
+            value = values[name]
+            if convert:
+                value = convert(value)
+            pieces[slot] = value if value.__class__ is str and not spec else format(value, spec)
+        return "".join(pieces)
+
+    def __repr__(self):
+        return f"CompiledTemplate({self.text[:40]!r}, fields={sorted(self.fields)})"
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(text, kind):
+    if kind is None:
+        return CompiledTemplate(text)
+    return CompiledTemplate(text, PROMPT_FIELDS[kind], REQUIRED_FIELDS[kind], PROMPT_LABELS[kind])
+
+
+def compile_template(template, kind=None):
+    """
+    템플릿 문자열을 해석합니다. (같은 문자열은 캐시된 결과를 반환, 이미 해석한 템플릿은 그대로)
+    kind("prompt1", "prompt2", "prompt3")를 주면 그 단계의 사용 가능 변수와 필수 변수도 검사합니다.
+    """
+    if isinstance(template, CompiledTemplate):
+        return template
+    return _compile_cached(template, kind)
+
+
+def compile_prompt_settings(settings):
+    """설정의 1/2단계 프롬프트를 해석/검사합니다. 반환값: {"prompt1": CompiledTemplate, "prompt2": ...}, 오류는 TemplateError"""
+    return {kind: compile_template(settings[kind], kind) for kind in ("prompt1", "prompt2")}
+
+
+def render_prompt(template, tm_reference="", **values):
+    """
+    템플릿(문자열 또는 CompiledTemplate)을 채웁니다.
+    템플릿에 {tm_reference} 가 있으면 그 자리에, 없으면 참고 번역이 있을 때만 끝에 덧붙입니다.
+    """
+    compiled = compile_template(template)
+    values["tm_reference"] = tm_reference
+    prompt = compiled.render(values)
+    if tm_reference and "tm_reference" not in compiled.fields:
+        prompt = prompt.rstrip() + TM_REFERENCE_SECTION.format(tm_reference)
+    return prompt
+
+
+def write_prompts(out, template, rows, total=None, header=PROMPT_EXPORT_HEADER):
+    """
+    청크별 변수 dict 목록(rows, 이터레이터 가능)으로 프롬프트를 하나씩 만들어 out 에 바로 씁니다.
+    tm_reference 값은 render_prompt 와 같은 규칙으로 넣습니다. 프롬프트 사이에는 header(청크 번호)를 넣습니다.
+    반환값: 쓴 프롬프트 수
+    """
+    compiled = compile_template(template)
+    count = 0
+    for count, values in enumerate(rows, 1):
+        if header:
+            out.write(("\n" if count > 1 else "") + header.format(number=count, total=total or "?"))
+        out.write(render_prompt(compiled, **values))
+        out.write("\n")
+    return count
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+프롬프트 생성 서비스(prompt_service.py) 부하 측정 도구
+
+여러 클라이언트 스레드가 keep-alive 연결로 요청을 동시에 보내고, 경로별 처리량과 지연 시간(평균, p50/p90/p99)을 잽니다.
+첫 요청(문서 분할, 용어집 읽기)은 캐시가 비어 있을 때의 시간으로 따로 기록하고, 끝나면 서버의 /stats 도 함께 저장합니다.
+--spawn 을 주면 서비스를 별도 프로세스로 띄워 측정한 뒤 종료합니다. (클라이언트와 서버가 GIL 을 나누지 않도록)
+
+사용 예:
+    python service_load_test.py 원문.docx -g "Translation glossary.txt" --spawn
+    python service_load_test.py 원문.docx -g glossary.kgi --url http://127.0.0.1:8766 -n 16 --duration 30 -o load.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+
+from prompt_service import DEFAULT_HOST, DEFAULT_PORT
+
+DEFAULT_MIX = {"prompt": 4, "check": 2, "lookup": 2, "chunks": 1}
+SPAWN_TIMEOUT_S = 30
+SAMPLE_CHUNKS = 64  # 용어집 조회 요청에 쓸 청크 수
+
+
+class ServiceClient:
+    """keep-alive 연결 하나를 쓰는 JSON 클라이언트. (스레드마다 하나씩)"""
+
+    def __init__(self, url, timeout=60):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+
+    def call(self, path, payload=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+        self.conn.request("POST" if body is not None else "GET", path, body, {"Content-Type": "application/json"})
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def close(self):
+        self.conn.close()
+
+
+def make_request(kind, args, chunk_count, samples, rng):
+    """경로별 요청 본문. 용어집 조회는 미리 받아 둔 청크(samples) 본문에서 용어를 찾습니다."""
+    doc = {"document": args.document, "chunk": rng.randrange(chunk_count), "chunk_size": args.chunk_size}
+    glossary = {"glossary": args.glossary} if args.glossary else {}
+    if kind == "prompt":
+        return "/prompt", {"stage": 1, **doc, **glossary}
+    if kind == "check":
+        return "/check", {**doc, **glossary, "translation": "번역문"}
+    if kind == "lookup":
+        return "/glossary/lookup", {**glossary, "text": rng.choice(samples)}
+    return "/chunks", {"document": args.document, "chunk_size": args.chunk_size, "start": doc["chunk"], "limit": 16}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(latencies, elapsed):
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {"requests": len(values), "requests_per_s": round(len(values) / elapsed, 1) if elapsed else None,
+            "mean_ms": ms(sum(values) / len(values)) if values else None,
+            "p50_ms": ms(percentile(values, 0.5)), "p90_ms": ms(percentile(values, 0.9)),
+            "p99_ms": ms(percentile(values, 0.99)), "max_ms": ms(values[-1] if values else None)}
+
+
+def run_load(args, kinds, weights, chunk_count, samples):
+    """클라이언트 스레드를 돌려 {경로 종류: [지연 시간]} 과 오류 목록, 경과 시간을 반환합니다."""
+    latencies = {kind: [] for kind in kinds}
+    errors, lock = [], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    remaining = [args.requests] if args.requests else None
+
+    def worker(seed):
+        rng, client = random.Random(seed), ServiceClient(args.url)
+        local = {kind: [] for kind in kinds}
+        try:
+            while time.perf_counter() < deadline:
+                if remaining is not None:
+                    with lock:
+                        if remaining[0] <= 0:
+                            break
+                        remaining[0] -= 1
+                kind = rng.choices(kinds, weights)[0]
+                path, payload = make_request(kind, args, chunk_count, samples, rng)
+                t0 = time.perf_counter()
+                try:
+                    status, body = client.call(path, payload)
+                except (OSError, http.client.HTTPException) as e:
+                    status, body = None, {"error": repr(e)}
+                    client.close(); client = ServiceClient(args.url)
+                elapsed = time.perf_counter() - t0
+                if status == 200:
+                    local[kind].append(elapsed)
+                else:
+                    with lock:
+                        errors.append({"kind": kind, "status": status, "error": body.get("error")})
+        finally:
+            client.close()
+            with lock:
+                for kind, values in local.items():
+                    latencies[kind].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(args.seed + i,), daemon=True) for i in range(args.concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors, time.perf_counter() - t0
+
+
+def spawn_service(args):
+    """서비스를 빈 포트의 별도 프로세스로 띄우고 /health 가 응답할 때까지 기다립니다."""
+    import socket
+    with socket.socket() as sock:
+        sock.bind((DEFAULT_HOST, 0))
+        port = sock.getsockname()[1]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_service.py")
+    command = [sys.executable, script, "--host", DEFAULT_HOST, "--port", str(port)] + (["-c", args.config] if args.config else [])
+    process = subprocess.Popen(command, stderr=subprocess.DEVNULL)
+    args.url = f"http://{DEFAULT_HOST}:{port}"
+    deadline = time.time() + SPAWN_TIMEOUT_S
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("서비스 프로세스가 시작하지 못했습니다.")
+        try:
+            client = ServiceClient(args.url, timeout=1)
+            client.call("/health"); client.close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("서비스가 응답하지 않습니다.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="프롬프트 생성 서비스의 처리량과 지연 시간을 잽니다.")
+    parser.add_argument("document", help="요청에 쓸 원문 .docx (서비스 기준 경로)")
+    parser.add_argument("-g", "--glossary", help="요청에 쓸 용어집 (.txt 또는 .kgi)")
+    parser.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", help="서비스 주소")
+    parser.add_argument("--spawn", action="store_true", help="서비스를 새 프로세스로 띄워 측정")
+    parser.add_argument("-c", "--config", help="--spawn 으로 띄울 서비스의 설정 파일")
+    parser.add_argument("-n", "--concurrency", type=int, default=8, help="동시 클라이언트 수 (기본값: 8)")
+    parser.add_argument("--duration", type=float, default=10.0, help="측정 시간(초, 기본값: 10)")
+    parser.add_argument("--requests", type=int, help="총 요청 수 (지정하면 이만큼 보내면 끝냄)")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="경로별 비율 (기본값: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=400, help="단어 수 분할 크기 (기본값: 400)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="결과 JSON 파일")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = {kind: float(weight) for kind, weight in (item.split("=") for item in args.mix.split(","))}
+    except ValueError:
+        parser.error(f"--mix 형식 오류: {args.mix}")
+    if unknown := set(mix) - set(DEFAULT_MIX):
+        parser.error(f"알 수 없는 경로 종류: {', '.join(sorted(unknown))}")
+    if not args.glossary and {"check", "lookup"} & set(mix):
+        mix = {k: v for k, v in mix.items() if k not in ("check", "lookup")}
+    args.document = os.path.abspath(args.document)
+    args.glossary = args.glossary and os.path.abspath(args.glossary)
+
+    process = spawn_service(args) if args.spawn else None
+    try:
+        # 캐시가 빈 상태의 첫 요청 시간 (문서 분할, 용어집 읽기와 매처 생성)
+        client, cold = ServiceClient(args.url), {}
+        t0 = time.perf_counter()
+        status, body = client.call("/chunks", {"document": args.document, "chunk_size": args.chunk_size, "limit": SAMPLE_CHUNKS})
+        cold["document_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        if status != 200:
+            print(f"[오류] {body.get('error')}", file=sys.stderr)
+            return 1
+        chunk_count, samples = body["count"], body["chunks"]
+        if not chunk_count:
+            print("[오류] 문서에 청크가 없습니다.", file=sys.stderr)
+            return 1
+        if args.glossary:
+            t0 = time.perf_counter()
+            status, body = client.call("/glossary/lookup", {"glossary": args.glossary, "terms": []})
+            cold["glossary_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            if status != 200:
+                print(f"[오류] {body.get('error')}", file=sys.stderr)
+                return 1
+        client.close()
+
+        kinds = list(mix)
+        latencies, errors, elapsed = run_load(args, kinds, [mix[k] for k in kinds], chunk_count, samples)
+        client = ServiceClient(args.url)
+        _, server_stats = client.call("/stats"); client.close()
+    finally:
+        if process:
+            process.terminate(); process.wait()
+
+    results = {"url": args.url, "concurrency": args.concurrency, "elapsed_s": round(elapsed, 3), "chunks": chunk_count,
+               "cold": cold, "total": summarize([v for values in latencies.values() for v in values], elapsed),
+               "by_kind": {kind: summarize(values, elapsed) for kind, values in latencies.items()},
+               "errors": len(errors), "error_samples": errors[:10], "server": server_stats}
+    print(f"청크 {chunk_count}개, 동시 {args.concurrency}, {elapsed:.1f}초, 첫 요청: "
+          + ", ".join(f"{k} {v:.1f} ms" for k, v in cold.items()), file=sys.stderr)
+    for name, row in [("total", results["total"])] + list(results["by_kind"].items()):
+        if row["requests"]:
+            print(f"{name:<8} {row['requests']:>8} 건 {row['requests_per_s']:>9} 건/초  평균 {row['mean_ms']:>8} ms  "
+                  f"p50 {row['p50_ms']:>8}  p90 {row['p90_ms']:>8}  p99 {row['p99_ms']:>8} ms", file=sys.stderr)
+    if errors:
+        print(f"오류 {len(errors)}건 (예: {errors[0]})", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
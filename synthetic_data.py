@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+벤치마크용 합성 문서/용어집 생성기
+
+실제 문서 없이 성능을 재기 위해, 크기를 지정한 .docx 문서와 용어집을 만듭니다.
+- 문서: 문단, 표(가로 병합 포함), 텍스트 상자, 섹션별 머리글/바닥글, 각주를 포함합니다.
+- 용어집: 서로 다른 영어 용어(일부는 두 단어, 일부는 대문자 시작)와 한글 번역.
+같은 인자와 seed 로 만들면 항상 같은 내용이 나옵니다.
+문서 본문에는 용어 번호 0 ~ DOCUMENT_TERM_POOL-1 의 용어가 섞여 있어, 그보다 큰 용어집이면 본문 용어가 모두 포함됩니다.
+"""
+
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+WORDS_PER_PARAGRAPH = 55
+PARAGRAPHS_PER_PAGE = 8
+TABLE_EVERY_PAGES = 4
+TEXTBOX_EVERY_PAGES = 10
+FOOTNOTE_EVERY_PAGES = 3
+SECTION_EVERY_PAGES = 100
+DOCUMENT_TERM_POOL = 1000
+TERM_RATE = 0.05  # 본문 단어 중 용어집 용어의 비율
+
+_FILLER = (
+    "the of and to in is that for it as with was on be by this are from at or an which have not has "
+    "but were their its can all more also been other when will into than only these may used such "
+    "system value data section report process result level group number order control model method "
+    "between each under after before during within through without against where while however"
+).split()
+_CONSONANTS, _VOWELS = "bdfgklmnprstvz", "aeiou"
+_SYLLABLES = [c + v for c in _CONSONANTS for v in _VOWELS]
+_TERM_SUFFIXES = ("module", "protocol", "index", "layer", "factor", "unit")
+_TERM_OFFSET = len(_SYLLABLES) ** 2  # 최소 3음절로 만들어 일반 단어와 겹치지 않게 합니다.
+
+_NS = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:v="urn:schemas-microsoft-com:vml"'
+)
+_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_CT = "application/vnd.openxmlformats-officedocument.wordprocessingml"
+
+
+def synthetic_term(i):
+    """i 번째 영어 용어. (i 가 다르면 용어도 다름)"""
+    n, word = i + _TERM_OFFSET, ""
+    while n:
+        n, rem = divmod(n, len(_SYLLABLES))
+        word += _SYLLABLES[rem]
+    if i % 3 == 1:
+        word = f"{word} {_TERM_SUFFIXES[i % len(_TERM_SUFFIXES)]}"
+    return word.capitalize() if i % 5 == 0 else word
+
+
+def synthetic_translation(i):
+    """i 번째 용어의 한글 번역. (2~4 음절)"""
+    return "".join(chr(0xAC00 + (i * 7919 + k * 104729) % 11172) for k in range(2 + i % 3))
+
+
+def make_glossary(terms):
+    """용어 terms 개의 {eng: kor} 용어집."""
+    return {synthetic_term(i): synthetic_translation(i) for i in range(terms)}
+
+
+def make_suggestion_text(lines):
+    """3단계(신규 용어 추출) AI 답변 형식의 텍스트. (apply_suggestions 입력용)"""
+    return "".join(f"[{synthetic_term(i)}] - [{synthetic_translation(i)}]\n" for i in range(lines))
+
+
+def make_translation_text(chunk, glossary, hit_ratio=0.5, seed=0):
+    """청크의 용어 중 일부(hit_ratio)만 용어집 번역을 포함하는 가짜 번역문. (용어 불일치 검사 입력용)"""
+    rng = random.Random(seed)
+    return " ".join(kor for eng, kor in glossary.items() if eng in chunk and rng.random() < hit_ratio)
+
+
+class _TextSource:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def sentence(self, words):
+        rng, out = self.rng, []
+        for _ in range(words):
+            out.append(synthetic_term(rng.randrange(DOCUMENT_TERM_POOL)) if rng.random() < TERM_RATE else rng.choice(_FILLER))
+        return " ".join(out).capitalize() + "."
+
+    def paragraph(self, words=WORDS_PER_PARAGRAPH):
+        sentences, left = [], words
+        while left > 0:
+            n = min(left, self.rng.randint(8, 20))
+            sentences.append(self.sentence(n)); left -= n
+        return " ".join(sentences)
+
+
+def _p(text, extra_runs=""):
+    # 문단을 두 개의 run 으로 나눠 run 결합 경로도 지나가게 합니다.
+    mid = text.find(" ", len(text) // 2)
+    first, second = (text, "") if mid < 0 else (text[:mid], text[mid:])
+    runs = f'<w:r><w:t xml:space="preserve">{escape(first)}</w:t></w:r>'
+    if second:
+        runs += f'<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{escape(second)}</w:t></w:r>'
+    return f"<w:p>{runs}{extra_runs}</w:p>"
+
+
+def _table(src, rows=4, cols=3):
+    grid = "".join('<w:gridCol w:w="3000"/>' for _ in range(cols))
+    out = [f'<w:tbl><w:tblPr><w:tblW w:w="0" w:type="auto"/></w:tblPr><w:tblGrid>{grid}</w:tblGrid>']
+    for r in range(rows):
+        out.append("<w:tr>")
+        if r == rows - 1:
+            # 마지막 행은 첫 두 칸을 가로 병합합니다.
+            out.append(f'<w:tc><w:tcPr><w:gridSpan w:val="2"/></w:tcPr>{_p(src.sentence(6))}</w:tc>')
+            cells = cols - 2
+        else:
+            cells = cols
+        for _ in range(cells):
+            out.append(f"<w:tc>{_p(src.sentence(src.rng.randint(2, 8)))}</w:tc>")
+        out.append("</w:tr>")
+    out.append("</w:tbl>")
+    return "".join(out)
+
+
+def _textbox(src, n):
+    return (f'<w:p><w:r><w:pict><v:shape id="textbox{n}" style="width:200pt;height:60pt"><v:textbox><w:txbxContent>'
+            f'{_p(src.sentence(12))}</w:txbxContent></v:textbox></v:shape></w:pict></w:r></w:p>')
+
+
+def _sect_pr(section):
+    return (f'<w:sectPr><w:headerReference w:type="default" r:id="rIdH{section}"/>'
+            f'<w:footerReference w:type="default" r:id="rIdF{section}"/></w:sectPr>')
+
+
+def make_docx(path, pages, seed=0):
+    """
+    약 pages 쪽 분량의 .docx 문서를 path 에 만듭니다.
+    반환값: 생성 정보 dict (쪽 수, 섹션/표/텍스트 상자/각주 개수)
+    """
+    src = _TextSource(seed)
+    sections = max(1, -(-pages // SECTION_EVERY_PAGES))
+    body, footnotes, tables, textboxes = [], [], 0, 0
+    for page in range(pages):
+        for i in range(PARAGRAPHS_PER_PAGE):
+            extra = ""
+            if i == 0 and page % FOOTNOTE_EVERY_PAGES == 0:
+                fid = len(footnotes) + 1
+                footnotes.append(f'<w:footnote w:id="{fid}">{_p(src.sentence(10))}</w:footnote>')
+                extra = f'<w:r><w:footnoteReference w:id="{fid}"/></w:r>'
+            body.append(_p(src.paragraph(), extra))
+        if page % TABLE_EVERY_PAGES == TABLE_EVERY_PAGES - 1:
+            body.append(_table(src)); tables += 1
+        if page % TEXTBOX_EVERY_PAGES == TEXTBOX_EVERY_PAGES // 2:
+            textboxes += 1; body.append(_textbox(src, textboxes))
+        section = page // SECTION_EVERY_PAGES
+        if page % SECTION_EVERY_PAGES == SECTION_EVERY_PAGES - 1 and section < sections - 1:
+            body.append(f"<w:p><w:pPr>{_sect_pr(section)}</w:pPr></w:p>")
+    body.append(_sect_pr(sections - 1))
+
+    rels = [f'<Relationship Id="rIdFn" Type="{_REL}/footnotes" Target="footnotes.xml"/>']
+    overrides = [f'<Override PartName="/word/document.xml" ContentType="{_CT}.document.main+xml"/>',
+                 f'<Override PartName="/word/footnotes.xml" ContentType="{_CT}.footnotes+xml"/>']
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for s in range(sections):
+            for kind, tag, rid in (("header", "hdr", "H"), ("footer", "ftr", "F")):
+                zf.writestr(f"word/{kind}{s}.xml", f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                                                   f'<w:{tag} {_NS}>{_p(f"{kind.capitalize()} {s + 1}: " + src.sentence(6))}</w:{tag}>')
+                rels.append(f'<Relationship Id="rId{rid}{s}" Type="{_REL}/{kind}" Target="{kind}{s}.xml"/>')
+                overrides.append(f'<Override PartName="/word/{kind}{s}.xml" ContentType="{_CT}.{kind}+xml"/>')
+        zf.writestr("[Content_Types].xml",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>' + "".join(overrides) + "</Types>")
+        zf.writestr("_rels/.rels",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    f'<Relationship Id="rId1" Type="{_REL}/officeDocument" Target="word/document.xml"/></Relationships>')
+        zf.writestr("word/_rels/document.xml.rels",
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    + "".join(rels) + "</Relationships>")
+        zf.writestr("word/footnotes.xml",
+                    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:footnotes {_NS}>'
+                    '<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>'
+                    '<w:footnote w:type="continuationSeparator" w:id="0"><w:p><w:r><w:continuationSeparator/></w:r></w:p></w:footnote>'
+                    + "".join(footnotes) + "</w:footnotes>")
+        zf.writestr("word/document.xml",
+                    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:document {_NS}><w:body>'
+                    + "".join(body) + "</w:body></w:document>")
+    return {"pages": pages, "sections": sections, "tables": tables, "textboxes": textboxes, "footnotes": len(footnotes)}
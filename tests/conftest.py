@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""테스트에서 저장소 루트의 모듈(prompt_core 등)을 불러올 수 있게 합니다."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""용어집 저장소: 줄바꿈 없이 끝나는 마지막 줄도 읽고, 저장할 때 다시 덧붙이지 않습니다."""
+
+from glossary_store import GlossaryStore
+from prompt_core import load_glossary
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def test_last_line_without_newline_round_trips(tmp_path):
+    path = str(tmp_path / "g.txt")
+    write(path, "[alpha] - [알파]\n[beta] - [베타]")
+    store = GlossaryStore(path)
+    assert store.load() == {"alpha": "알파", "beta": "베타"}
+
+    assert store.save({"alpha": "알파", "beta": "베타", "gamma": "감마"}) == 1
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == "[alpha] - [알파]\n[beta] - [베타]\n[gamma] - [감마]\n"
+    assert GlossaryStore(path).load() == load_glossary(path) == store.entries
+    assert store._stale_lines == 0
+
+
+def test_unterminated_line_is_reread_once_completed(tmp_path):
+    path = str(tmp_path / "g.txt")
+    write(path, "[alpha] - [알파]\n[beta] - [베")
+    store = GlossaryStore(path)
+    store.load()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("타]\n")
+    assert store.refresh() == {"beta": "베타"}
+    assert store.entries == {"alpha": "알파", "beta": "베타"}
+    assert store._stale_lines == 0
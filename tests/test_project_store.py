@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""프로젝트 저장소: 읽기 전용 조회는 완료된 청크를 찾되 DB 를 고치지 않습니다."""
+
+import os
+
+import prompt_core
+from project_store import ProjectStore, STAGE_DONE
+from synthetic_data import make_docx
+
+
+def snapshot(db_path):
+    """DB 파일 내용과 WAL 에 쌓인 바이트 수. (읽기만 해도 SQLite 가 빈 -wal/-shm 파일은 만들 수 있음)"""
+    with open(db_path, 'rb') as f:
+        data = f.read()
+    return data, os.path.getsize(db_path + "-wal") if os.path.exists(db_path + "-wal") else 0
+
+
+def test_read_only_match_finds_completed_chunks_without_writing(tmp_path):
+    doc_path, db_path = str(tmp_path / "doc.docx"), str(tmp_path / "doc.db")
+    make_docx(doc_path, 3, seed=1)
+    settings = prompt_core.default_settings()
+    project = ProjectStore(db_path)
+    chunks, _ = project.chunk_and_sync(doc_path, settings)
+    assert len(chunks) > 2
+    project.update_chunk(0, stage=STAGE_DONE); project.update_chunk(2, stage=STAGE_DONE)
+    project.close()
+    before = snapshot(db_path)
+
+    project = ProjectStore(db_path, read_only=True)
+    try:
+        matched, completed = project.match_completed(doc_path, settings)
+    finally:
+        project.close()
+    assert matched == chunks
+    assert completed == {0, 2}
+    assert snapshot(db_path) == before
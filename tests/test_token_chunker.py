@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""토큰 청커: 겹침을 넣어도 청크가 예산을 넘지 않고, 나뉜 블록은 원래대로 이어집니다."""
+
+import random
+
+from token_chunker import estimate_tokens, iter_chunks_by_token_budget, split_oversized_block
+
+
+def make_blocks(seed, count=200):
+    rng = random.Random(seed)
+    words = ["valve", "pressure", "gauge", "압력", "밸브를", "확인한다", "inspection", "호스"]
+    blocks = []
+    for _ in range(count):
+        sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(3, 25))) + "." for _ in range(rng.randint(1, 6))]
+        blocks.append(" ".join(sentences) if rng.random() < 0.7 else "\t".join(sentences))
+    return blocks
+
+
+def test_overlap_never_pushes_chunk_over_budget():
+    for seed in range(5):
+        for overlap in (10, 30, 50):
+            chunks = list(iter_chunks_by_token_budget(make_blocks(seed), max_tokens=100, overlap_tokens=overlap))
+            assert chunks
+            assert max(estimate_tokens(chunk) for chunk in chunks) <= 100
+
+
+def test_split_block_rebuilds_original_with_empty_first_cell():
+    block = "\tThe valve must be closed. Check the gauge.\t\t압력계를 확인한다."
+    pieces = split_oversized_block(block, 5, estimate_tokens)
+    assert "".join(text + sep for text, tokens, sep in pieces) == block
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""번역 메모리: 줄 단위 쌍은 참고 번역으로만 쓰고, 전체 일치는 청크 쌍에서만 나옵니다."""
+
+import sqlite3
+
+from translation_memory import TranslationMemory, SEGMENT_CHUNK, segment_hash
+
+SOURCE = "The valve must be closed.\nCheck the pressure gauge."
+TARGET = "압력계를 확인한다.\n밸브를 닫아야 한다."  # 줄 수만 같고 짝은 어긋난 번역
+
+
+def open_tm(tmp_path):
+    return TranslationMemory(str(tmp_path / "tm.db"))
+
+
+def test_line_pair_is_not_a_full_match_for_single_line_chunk(tmp_path):
+    tm = open_tm(tmp_path)
+    try:
+        tm.add(SOURCE, TARGET)
+        match = tm.match_chunk("The valve must be closed.")
+        assert match["full"] is None
+        assert (1.0, "The valve must be closed.", "압력계를 확인한다.") in match["references"]
+    finally:
+        tm.close()
+
+
+def test_whole_chunk_pair_is_a_full_match(tmp_path):
+    tm = open_tm(tmp_path)
+    try:
+        tm.add(SOURCE, TARGET)
+        tm.add("The valve must be closed.", "밸브를 닫아야 한다.")
+        assert tm.match_chunk(SOURCE)["full"] == TARGET
+        assert tm.match_chunk("The valve must be closed.")["full"] == "밸브를 닫아야 한다."
+        # 나중에 저장된 줄 단위 쌍이 확정된 청크 쌍을 덮어쓰지 않습니다.
+        tm.add("The valve must be closed.\nSomething else here.", "다른 번역.\n무언가.")
+        assert tm.lookup_exact("The valve must be closed.", SEGMENT_CHUNK) == "밸브를 닫아야 한다."
+    finally:
+        tm.close()
+
+
+def test_old_database_keeps_single_line_rows_as_references(tmp_path):
+    # 종류(kind)를 기록하기 전의 파일: 여러 줄 원문만 청크 쌍으로 봅니다.
+    path = str(tmp_path / "tm.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE segments (id INTEGER PRIMARY KEY, src_hash TEXT NOT NULL UNIQUE, source TEXT NOT NULL,"
+                 " target TEXT NOT NULL, minhash BLOB, updated REAL)")
+    conn.executemany("INSERT INTO segments (src_hash, source, target) VALUES (?, ?, ?)",
+                     [(segment_hash(SOURCE), SOURCE, TARGET), (segment_hash("The valve must be closed."), "The valve must be closed.", "압력계를 확인한다.")])
+    conn.commit(); conn.close()
+
+    tm = TranslationMemory(path)
+    try:
+        assert tm.match_chunk(SOURCE)["full"] == TARGET
+        assert tm.match_chunk("The valve must be closed.")["full"] is None
+    finally:
+        tm.close()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""GUI 가 프로젝트에 남긴 단계에서 자동 번역을 이어 갈 때의 동작"""
+
+import asyncio
+
+from project_store import ProjectStore
+from translation_pipeline import TranslationPipeline, STAGE_DRAFT, STAGE_FINAL, STAGE_SUGGEST, STAGE_DONE
+
+PROMPT1 = "P1 {english_chunk}"
+PROMPT2 = "P2 {english_chunk} / {korean_draft}"
+PROMPT3 = "P3 {english_chunk} / {final_korean_text}"
+
+
+class FakeClient:
+    def __init__(self):
+        self.prompts = []
+
+    async def complete(self, prompt):
+        self.prompts.append(prompt)
+        return f"답변 {len(self.prompts)}"
+
+
+def resume(tmp_path, **fields):
+    """청크 하나를 fields 대로 기록해 두고, 프로젝트 기록에서 이어서 실행합니다. 반환값: (결과, 보낸 프롬프트 목록)"""
+    project = ProjectStore(str(tmp_path / "project.db"))
+    try:
+        project.sync_chunks(["Hello world."])
+        project.update_chunk(0, **fields)
+        project.flush()
+        state = next(project.iter_states())
+    finally:
+        project.close()
+    client = FakeClient()
+    pipeline = TranslationPipeline(client, PROMPT1, PROMPT2, prompt3=PROMPT3)
+    result = asyncio.run(pipeline.run_chunk("Hello world.", "", {**state, "error": None}))
+    return result, client.prompts
+
+
+def test_stage_without_draft_restarts_from_draft(tmp_path):
+    result, prompts = resume(tmp_path, stage=STAGE_FINAL)
+    assert result["error"] is None and result["stage"] == STAGE_DONE
+    assert prompts[0].startswith("P1 ")
+    assert not any("None" in p for p in prompts)
+
+
+def test_stage_without_final_restarts_from_final(tmp_path):
+    result, prompts = resume(tmp_path, stage=STAGE_SUGGEST, draft="초벌")
+    assert result["stage"] == STAGE_DONE
+    assert prompts[0] == "P2 Hello world. / 초벌"
+    assert not any("None" in p for p in prompts)
+
+
+def test_recorded_draft_is_reused(tmp_path):
+    result, prompts = resume(tmp_path, stage=STAGE_FINAL, draft="초벌")
+    assert [p.split()[0] for p in prompts] == ["P2", "P3"]
+    assert result["draft"] == "초벌"
+
+
+def test_new_chunk_runs_all_stages(tmp_path):
+    result, prompts = resume(tmp_path, stage=STAGE_DRAFT)
+    assert [p.split()[0] for p in prompts] == ["P1", "P2", "P3"]
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+토큰 예산 기반 청크 분할
+
+단어 수 대신 모델 토큰 수를 기준으로 청크를 만듭니다.
+- 토큰 계산기는 교체할 수 있습니다. (tiktoken 이 설치되어 있으면 사용, 없으면 글자 수 기반 어림값)
+- 예산을 넘는 블록은 문장 경계에서 나누고, 표 행은 가능하면 통째로 유지합니다.
+  (행 하나가 예산을 넘으면 셀 경계 → 문장 경계 → 단어 순으로 나눕니다.)
+- 직전 청크의 끝부분을 다음 청크 앞에 겹쳐 넣는 문맥(overlap)을 선택적으로 지원합니다.
+블록을 한 번만 훑으며, 청크 문자열은 내보낼 때 한 번만 join 합니다.
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+
+DEFAULT_TOKEN_BUDGET = 1500
+DEFAULT_TOKENIZER = "auto"
+
+# 문장 끝(. ! ?)과 닫는 따옴표/괄호 뒤의 공백에서 나눕니다. (그룹 1: 문장 사이의 원래 공백)
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])["\')\]]*(\s+)')
+_WORD = re.compile(r'\S+')
+
+
+def estimate_tokens(text):
+    """
+    토큰 수 어림값. (영문 등 ASCII 는 약 4글자당 1토큰, 한글 등 그 밖의 문자는 글자당 1토큰)
+    토크나이저가 없을 때의 기본 계산기로도 사용합니다.
+    """
+    ascii_chars = sum(1 for ch in text if ch < '\x80')
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(name):
+    """tiktoken 인코딩. 어림값을 쓰거나 tiktoken/인코딩을 불러올 수 없으면 None."""
+    if name == "chars":
+        return None
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base" if name == "auto" else name)
+    except Exception:
+        return None
+
+
+def resolve_tokenizer(name=DEFAULT_TOKENIZER):
+    """
+    실제로 쓰이는 토큰 계산기 이름. (tiktoken 인코딩 이름 또는 "chars")
+    "auto" 처럼 설치 상태에 따라 달라지는 설정 대신 이 값을 청크 캐시 키에 넣습니다.
+    """
+    encoding = _load_encoding(name)
+    return encoding.name if encoding is not None else "chars"
+
+
+def get_token_counter(name=DEFAULT_TOKENIZER):
+    """
+    토큰 계산 함수(text -> int)를 반환합니다.
+    name: "auto"(tiktoken 이 있으면 cl100k_base, 없으면 어림값), "chars"(어림값), 또는 tiktoken 인코딩 이름.
+    tiktoken 은 선택 사항이며, 불러올 수 없으면 어림값으로 대체합니다.
+    """
+    encoding = _load_encoding(name)
+    if encoding is None:
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _iter_sentences(text):
+    """(문장, 뒤따르는 원래 공백) 을 차례로 내보냅니다. 문장과 공백을 이으면 원래 텍스트가 됩니다."""
+    pos = 0
+    for m in _SENTENCE_BREAK.finditer(text):
+        yield text[pos:m.start(1)], m.group(1)
+        pos = m.end()
+    if pos < len(text):
+        yield text[pos:], ""
+
+
+def split_sentences(text):
+    """문장 경계에서 텍스트를 나눕니다. (구분 공백은 버리고 문장 끝 문장부호와 닫는 따옴표/괄호는 유지)"""
+    return [sentence for sentence, _ in _iter_sentences(text)]
+
+
+def _split_words(text, max_tokens, count_tokens):
+    """
+    문장 하나가 예산을 넘을 때 단어 단위로 예산에 맞게 나눕니다.
+    반환값: [(조각, 토큰 수, 뒤따르는 원래 공백), ...] (조각 안의 공백과 줄바꿈도 그대로 유지)
+    """
+    pieces, start, end, current_tokens = [], 0, 0, 0
+    for m in _WORD.finditer(text):
+        tokens = count_tokens(m.group()) + 1
+        if current_tokens and current_tokens + tokens > max_tokens:
+            pieces.append((text[start:end], count_tokens(text[start:end]), text[end:m.start()]))
+            start, current_tokens = m.start(), 0
+        end = m.end(); current_tokens += tokens
+    if current_tokens:
+        pieces.append((text[start:end], count_tokens(text[start:end]), text[end:]))
+    return pieces
+
+
+def split_oversized_block(block, max_tokens, count_tokens):
+    """
+    예산을 넘는 블록을 (텍스트, 토큰 수, 구분자) 조각들로 나눕니다.
+    구분자는 블록 안에서 조각 뒤에 있던 원래 문자열(공백, 줄바꿈, 탭)이라, 조각과 구분자를 차례로 이으면 원래 블록이 됩니다.
+    표 행('\\t' 로 구분된 셀)은 셀 경계를 먼저 사용합니다.
+    """
+    pieces = []
+    for i, cell in enumerate(block.split("\t")):
+        if i:
+            if not pieces:
+                pieces.append(("", 0, ""))  # 첫 셀이 비어 있으면 빈 조각 뒤에 구분자를 둡니다.
+            text, tokens, sep = pieces[-1]
+            pieces[-1] = (text, tokens, sep + "\t")  # 셀 구분자 (빈 셀은 구분자만 남음)
+        for sentence, sep in _iter_sentences(cell):
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                pieces.append((sentence, tokens, sep))
+                continue
+            words = _split_words(sentence, max_tokens, count_tokens)
+            text, tokens, last_sep = words[-1]
+            pieces.extend(words[:-1]); pieces.append((text, tokens, last_sep + sep))
+    return pieces
+
+
+def iter_chunks_by_token_budget(text_blocks, max_tokens=DEFAULT_TOKEN_BUDGET, count_tokens=estimate_tokens, overlap_tokens=0):
+    """
+    텍스트 블록 스트림을 토큰 예산 기준 청크로 묶어 하나씩 내보냅니다.
+    블록 사이는 줄바꿈으로, 한 블록에서 나뉜 조각 사이는 원래 구분(공백/탭)으로 잇습니다.
+    overlap_tokens > 0 이면 직전 청크 끝의 조각들을 이 토큰 수 이내로 다음 청크 앞에 다시 넣습니다.
+    """
+    if max_tokens <= 0:
+        raise ValueError("토큰 예산은 0보다 커야 합니다.")
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+    newline_tokens = 1
+
+    parts = []            # 현재 청크의 조각 문자열과 구분자 (교대로)
+    units = []            # 현재 청크의 (텍스트, 토큰 수) - overlap 계산용
+    current_tokens = 0
+    has_new_content = False
+
+    def emit():
+        text = "".join(parts[1:])  # 첫 구분자는 버림
+        tail, tail_tokens = deque(), 0
+        if overlap_tokens:
+            for unit_text, unit_tokens in reversed(units):
+                if tail_tokens + unit_tokens > overlap_tokens:
+                    break
+                tail.appendleft((unit_text, unit_tokens)); tail_tokens += unit_tokens + newline_tokens
+        return text, list(tail), tail_tokens
+
+    def fit_overlap(tokens):
+        """새 조각(tokens)이 예산에 들어갈 때까지 겹침 문맥을 앞에서부터 버립니다. (새 내용이 없는 청크 시작에서만)"""
+        nonlocal current_tokens
+        while units and current_tokens + tokens + newline_tokens > max_tokens:
+            _, unit_tokens = units.pop(0); del parts[:2]
+            current_tokens -= unit_tokens + newline_tokens
+
+    def start_with(tail, tail_tokens):
+        nonlocal parts, units, current_tokens, has_new_content
+        parts, units, current_tokens, has_new_content = [], [], 0, False
+        for unit_text, unit_tokens in tail:
+            parts.extend(("\n", unit_text)); units.append((unit_text, unit_tokens))
+        current_tokens = tail_tokens
+
+    for block in text_blocks:
+        block = block.strip()
+        if not block:
+            continue
+        block_tokens = count_tokens(block)
+        if block_tokens <= max_tokens:
+            pieces = [(block, block_tokens, "\n")]
+        else:
+            pieces, sep = [], "\n"
+            for text, tokens, next_sep in split_oversized_block(block, max_tokens, count_tokens):
+                pieces.append((text, tokens, sep)); sep = next_sep
+
+        for text, tokens, sep in pieces:
+            if has_new_content and current_tokens + tokens + newline_tokens > max_tokens:
+                chunk, tail, tail_tokens = emit()
+                yield chunk
+                start_with(tail, tail_tokens)
+            if not has_new_content:
+                # 겹침 문맥 때문에 새 조각이 예산을 넘으면, 들어갈 때까지 오래된 겹침부터 버립니다.
+                fit_overlap(tokens)
+                sep = "\n"
+            parts.extend((sep, text)); units.append((text, tokens))
+            current_tokens += tokens + newline_tokens
+            has_new_content = True
+
+    if has_new_content:
+        yield emit()[0]
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+번역 메모리 (SQLite)
+
+확정된 번역(검토 창/자동 번역에서 extract_translation 으로 얻은 최종 번역)을 원문과 짝지어 저장하고,
+새 청크의 프롬프트를 만들 때 다시 사용합니다.
+- 세그먼트: 청크 전체, 그리고 원문 블록(줄) 수와 번역 줄 수가 같으면 줄 단위 쌍도 저장합니다.
+  줄 수가 같다고 줄끼리 짝이 맞는다는 보장은 없으므로, 줄 단위 쌍은 참고 번역으로만 쓰고 전체 일치는 청크 전체 쌍으로만 판단합니다.
+  세그먼트마다 종류(kind: chunk/line)를 기록하며, 같은 원문이 두 종류로 저장되면 확정된 청크 쌍을 남깁니다.
+- 정확 일치: 공백을 정리한 원문의 SHA-1 해시 (인덱스 조회)
+- 유사 일치: 단어 3-gram 의 MinHash 서명(64개, one permutation hashing)을 LSH 밴드(16 × 4)로 나눠 인덱스에 넣고,
+  밴드가 하나라도 같은 후보만 서명으로 유사도를 어림합니다. (세그먼트가 수백만 개여도 후보 수만큼만 비교)
+
+모드 (설정의 "tm_mode"):
+    "off"       사용 안 함
+    "reference" 일부 일치는 프롬프트에 참고 번역으로 넣고, 전체 일치는 초벌 번역으로 채워 1단계를 건너뜀
+    "skip"      전체 일치 청크는 LLM 요청 없이 완료 처리
+GUI 와 파이프라인은 같은 파일(설정 파일 옆 translation_memory.db)을 사용합니다.
+
+명령줄:
+    python translation_memory.py import translations.jsonl   # 자동 번역 결과(JSONL)를 메모리에 추가
+    python translation_memory.py stats
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+from array import array
+
+from prompt_core import get_config_path
+
+TM_FILE_NAME = "translation_memory.db"
+TM_MODES = ("off", "reference", "skip")
+DEFAULT_FUZZY_THRESHOLD = 0.6
+MAX_REFERENCES = 8
+MIN_FUZZY_WORDS = 4  # 이보다 짧은 세그먼트는 정확 일치로만 찾습니다.
+SEGMENT_CHUNK, SEGMENT_LINE = "chunk", "line"  # 세그먼트 종류: 확정된 청크 전체 쌍, 줄 수로 짝지은 줄 단위 쌍
+
+NUM_PERM, BANDS, ROWS = 64, 16, 4
+SHINGLE_WORDS = 3
+_EMPTY = 1 << 32  # 빈 구간 표시 (서명 값은 32비트)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    src_hash TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    minhash BLOB,
+    updated REAL,
+    kind TEXT NOT NULL DEFAULT 'line'
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    seg_id INTEGER NOT NULL,
+    PRIMARY KEY (band, hash, seg_id)
+) WITHOUT ROWID;
+"""
+
+
+def default_tm_path():
+    """설정 파일 옆의 번역 메모리 DB 경로."""
+    return os.path.join(os.path.dirname(get_config_path()), TM_FILE_NAME)
+
+
+def normalize_segment(text):
+    return " ".join(text.split())
+
+
+def segment_hash(text):
+    return hashlib.sha1(normalize_segment(text).encode("utf-8")).hexdigest()
+
+
+def _lines(text):
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+
+def minhash_signature(text):
+    """
+    단어 3-gram 집합의 MinHash 서명. 단어가 MIN_FUZZY_WORDS 보다 적으면 None.
+    3-gram 마다 해시를 한 번만 계산해 NUM_PERM 개 구간 중 하나의 최솟값으로 쓰고(one permutation hashing),
+    빈 구간은 오른쪽의 값을 빌려 채웁니다. (3-gram 수 × NUM_PERM 번 해시하는 방식과 같은 용도, 비용은 3-gram 수에 비례)
+    """
+    words = text.lower().split()
+    if len(words) < MIN_FUZZY_WORDS:
+        return None
+    signature = [_EMPTY] * NUM_PERM
+    for i in range(len(words) - SHINGLE_WORDS + 1):
+        h = int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"), digest_size=8).digest(), "little")
+        slot, value = h % NUM_PERM, (h >> 32) & 0xFFFFFFFF
+        if value < signature[slot]:
+            signature[slot] = value
+    filled = [i for i, v in enumerate(signature) if v != _EMPTY]
+    for i in range(NUM_PERM):
+        if signature[i] == _EMPTY:
+            donor = next((j for j in filled if j > i), filled[0])
+            signature[i] = signature[donor]
+    return array("I", signature)
+
+
+def band_hashes(signature):
+    return [(band, zlib.crc32(signature[band * ROWS:(band + 1) * ROWS].tobytes())) for band in range(BANDS)]
+
+
+def aligned_segments(source, target):
+    """
+    (원문, 번역) 한 쌍에서 저장할 (원문, 번역, 종류) 목록.
+    원문 줄(블록) 수와 번역 줄 수가 같으면 줄 단위 쌍(SEGMENT_LINE)도 함께 돌려줍니다. (짝이 확인된 것은 아니므로 참고용)
+    """
+    pairs = [(source.strip(), target.strip(), SEGMENT_CHUNK)]
+    src_lines, tgt_lines = _lines(source), _lines(target)
+    if len(src_lines) > 1 and len(src_lines) == len(tgt_lines):
+        pairs.extend((src, tgt, SEGMENT_LINE) for src, tgt in zip(src_lines, tgt_lines))
+    return pairs
+
+
+class TranslationMemory:
+    """번역 메모리 저장소. (같은 스레드에서만 사용)"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_tm_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        if "kind" not in {row[1] for row in self.conn.execute("PRAGMA table_info(segments)")}:
+            # 종류를 기록하기 전의 파일: 여러 줄 원문은 청크 쌍이 확실하고, 한 줄 원문은 줄 단위 쌍일 수 있어 참고용으로 둡니다.
+            with self.conn:
+                self.conn.execute("ALTER TABLE segments ADD COLUMN kind TEXT NOT NULL DEFAULT 'line'")
+                self.conn.execute("UPDATE segments SET kind = ? WHERE instr(source, char(10)) > 0", (SEGMENT_CHUNK,))
+
+    def close(self):
+        self.conn.close()
+
+    def count(self):
+        """저장된 세그먼트 수"""
+        return self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+
+    # --- 저장 ---
+    def add(self, source, target):
+        """확정된 (원문, 번역) 한 쌍을 저장합니다. 반환값: 새로 추가되거나 번역이 바뀐 세그먼트 수"""
+        return self.add_many([(source, target)])
+
+    def add_many(self, pairs):
+        """여러 쌍을 한 트랜잭션으로 저장합니다. 같은 원문이 있으면 번역을 새 것으로 바꿉니다."""
+        changed, now = 0, time.time()
+        with self.conn:
+            for source, target in pairs:
+                if not source.strip() or not target.strip():
+                    continue
+                for src, tgt, kind in aligned_segments(source, target):
+                    changed += self._put(src, tgt, kind, now)
+        return changed
+
+    def _put(self, source, target, kind, now):
+        key = segment_hash(source)
+        row = self.conn.execute("SELECT id, target, kind FROM segments WHERE src_hash = ?", (key,)).fetchone()
+        if row:
+            # 확정된 청크 쌍은 짝이 확인되지 않은 줄 단위 쌍으로 덮어쓰지 않습니다.
+            if (row[2] == SEGMENT_CHUNK and kind == SEGMENT_LINE) or (row[1], row[2]) == (target, kind):
+                return 0
+            self.conn.execute("UPDATE segments SET target = ?, kind = ?, updated = ? WHERE id = ?", (target, kind, now, row[0]))
+            return 1
+        signature = minhash_signature(source)
+        cur = self.conn.execute("INSERT INTO segments (src_hash, source, target, minhash, updated, kind) VALUES (?, ?, ?, ?, ?, ?)",
+                                (key, source, target, signature.tobytes() if signature else None, now, kind))
+        if signature:
+            self.conn.executemany("INSERT OR IGNORE INTO bands (band, hash, seg_id) VALUES (?, ?, ?)",
+                                  [(band, h, cur.lastrowid) for band, h in band_hashes(signature)])
+        return 1
+
+    # --- 조회 ---
+    def lookup_exact(self, source, kind=None):
+        """원문이 정확히 같은 세그먼트의 번역. kind 를 주면 그 종류의 세그먼트만 찾습니다."""
+        row = self.conn.execute("SELECT target FROM segments WHERE src_hash = ? AND (? IS NULL OR kind = ?)",
+                                (segment_hash(source), kind, kind)).fetchone()
+        return row[0] if row else None
+
+    def lookup_exact_many(self, sources):
+        """{원문: 번역} (정확히 일치하는 원문만)"""
+        by_hash, found = {}, {}
+        for source in sources:
+            by_hash.setdefault(segment_hash(source), []).append(source)
+        keys = list(by_hash)
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = self.conn.execute(f"SELECT src_hash, target FROM segments WHERE src_hash IN ({','.join('?' * len(batch))})", batch)
+            for key, target in rows:
+                for source in by_hash[key]:
+                    found[source] = target
+        return found
+
+    def lookup_fuzzy(self, source, limit=3, threshold=DEFAULT_FUZZY_THRESHOLD):
+        """유사한 세그먼트 [(유사도, 원문, 번역), ...] (유사도 순, 정확 일치 포함)"""
+        signature = minhash_signature(source)
+        if signature is None:
+            return []
+        hits = {}
+        for band, h in band_hashes(signature):
+            for (seg_id,) in self.conn.execute("SELECT seg_id FROM bands WHERE band = ? AND hash = ?", (band, h)):
+                hits[seg_id] = hits.get(seg_id, 0) + 1
+        # 밴드가 많이 겹친 후보부터 서명을 비교합니다.
+        candidates = sorted(hits, key=hits.get, reverse=True)[:max(50, limit * 10)]
+        matches = []
+        for i in range(0, len(candidates), 500):
+            batch = candidates[i:i + 500]
+            for src, tgt, blob in self.conn.execute(
+                    f"SELECT source, target, minhash FROM segments WHERE id IN ({','.join('?' * len(batch))})", batch):
+                other = array("I"); other.frombytes(blob)
+                score = sum(1 for a, b in zip(signature, other) if a == b) / NUM_PERM
+                if score >= threshold:
+                    matches.append((score, src, tgt))
+        matches.sort(key=lambda m: m[0], reverse=True)
+        return matches[:limit]
+
+    def match_chunk(self, chunk, fuzzy=True, threshold=DEFAULT_FUZZY_THRESHOLD):
+        """
+        청크 하나를 번역 메모리와 비교합니다.
+        반환값: {"full": 전체 번역 또는 None, "blocks": 블록 수, "exact": 정확히 일치한 블록 수,
+                 "references": [(유사도, 원문, 번역), ...]}  (full 이 있으면 references 는 비어 있음)
+        full 은 청크 전체가 저장된 청크 쌍(SEGMENT_CHUNK)과 같을 때만 채웁니다. 줄 단위 쌍은 줄 수만 맞춰 짝지은 것이라,
+        모든 줄이 일치해도(한 줄짜리 청크라도) 확정 번역으로 쓰지 않고 참고 번역으로만 넣습니다.
+        """
+        lines = _lines(chunk)
+        exact = self.lookup_exact_many(lines)
+        covered = sum(1 for line in lines if line in exact)
+        full = self.lookup_exact(chunk, SEGMENT_CHUNK)
+        result = {"full": full, "blocks": len(lines), "exact": covered, "references": []}
+        if full:
+            return result
+        refs, seen = [], set()
+        if fuzzy and len(lines) > 1:
+            refs += self.lookup_fuzzy(chunk, limit=1, threshold=threshold)
+        refs += [(1.0, line, exact[line]) for line in lines if line in exact]
+        if fuzzy:
+            for line in lines:
+                if line not in exact and len(refs) < MAX_REFERENCES * 2:
+                    refs += self.lookup_fuzzy(line, limit=1, threshold=threshold)
+        for ref in refs:
+            if ref[1] not in seen and len(result["references"]) < MAX_REFERENCES:
+                seen.add(ref[1]); result["references"].append(ref)
+        return result
+
+    def match_chunks(self, chunks, mode, threshold=DEFAULT_FUZZY_THRESHOLD):
+        """청크 목록 전체의 match_chunk 결과. 모드가 off 이거나 메모리가 비어 있으면 None 목록."""
+        if mode == "off" or not self.count():
+            return [None] * len(chunks)
+        return [self.match_chunk(chunk, threshold=threshold) for chunk in chunks]
+
+
+def format_tm_reference(match):
+    """match_chunk 결과의 참고 번역을 프롬프트에 넣을 텍스트로 만듭니다. 없으면 빈 문자열."""
+    if not match or not match["references"]:
+        return ""
+    lines = ["이전에 확정된 번역입니다. 같은 문장은 그대로 쓰고, 비슷한 문장은 표현을 참고해 줘."]
+    for score, source, target in match["references"]:
+        label = "일치" if score >= 1.0 else f"유사도 {score:.0%}"
+        lines.append(f"- 원문 ({label}): {source}\n  번역: {target}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="번역 메모리를 관리합니다.")
+    parser.add_argument("--db", help=f"번역 메모리 파일 (기본값: 프로그램 폴더의 {TM_FILE_NAME})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="자동 번역 결과(JSONL, english_chunk/final 필드)를 추가")
+    imp.add_argument("files", nargs="+")
+    sub.add_parser("stats", help="저장된 세그먼트 수")
+    args = parser.parse_args(argv)
+
+    tm = TranslationMemory(args.db)
+    try:
+        if args.command == "import":
+            for path in args.files:
+                with open(path, "r", encoding="utf-8") as f:
+                    records = (json.loads(line) for line in f if line.strip())
+                    changed = tm.add_many((r["english_chunk"], r["final"]) for r in records if r.get("english_chunk") and r.get("final"))
+                print(f"{path}: 세그먼트 {changed}개 추가/갱신", file=sys.stderr)
+        print(f"번역 메모리: 세그먼트 {tm.count():,}개 ({tm.db_path})", file=sys.stderr)
+    finally:
+        tm.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+자동 3단계 번역 파이프라인 (asyncio)
+
+OpenAI 호환 Chat Completions 엔드포인트에 모든 청크의
+1단계(초벌 번역) → 2단계(개선 번역) → 3단계(용어 추출) 요청을 동시에 보냅니다.
+- 동시 요청 수 제한, 토큰 버킷 기반 분당 요청 수 제한
+- 429/5xx/연결 오류 시 지수 백오프 재시도 (Retry-After 존중)
+- 호스트별 keep-alive 연결 재사용 (표준 라이브러리만 사용)
+결과 해석에는 GUI 와 같은 extract_translation / parse_suggestion_lines 를 사용합니다.
+
+GUI 는 PipelineRunner 로 백그라운드 스레드에서 실행하며, 명령줄에서도 실행할 수 있습니다:
+    python translation_pipeline.py 원문.docx -g "Translation glossary.txt" -o 결과.jsonl
+"""
+
+import os
+import ssl
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from urllib.parse import urlsplit
+
+import prompt_core
+from project_store import ProjectStore
+from prompt_core import DEFAULT_PROMPT_3_SUGGESTION, extract_translation, parse_suggestion_lines, format_chunk_glossary
+from glossary_index import open_glossary, matcher_for
+from block_dedup import BlockDeduper, iter_expanded_records
+from translation_memory import TranslationMemory, TM_MODES, DEFAULT_FUZZY_THRESHOLD, format_tm_reference
+from prompt_template import TemplateError, compile_template, compile_prompt_settings, render_prompt
+
+# CustomPrompt.json 의 API 설정 기본값
+DEFAULT_API_SETTINGS = {
+    "api_base_url": "http://localhost:8000/v1",
+    "api_model": "gpt-4o-mini",
+    "api_key": "",               # 비어 있으면 OPENAI_API_KEY 환경 변수 사용
+    "api_concurrency": 8,
+    "api_requests_per_minute": 120,
+    "api_max_retries": 5,
+    "api_timeout": 120,
+}
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+STAGE_DRAFT, STAGE_FINAL, STAGE_SUGGEST, STAGE_DONE = 1, 2, 3, 4
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status, self.retry_after = status, retry_after
+
+
+# ==============================================================================
+# HTTP/1.1 keep-alive 연결 풀
+# ==============================================================================
+
+class HttpConnectionPool:
+    """한 호스트에 대한 keep-alive 연결을 재사용하는 최소한의 비동기 HTTP/1.1 클라이언트."""
+
+    def __init__(self, base_url, max_idle=16):
+        parts = urlsplit(base_url)
+        self.scheme, self.host = parts.scheme, parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.base_path = parts.path.rstrip("/")
+        self.max_idle = max_idle
+        self._idle = []
+        self._ssl = ssl.create_default_context() if parts.scheme == "https" else None
+
+    async def _open(self):
+        return await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def request(self, method, path, headers=None, body=b"", timeout=None):
+        """요청을 보내고 (상태 코드, 응답 헤더 dict, 본문 bytes) 를 반환합니다."""
+        reused = bool(self._idle)
+        conn = self._idle.pop() if reused else await self._open()
+        try:
+            result, keep_alive = await asyncio.wait_for(self._roundtrip(conn, method, path, headers or {}, body), timeout)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            conn[1].close()
+            if not reused:
+                raise
+            # 재사용한 연결이 서버 쪽에서 이미 닫혔다면 새 연결로 한 번 더 시도합니다.
+            conn = await self._open()
+            try:
+                result, keep_alive = await asyncio.wait_for(self._roundtrip(conn, method, path, headers or {}, body), timeout)
+            except BaseException:
+                conn[1].close()
+                raise ConnectionError(str(e))
+        except BaseException:
+            conn[1].close()
+            raise
+        if keep_alive and len(self._idle) < self.max_idle:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+        return result
+
+    async def _roundtrip(self, conn, method, path, headers, body):
+        reader, writer = conn
+        lines = [f"{method} {self.base_path}{path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        resp_headers = {}
+        while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            resp_headers[name.strip().lower()] = value.strip()
+
+        if resp_headers.get("transfer-encoding", "").lower() == "chunked":
+            parts = []
+            while (size := int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)):
+                parts.append(await reader.readexactly(size)); await reader.readexactly(2)
+            while await reader.readuntil(b"\r\n") != b"\r\n":
+                pass
+            data = b"".join(parts)
+        elif "content-length" in resp_headers:
+            data = await reader.readexactly(int(resp_headers["content-length"]))
+        else:
+            data = await reader.read()
+            return (status, resp_headers, data), False
+        keep_alive = resp_headers.get("connection", "").lower() != "close" and status_line.startswith(b"HTTP/1.1")
+        return (status, resp_headers, data), keep_alive
+
+
+# ==============================================================================
+# 요청 속도 제한 / 재시도
+# ==============================================================================
+
+class TokenBucket:
+    """분당 요청 수 제한용 토큰 버킷. (rate: 초당 보충량, capacity: 최대 순간 요청 수)"""
+
+    def __init__(self, rate, capacity):
+        self.rate, self.capacity = rate, max(1.0, capacity)
+        self._tokens, self._updated = self.capacity, time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ChatClient:
+    """OpenAI 호환 /chat/completions 클라이언트. (연결 재사용, 속도 제한, 재시도 포함)"""
+
+    def __init__(self, base_url, model, api_key="", requests_per_minute=120, max_retries=5, timeout=120, burst=1):
+        self.model, self.max_retries, self.timeout = model, max_retries, timeout
+        self.pool = HttpConnectionPool(base_url)
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+
+    async def close(self):
+        await self.pool.close()
+
+    async def complete(self, prompt):
+        """프롬프트 하나를 보내고 답변 텍스트를 반환합니다. 재시도가 모두 실패하면 ApiError."""
+        body = json.dumps({"model": self.model, "messages": [{"role": "user", "content": prompt}]}, ensure_ascii=False).encode("utf-8")
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                status, headers, data = await self.pool.request("POST", "/chat/completions", self.headers, body, self.timeout)
+                if status == 200:
+                    return json.loads(data)["choices"][0]["message"]["content"]
+                retry_after = headers.get("retry-after")
+                error = ApiError(f"HTTP {status}: {data[:200].decode('utf-8', 'replace')}", status,
+                                 float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else None)
+                if status not in RETRY_STATUS:
+                    raise error
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, KeyError, IndexError) as e:
+                error = ApiError(f"{type(e).__name__}: {e}")
+            if attempt == self.max_retries:
+                raise error
+            delay = error.retry_after if error.retry_after is not None else min(60.0, 2 ** attempt) * (0.5 + random.random())
+            await asyncio.sleep(delay)
+
+
+# ==============================================================================
+# 파이프라인
+# ==============================================================================
+
+def new_chunk_result(index):
+    return {"index": index, "stage": STAGE_DRAFT, "draft": None, "final_answer": None,
+            "final": None, "suggestions": [], "error": None}
+
+
+class TranslationPipeline:
+    """
+    청크마다 1→2→3단계를 순서대로 진행하고, 청크들은 동시에 처리합니다.
+    results 에 이미 진행된 단계가 있으면 그 다음 단계부터 이어서 진행합니다.
+    """
+
+    def __init__(self, client, prompt1, prompt2, concurrency=8, prompt3=DEFAULT_PROMPT_3_SUGGESTION, tm_mode="reference"):
+        self.client = client
+        # 템플릿은 여기서 한 번만 해석/검사합니다. (잘못된 템플릿은 TemplateError)
+        self.prompt1, self.prompt2, self.prompt3 = (compile_template(t, kind) for t, kind in
+                                                    ((prompt1, "prompt1"), (prompt2, "prompt2"), (prompt3, "prompt3")))
+        self.tm_mode = tm_mode
+        self.concurrency = max(1, concurrency)
+        self.cancelled = False
+
+    async def run_chunk(self, chunk, glossary_text, result, on_update=None, tm_match=None):
+        """tm_match: 번역 메모리 비교 결과(TranslationMemory.match_chunk). 전체 일치면 1단계(skip 모드는 모든 단계)를 건너뜁니다."""
+        reference = format_tm_reference(tm_match)
+        # 기록된 단계에 필요한 번역이 없으면(예: 이전 버전 GUI 가 프롬프트만 만들고 남긴 단계) 그 번역을 만드는 단계로 돌아갑니다.
+        if result["stage"] == STAGE_SUGGEST and result["final"] is None:
+            result["stage"] = STAGE_FINAL
+        if result["stage"] == STAGE_FINAL and result["draft"] is None:
+            result["stage"] = STAGE_DRAFT
+        try:
+            if result["stage"] == STAGE_DRAFT and tm_match and tm_match["full"]:
+                result["draft"] = tm_match["full"]
+                if self.tm_mode == "skip":
+                    result["final"], result["stage"] = tm_match["full"], STAGE_DONE
+                else:
+                    result["stage"] = STAGE_FINAL
+                    on_update and on_update(result)
+            if result["stage"] == STAGE_DRAFT:
+                result["draft"] = await self.client.complete(render_prompt(self.prompt1, reference, english_chunk=chunk, glossary=glossary_text))
+                result["stage"] = STAGE_FINAL
+                on_update and on_update(result)
+            if result["stage"] == STAGE_FINAL and not self.cancelled:
+                answer = await self.client.complete(render_prompt(self.prompt2, reference, english_chunk=chunk, korean_draft=result["draft"], glossary=glossary_text))
+                result["final_answer"], result["final"] = answer, extract_translation(answer)
+                result["stage"] = STAGE_SUGGEST
+                on_update and on_update(result)
+            if result["stage"] == STAGE_SUGGEST and not self.cancelled:
+                answer = await self.client.complete(render_prompt(self.prompt3, english_chunk=chunk, final_korean_text=result["final"]))
+                result["suggestions"] = parse_suggestion_lines(answer)
+                result["stage"] = STAGE_DONE
+            result["error"] = None
+        except Exception as e:
+            result["error"] = str(e)
+        on_update and on_update(result)
+        return result
+
+    async def run(self, chunks, glossary_texts, results=None, on_update=None, tm_matches=None):
+        """
+        모든 청크를 처리합니다.
+        glossary_texts: 청크별 {glossary} 값 목록, results: 이전 실행 결과(이어하기용, 없으면 새로 시작)
+        tm_matches: 청크별 번역 메모리 비교 결과 (없으면 사용 안 함)
+        """
+        results = results or [new_chunk_result(i) for i in range(len(chunks))]
+        queue = asyncio.Queue()
+        for result in results:
+            if result["stage"] != STAGE_DONE:
+                queue.put_nowait(result)
+
+        async def worker():
+            while not self.cancelled:
+                try:
+                    result = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                i = result["index"]
+                await self.run_chunk(chunks[i], glossary_texts[i], result, on_update, tm_matches[i] if tm_matches else None)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, max(1, queue.qsize())))))
+        finally:
+            await self.client.close()
+        return results
+
+
+def build_pipeline(settings):
+    """설정(dict)으로 ChatClient 와 TranslationPipeline 을 만듭니다."""
+    s = {**DEFAULT_API_SETTINGS, **settings}
+    client = ChatClient(s["api_base_url"], s["api_model"], s["api_key"] or os.environ.get("OPENAI_API_KEY", ""),
+                        s["api_requests_per_minute"], s["api_max_retries"], s["api_timeout"], burst=s["api_concurrency"])
+    return TranslationPipeline(client, s["prompt1"], s["prompt2"], s["api_concurrency"], tm_mode=s.get("tm_mode", "reference"))
+
+
+class PipelineRunner:
+    """
+    GUI 용: 별도 스레드의 이벤트 루프에서 파이프라인을 실행합니다.
+    진행 상황은 on_update(result) 로 워커 스레드에서 전달되므로, 호출자는 queue 등으로 메인 스레드에 넘겨야 합니다.
+    """
+
+    def __init__(self, settings, chunks, glossary_texts, results=None, on_update=None, on_finish=None, tm_matches=None):
+        self.pipeline = build_pipeline(settings)
+        self._args = (chunks, glossary_texts, results, on_update, tm_matches)
+        self._on_finish = on_finish
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        """진행 중인 요청은 마치고, 새 단계/청크는 시작하지 않습니다."""
+        self.pipeline.cancelled = True
+
+    def _run(self):
+        error, results = None, None
+        try:
+            results = asyncio.run(self.pipeline.run(*self._args))
+        except Exception as e:
+            error = e
+        if self._on_finish:
+            self._on_finish(results, error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="문서의 모든 청크를 OpenAI 호환 API 로 3단계 자동 번역합니다.")
+    parser.add_argument("document", help="영어 원문 (.docx)")
+    parser.add_argument("-g", "--glossary", help="번역 용어집 (.txt 또는 .kgi 색인)")
+    parser.add_argument("-c", "--config", help=f"설정 파일 (기본값: 프로그램 폴더의 {prompt_core.CONFIG_FILE_NAME})")
+    parser.add_argument("-o", "--output", default="translations.jsonl", help="결과 JSONL 파일 (기본값: translations.jsonl)")
+    parser.add_argument("--base-url", help="API 주소 (예: http://localhost:8000/v1)")
+    parser.add_argument("--model", help="모델 이름")
+    parser.add_argument("-j", "--concurrency", type=int, help="동시 요청 수")
+    parser.add_argument("--restart", action="store_true", help="프로젝트에 기록된 진행 상황을 무시하고 처음부터 번역")
+    parser.add_argument("--tm-mode", choices=TM_MODES, help="번역 메모리 사용 방식 (기본값: 설정의 tm_mode)")
+    parser.add_argument("--expanded-output", help="반복 블록을 원래 위치마다 펼친 블록별 번역 JSONL (단어 수 분할 + 반복 블록 제거일 때)")
+    args = parser.parse_args(argv)
+
+    settings = {**DEFAULT_API_SETTINGS, **prompt_core.load_settings_from_json(args.config)}
+    for key, value in (("api_base_url", args.base_url), ("api_model", args.model), ("api_concurrency", args.concurrency),
+                       ("tm_mode", args.tm_mode)):
+        if value is not None:
+            settings[key] = value
+    by_words = settings.get("chunk_mode") != prompt_core.CHUNK_MODE_TOKENS
+    if args.expanded_output and not (by_words and settings.get("dedup_blocks")):
+        parser.error("--expanded-output 은 단어 수 분할에서 반복 블록 제거(dedup_blocks)를 켰을 때만 사용할 수 있습니다.")
+    try:
+        compile_prompt_settings(settings)
+    except TemplateError as e:
+        parser.error(str(e))
+    deduper = BlockDeduper() if settings.get("dedup_blocks") else None
+    # GUI 와 같은 프로젝트 기록을 사용해 완료된 청크는 건너뛰고, 진행 상황을 바로바로 기록합니다.
+    # 문서가 개정되었으면 바뀐 부분만 다시 나누고, 나머지 청크의 진행 상황은 유지합니다.
+    project = ProjectStore.for_document(args.document)
+    chunks, revision = project.chunk_and_sync(args.document, settings, deduper)
+    if revision:
+        print(f"개정판 반영: 청크 {revision['kept']}개 유지, {revision['rechunked']}개 새로 분할", file=sys.stderr)
+    if deduper and (stats := deduper.stats(len(chunks), settings["chunk_size"] if by_words else None))["saved_words"]:
+        print(f"반복 블록 {stats['blocks'] - stats['unique_blocks']}개 제외 (단어 {stats['saved_words']}개)", file=sys.stderr)
+    glossary = open_glossary(args.glossary)
+    matcher = matcher_for(glossary)
+    glossary_texts = [format_chunk_glossary(glossary, matcher.find_terms(c)) for c in chunks]
+
+    if args.restart:
+        for i in range(len(chunks)):
+            project.update_chunk(i, stage=STAGE_DRAFT, draft=None, final=None, final_answer=None, suggestions=[])
+    initial = [{**state, "error": None} for state in project.iter_states()]
+    done = [sum(1 for r in initial if r["stage"] == STAGE_DONE)]
+    if done[0]:
+        print(f"이전 작업: 청크 {done[0]}개 완료 (건너뜀)", file=sys.stderr)
+
+    # 번역 메모리에 있는 청크는 건너뛰거나 참고 번역을 넣고, 새로 확정된 번역은 메모리에 추가합니다.
+    tm = TranslationMemory() if settings["tm_mode"] != "off" else None
+    tm_matches = tm.match_chunks(chunks, settings["tm_mode"], settings.get("tm_fuzzy_threshold", DEFAULT_FUZZY_THRESHOLD)) if tm else None
+    if tm_matches and (full := sum(1 for m in tm_matches if m and m["full"])):
+        print(f"번역 메모리: 청크 {full}개 전체 일치", file=sys.stderr)
+
+    def on_update(result):
+        project.update_from_result(result)
+        if tm and result["final"] and result["stage"] >= STAGE_SUGGEST:
+            tm.add(chunks[result["index"]], result["final"])
+        if result["stage"] == STAGE_DONE or result["error"]:
+            done[0] += 1
+            print(f"\r청크 {done[0]}/{len(chunks)}", end="", file=sys.stderr)
+
+    started = time.monotonic()
+    try:
+        results = asyncio.run(build_pipeline(settings).run(chunks, glossary_texts, results=initial, on_update=on_update, tm_matches=tm_matches))
+    finally:
+        project.close()
+        if tm:
+            tm.close()
+    with open(args.output, "w", encoding="utf-8") as out:
+        for result in results:
+            out.write(json.dumps({**result, "english_chunk": chunks[result["index"]]}, ensure_ascii=False) + "\n")
+    if args.expanded_output:
+        with open(args.expanded_output, "w", encoding="utf-8") as out:
+            for record in iter_expanded_records(deduper.block_map(), chunks, [r["final"] for r in results]):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    failed = sum(1 for r in results if r["error"])
+    print(f"\n완료: 청크 {len(chunks)}개 중 {len(chunks) - failed}개 성공, {failed}개 실패 ({time.monotonic() - started:.1f}초) → {args.output}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())